@@ -0,0 +1,188 @@
+import os
+import time
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from database import fetch_one, fetch_all, execute_many
+
+logger = logging.getLogger(__name__)
+
+STATS_FLUSH_SECONDS = float(os.getenv('STATS_FLUSH_SECONDS', 2))
+STATS_RECONCILE_SECONDS = float(os.getenv('STATS_RECONCILE_SECONDS', 3600))
+STATS_SNAPSHOT_SECONDS = float(os.getenv('STATS_SNAPSHOT_SECONDS', 5))
+STATS_RECONCILE_DAYS = int(os.getenv('STATS_RECONCILE_DAYS', 30))
+
+# Counter name -> table it mirrors
+COUNTER_TABLES = {
+    "users": "users",
+    "translations": "translation_history",
+    "sessions": "live_sessions",
+    "feedback": "feedback",
+}
+
+# Counter name -> stats_counters entry holding rows moved to the history archive
+ARCHIVED_COUNTERS = {
+    "translations": "archived_translations",
+}
+
+ROLLUP_DIMENSIONS = ("input_type", "output_type", "input_language", "output_language")
+
+
+class StatsAggregator:
+    """Incrementally maintained admin counters and daily translation rollups.
+
+    Writers bump in-memory deltas that are flushed with upserts every few
+    seconds; a periodic reconciliation recomputes everything from the base
+    tables to correct any drift (lost deltas, deletes, crashed workers).
+    """
+
+    def __init__(self, flush_interval: float = STATS_FLUSH_SECONDS,
+                 reconcile_interval: float = STATS_RECONCILE_SECONDS,
+                 snapshot_ttl: float = STATS_SNAPSHOT_SECONDS):
+        self.flush_interval = flush_interval
+        self.reconcile_interval = reconcile_interval
+        self.snapshot_ttl = snapshot_ttl
+        self._counter_deltas = Counter()
+        self._rollup_deltas = Counter()
+        self._snapshot = None
+        self._snapshot_at = 0.0
+        self._last_reconcile = time.monotonic()
+
+    def record(self, counter: str, amount: int = 1):
+        self._counter_deltas[counter] += amount
+
+    def record_translation(self, input_type: str, output_type: str, input_language: str,
+                           output_language: str, amount: int = 1):
+        self._counter_deltas["translations"] += amount
+        bucket = datetime.now(timezone.utc).date()
+        self._rollup_deltas[(bucket, input_type, output_type, input_language, output_language)] += amount
+
+    async def flush(self):
+        counters, self._counter_deltas = self._counter_deltas, Counter()
+        rollups, self._rollup_deltas = self._rollup_deltas, Counter()
+        statements = []
+        for name, amount in counters.items():
+            statements.append((
+                """INSERT INTO stats_counters (name, value) VALUES (%s, %s)
+                   ON DUPLICATE KEY UPDATE value = value + VALUES(value)""",
+                (name, amount)
+            ))
+        for key, amount in rollups.items():
+            statements.append((
+                """INSERT INTO translation_daily_rollups
+                   (bucket_date, input_type, output_type, input_language, output_language, translations)
+                   VALUES (%s, %s, %s, %s, %s, %s)
+                   ON DUPLICATE KEY UPDATE translations = translations + VALUES(translations)""",
+                (*key, amount)
+            ))
+        if not statements:
+            return
+        try:
+            await execute_many(statements)
+        except Exception:
+            # Put the deltas back so the next flush retries them
+            self._counter_deltas.update(counters)
+            self._rollup_deltas.update(rollups)
+            raise
+
+    async def reconcile(self):
+        """Recompute counters and recent rollups from the base tables"""
+        statements = []
+        for name, table in COUNTER_TABLES.items():
+            archived = ARCHIVED_COUNTERS.get(name)
+            statements.append((
+                f"""INSERT INTO stats_counters (name, value)
+                    SELECT %s, COUNT(*) + COALESCE((SELECT value FROM stats_counters WHERE name = %s), 0)
+                    FROM {table}
+                    ON DUPLICATE KEY UPDATE value = VALUES(value)""",
+                (name, archived)
+            ))
+        statements.append((
+            "DELETE FROM translation_daily_rollups WHERE bucket_date >= UTC_DATE() - INTERVAL %s DAY",
+            (STATS_RECONCILE_DAYS,)
+        ))
+        statements.append((
+            f"""INSERT INTO translation_daily_rollups
+                (bucket_date, {', '.join(ROLLUP_DIMENSIONS)}, translations)
+                SELECT DATE(CONVERT_TZ(created_at, @@session.time_zone, '+00:00')) AS bucket_date,
+                       {', '.join(ROLLUP_DIMENSIONS)}, COUNT(*)
+                FROM translation_history
+                WHERE created_at >= CONVERT_TZ(UTC_DATE() - INTERVAL %s DAY, '+00:00', @@session.time_zone)
+                GROUP BY bucket_date, {', '.join(ROLLUP_DIMENSIONS)}""",
+            (STATS_RECONCILE_DAYS,)
+        ))
+        statements.append((
+            """INSERT INTO stats_counters (name, value) VALUES ('reconciled_at', UNIX_TIMESTAMP())
+               ON DUPLICATE KEY UPDATE value = VALUES(value)""",
+            None
+        ))
+        await execute_many(statements)
+        self._snapshot = None
+
+    async def _load_snapshot(self) -> Dict[str, Any]:
+        counters = await fetch_all("SELECT name, value FROM stats_counters")
+        counters = {row['name']: int(row['value']) for row in counters or []}
+        rows = await fetch_all(
+            f"""SELECT {', '.join(ROLLUP_DIMENSIONS)},
+                       SUM(CASE WHEN bucket_date >= UTC_DATE() - INTERVAL 6 DAY THEN translations ELSE 0 END) AS last_7_days,
+                       SUM(translations) AS last_30_days
+                FROM translation_daily_rollups
+                WHERE bucket_date >= UTC_DATE() - INTERVAL 29 DAY
+                GROUP BY {', '.join(ROLLUP_DIMENSIONS)}"""
+        )
+
+        windows = {"7d": Counter(), "30d": Counter()}
+        breakdown = {window: {dimension: Counter() for dimension in ROLLUP_DIMENSIONS} for window in windows}
+        for row in rows or []:
+            for window, column in (("7d", "last_7_days"), ("30d", "last_30_days")):
+                amount = int(row[column] or 0)
+                windows[window]["total"] += amount
+                for dimension in ROLLUP_DIMENSIONS:
+                    breakdown[window][dimension][row[dimension]] += amount
+
+        reconciled_at = counters.get("reconciled_at")
+        return {
+            "total_users": counters.get("users", 0),
+            "total_translations": counters.get("translations", 0),
+            "total_sessions": counters.get("sessions", 0),
+            "total_feedback": counters.get("feedback", 0),
+            "recent_translations_7days": windows["7d"]["total"],
+            "recent_translations_30days": windows["30d"]["total"],
+            "breakdown": {
+                window: {dimension: dict(values) for dimension, values in dimensions.items()}
+                for window, dimensions in breakdown.items()
+            },
+            "as_of": datetime.now(timezone.utc).isoformat(),
+            "reconciled_at": (
+                datetime.fromtimestamp(reconciled_at, timezone.utc).isoformat() if reconciled_at else None
+            )
+        }
+
+    async def snapshot(self) -> Dict[str, Any]:
+        if self._snapshot is None or time.monotonic() - self._snapshot_at > self.snapshot_ttl:
+            self._snapshot = await self._load_snapshot()
+            self._snapshot_at = time.monotonic()
+        return self._snapshot
+
+    async def needs_initial_reconcile(self) -> bool:
+        row = await fetch_one("SELECT value FROM stats_counters WHERE name = 'reconciled_at'")
+        return row is None
+
+    async def run(self):
+        try:
+            if await self.needs_initial_reconcile():
+                await self.reconcile()
+        except Exception as e:
+            logger.error(f"Stats initial reconcile error: {e}")
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - self._last_reconcile > self.reconcile_interval:
+                    self._last_reconcile = time.monotonic()
+                    await self.reconcile()
+            except Exception as e:
+                logger.error(f"Stats flush error: {e}")
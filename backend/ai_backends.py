@@ -0,0 +1,323 @@
+import os
+import time
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set
+
+from inference import MODALITIES, DEFAULT_CONCURRENCY, InferenceError, InferenceExecutor, InferenceQueueFullError
+
+logger = logging.getLogger(__name__)
+
+# Backend names, comma separated; modalities can be limited per backend with
+# AI_BACKEND_MODALITIES_<NAME>, e.g. AI_BACKEND_MODALITIES_MOCK_B=speech_to_text
+AI_BACKENDS = [name.strip() for name in os.getenv('AI_BACKENDS', 'mock').split(',') if name.strip()]
+AI_BREAKER_FAILURES = int(os.getenv('AI_BREAKER_FAILURES', 5))
+AI_BREAKER_OPEN_SECONDS = float(os.getenv('AI_BREAKER_OPEN_SECONDS', 15))
+AI_HEDGE_PERCENTILE = float(os.getenv('AI_HEDGE_PERCENTILE', 0.95))
+# Hedging waits for this many latency samples of a method before it kicks in
+AI_HEDGE_MIN_SAMPLES = int(os.getenv('AI_HEDGE_MIN_SAMPLES', 20))
+AI_HEDGE_MIN_SECONDS = float(os.getenv('AI_HEDGE_MIN_SECONDS', 0.05))
+AI_MAX_ATTEMPTS = int(os.getenv('AI_MAX_ATTEMPTS', 2))
+LATENCY_WINDOW = 200
+EWMA_WEIGHT = 0.2
+
+
+class BackendUnavailableError(InferenceError):
+    """Raised when every backend for a modality is open-circuit and there's no fallback"""
+    status_code = 503
+
+
+def _text_only_sign(text: str, language: str = "en") -> Dict[str, Any]:
+    return {"success": True, "degraded": True, "video_url": None, "text": text,
+            "duration": 0.0, "processing_time": 0.0, "language": "ASL"}
+
+
+def _text_only_speech(text: str, language: str = "en") -> Dict[str, Any]:
+    return {"success": True, "degraded": True, "audio_url": None, "text": text,
+            "duration": 0.0, "processing_time": 0.0, "language": language}
+
+
+# Degraded results served when no backend can take a call: generated media
+# falls back to the text it would have rendered. Recognition and translation
+# have no honest fallback and fail with 503 instead.
+DEGRADED_FALLBACKS: Dict[str, Callable[..., Any]] = {
+    "text_to_sign_language": _text_only_sign,
+    "text_to_speech": _text_only_speech,
+    "text_to_sign_language_batch": lambda texts, *args: [_text_only_sign(text, *args) for text in texts],
+    "text_to_speech_batch": lambda texts, *args: [_text_only_speech(text, *args) for text in texts],
+}
+
+
+class CircuitBreaker:
+    """Opens after `failures` consecutive failures, then lets a single probe
+    call through every `open_seconds` until one succeeds"""
+
+    def __init__(self, name: str, failures: int = AI_BREAKER_FAILURES, open_seconds: float = AI_BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.failures = failures
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Whether a call may go to this backend now; a True in half-open
+        state reserves the probe, so only call it for the backend you'll use"""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self.state = "half_open"
+            self._probing = False
+        if self.state == "half_open":
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probing = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failures:
+            if self.state != "open":
+                logger.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        # A probe abandoned without a verdict frees the slot for the next one
+        self._probing = False
+
+
+class _ModalityHealth:
+    __slots__ = ("breaker", "inflight", "ewma", "counters")
+
+    def __init__(self, name: str):
+        self.breaker = CircuitBreaker(name)
+        self.inflight = 0
+        self.ewma: Optional[float] = None
+        self.counters = Counter()
+
+
+class Backend:
+    """One service instance with its own executor limits and per-modality health"""
+
+    def __init__(self, name: str, services, modalities: Optional[Iterable[str]] = None):
+        self.name = name
+        self.services = services
+        self.executor = InferenceExecutor(services)
+        self.modalities: Set[str] = set(modalities or DEFAULT_CONCURRENCY)
+        self.health = {modality: _ModalityHealth(f"{name}/{modality}") for modality in self.modalities}
+
+    def stats(self) -> Dict[str, Any]:
+        limits = self.executor.stats()
+        return {
+            modality: {
+                "state": health.breaker.state,
+                "inflight": health.inflight,
+                "ewma_ms": round(health.ewma * 1000, 1) if health.ewma is not None else None,
+                **health.counters,
+                "limits": limits[modality]
+            }
+            for modality, health in self.health.items()
+        }
+
+
+class BackendRouter:
+    """Routes inference calls across several backends per modality.
+
+    Each call goes to the allowed backend with the lowest expected wait,
+    (in-flight calls + 1) x latency EWMA. A call still running at the
+    method's p95 latency is hedged with a duplicate on the next best
+    backend, and the first answer wins. A failure counts against the
+    backend's circuit breaker and fails over to another backend, up to
+    AI_MAX_ATTEMPTS. When every breaker is open, calls get a degraded
+    fallback or BackendUnavailableError. Exposes the InferenceExecutor
+    call/stream interface, so the micro-batcher sits on top unchanged.
+    """
+
+    def __init__(self, backends: List[Backend], max_attempts: int = AI_MAX_ATTEMPTS,
+                 fallbacks: Optional[Dict[str, Callable[..., Any]]] = None):
+        self.backends = backends
+        self.max_attempts = max(max_attempts, 1)
+        self.fallbacks = DEGRADED_FALLBACKS if fallbacks is None else fallbacks
+        self._latencies: Dict[str, deque] = {}
+        self.counters = {modality: Counter() for modality in DEFAULT_CONCURRENCY}
+
+    @classmethod
+    def from_env(cls, services_factory: Callable[[], Any]) -> "BackendRouter":
+        backends = []
+        for name in AI_BACKENDS:
+            modalities = os.getenv(f"AI_BACKEND_MODALITIES_{name.upper().replace('-', '_')}", '')
+            backends.append(Backend(
+                name, services_factory(), [m.strip() for m in modalities.split(',') if m.strip()] or None
+            ))
+        return cls(backends)
+
+    def _pick(self, modality: str, exclude: Set[Backend]) -> Optional[Backend]:
+        candidates = [b for b in self.backends if modality in b.modalities and b not in exclude]
+        known = [b.health[modality].ewma for b in candidates if b.health[modality].ewma is not None]
+        default = min(known) if known else 1.0
+
+        def expected_wait(backend: Backend) -> float:
+            health = backend.health[modality]
+            if health.ewma is None:
+                # An idle backend without samples gets the next call so it earns an estimate
+                return 0.0 if health.inflight == 0 else (health.inflight + 1) * default
+            return (health.inflight + 1) * health.ewma
+
+        for backend in sorted(candidates, key=expected_wait):
+            if backend.health[modality].breaker.allow():
+                return backend
+        return None
+
+    def _hedge_delay(self, method: str) -> Optional[float]:
+        samples = self._latencies.get(method)
+        if not samples or len(samples) < AI_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return max(ordered[min(int(len(ordered) * AI_HEDGE_PERCENTILE), len(ordered) - 1)], AI_HEDGE_MIN_SECONDS)
+
+    async def _attempt(self, backend: Backend, method: str, args: tuple, timeout: Optional[float]) -> Any:
+        health = backend.health[MODALITIES[method]]
+        health.inflight += 1
+
+        def release():
+            health.inflight -= 1
+
+        started = time.perf_counter()
+        try:
+            # In flight until the worker is done, even once this attempt is
+            # abandoned, so routing sees the backend as busy as it really is
+            result = await backend.executor.call(method, *args, timeout=timeout, on_release=release)
+        except InferenceQueueFullError:
+            # Saturated, not broken: fail over without tripping the breaker
+            health.breaker.release_probe()
+            health.counters["rejected"] += 1
+            raise
+        except asyncio.CancelledError:
+            health.breaker.release_probe()
+            raise
+        except Exception:
+            health.breaker.record_failure()
+            health.counters["failures"] += 1
+            raise
+
+        elapsed = time.perf_counter() - started
+        health.breaker.record_success()
+        health.counters["successes"] += 1
+        health.ewma = elapsed if health.ewma is None else health.ewma + EWMA_WEIGHT * (elapsed - health.ewma)
+        self._latencies.setdefault(method, deque(maxlen=LATENCY_WINDOW)).append(elapsed)
+        return result
+
+    def _degraded(self, method: str, args: tuple) -> Any:
+        modality = MODALITIES[method]
+        fallback = self.fallbacks.get(method)
+        if fallback is None:
+            self.counters[modality]["unavailable"] += 1
+            raise BackendUnavailableError(f"No {modality} backend is available, try again later")
+        self.counters[modality]["degraded"] += 1
+        return fallback(*args)
+
+    async def call(self, method: str, *args, timeout: float = None) -> Any:
+        modality = MODALITIES[method]
+        counters = self.counters[modality]
+        tried: Set[Backend] = set()
+        hedges: Set[Backend] = set()
+        backend = self._pick(modality, tried)
+        if backend is None:
+            return self._degraded(method, args)
+
+        tried.add(backend)
+        attempts = {asyncio.create_task(self._attempt(backend, method, args, timeout)): backend}
+        hedge_delay = self._hedge_delay(method) if len(self.backends) > 1 else None
+        last_error: Optional[Exception] = None
+        try:
+            while attempts:
+                done, _ = await asyncio.wait(attempts, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Past the p95 deadline: race a duplicate on the next best backend
+                    hedge_delay = None
+                    hedge = self._pick(modality, tried)
+                    if hedge is not None:
+                        tried.add(hedge)
+                        hedges.add(hedge)
+                        counters["hedges"] += 1
+                        attempts[asyncio.create_task(self._attempt(hedge, method, args, timeout))] = hedge
+                    continue
+
+                for task in done:
+                    winner = attempts.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    if winner in hedges:
+                        counters["hedge_wins"] += 1
+                    elif winner is not backend:
+                        counters["failover_successes"] += 1
+                    return result
+
+                if not attempts and len(tried) < self.max_attempts:
+                    retry = self._pick(modality, tried)
+                    if retry is not None:
+                        tried.add(retry)
+                        counters["failovers"] += 1
+                        hedge_delay = None
+                        attempts[asyncio.create_task(self._attempt(retry, method, args, timeout))] = retry
+        finally:
+            # Losing duplicates stop being awaited; a queued one gives up its
+            # place, a running one keeps its slot and counts as in flight
+            # until its worker finishes
+            for task in attempts:
+                task.cancel()
+
+        raise last_error
+
+    async def stream(self, method: str, chunks: AsyncIterator[bytes], *args) -> AsyncIterator[Dict[str, Any]]:
+        """Streams can't be duplicated or replayed, so they're routed once
+        with no hedging or failover"""
+        modality = MODALITIES[method]
+        backend = self._pick(modality, set())
+        if backend is None:
+            self.counters[modality]["unavailable"] += 1
+            raise BackendUnavailableError(f"No {modality} backend is available, try again later")
+        health = backend.health[modality]
+        health.inflight += 1
+        try:
+            async for item in backend.executor.stream(method, chunks, *args):
+                yield item
+        except InferenceQueueFullError:
+            health.breaker.release_probe()
+            raise
+        except Exception:
+            health.breaker.record_failure()
+            health.counters["failures"] += 1
+            raise
+        else:
+            health.breaker.record_success()
+            health.counters["successes"] += 1
+        finally:
+            health.breaker.release_probe()
+            health.inflight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backends": {backend.name: backend.stats() for backend in self.backends},
+            "routing": {modality: dict(counters) for modality, counters in self.counters.items()},
+            "hedge_after_ms": {
+                method: round(delay * 1000, 1)
+                for method in self._latencies if (delay := self._hedge_delay(method)) is not None
+            }
+        }
+
+    def shutdown(self):
+        for backend in self.backends:
+            backend.executor.shutdown()
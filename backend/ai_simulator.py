@@ -0,0 +1,196 @@
+import os
+import json
+import stat
+import time
+import wave
+import random
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from inference import InferenceError
+from uploads import UPLOAD_DIR
+
+# Off by default: every call then takes its method's fixed legacy latency
+AI_SIMULATOR = os.getenv('AI_SIMULATOR', '').lower() in ('1', 'true', 'on')
+AI_SIM_SEED = os.getenv('AI_SIM_SEED')
+# JSON object of per-method overrides, e.g. {"speech_to_text": {"error_rate": 0.01}}
+AI_SIM_PROFILES = os.getenv('AI_SIM_PROFILES', '')
+AI_SIM_ERROR_RATE = os.getenv('AI_SIM_ERROR_RATE')
+AI_SIM_TIMEOUT_RATE = os.getenv('AI_SIM_TIMEOUT_RATE')
+# A simulated timeout hangs this long, past the executor's INFERENCE_TIMEOUT
+AI_SIM_HANG_SECONDS = float(os.getenv('AI_SIM_HANG_SECONDS', 60))
+
+# Input size estimates when a file can't be measured directly
+AUDIO_BYTES_PER_SECOND = 32000  # 16 kHz, 16-bit mono
+VIDEO_BYTES_PER_FRAME = 20000
+
+# Latency with the simulator off, matching the mock's original sleeps
+FIXED_SECONDS = {
+    "sign_language_to_text": 1.5,
+    "text_to_sign_language": 1.2,
+    "speech_to_text": 1.0,
+    "text_to_speech": 0.8,
+    "translate_text": 0.5,
+    "speech_to_text_stream": 0.1,
+    "sign_language_to_text_stream": 0.15,
+}
+
+# base: fixed seconds per call; per_unit: seconds per word, audio second or
+# video frame; sigma: log-normal spread around the median; tail_probability
+# and tail_alpha: chance of a Pareto-distributed slowdown and its shape
+# (lower is heavier); cpu_fraction: share of the latency spent computing
+# rather than waiting. Defaults land near FIXED_SECONDS for typical inputs.
+DEFAULT_PROFILE = {
+    "base": 0.0,
+    "per_unit": 0.0,
+    "sigma": 0.25,
+    "tail_probability": 0.02,
+    "tail_alpha": 1.5,
+    "max_tail_factor": 20.0,
+    "cpu_fraction": 0.5,
+    "error_rate": 0.0,
+    "timeout_rate": 0.0,
+}
+
+DEFAULT_PROFILES = {
+    "sign_language_to_text": {"base": 0.6, "per_unit": 0.01, "cpu_fraction": 0.9},
+    "text_to_sign_language": {"base": 0.6, "per_unit": 0.1, "cpu_fraction": 0.7},
+    "speech_to_text": {"base": 0.4, "per_unit": 0.2, "cpu_fraction": 0.8},
+    "text_to_speech": {"base": 0.3, "per_unit": 0.08, "cpu_fraction": 0.6},
+    "translate_text": {"base": 0.3, "per_unit": 0.03, "cpu_fraction": 0.5},
+    "speech_to_text_stream": {"base": 0.1, "cpu_fraction": 0.8, "tail_probability": 0.0},
+    "sign_language_to_text_stream": {"base": 0.15, "cpu_fraction": 0.9, "tail_probability": 0.0},
+}
+
+# Extra fixed cost of each additional item in a batch, as a fraction of base;
+# real ASR/MT models amortize most of their per-call overhead across a batch
+BATCH_ITEM_COST = 0.1
+
+
+class SimulatedServiceError(InferenceError):
+    """An injected model failure"""
+    status_code = 502
+
+
+def word_count(text: str) -> int:
+    return max(len((text or "").split()), 1)
+
+
+def _upload_size(content: str) -> Optional[int]:
+    """Size of the spooled upload `content` names, or None when it isn't a
+    regular file in the upload directory. Anything else came straight from
+    a client and is never opened or stat'ed."""
+    try:
+        path = os.path.realpath(content)
+        if os.path.dirname(path) != os.path.realpath(UPLOAD_DIR):
+            return None
+        info = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return info.st_size if stat.S_ISREG(info.st_mode) else None
+
+
+def audio_seconds(content: str) -> float:
+    size = _upload_size(content)
+    if size is None:
+        return len(content or "") / AUDIO_BYTES_PER_SECOND
+    try:
+        with wave.open(content, "rb") as audio:
+            return audio.getnframes() / audio.getframerate()
+    except (OSError, EOFError, wave.Error):
+        return size / AUDIO_BYTES_PER_SECOND
+
+
+def video_frames(content: str) -> float:
+    size = _upload_size(content)
+    return (len(content or "") if size is None else size) / VIDEO_BYTES_PER_FRAME
+
+
+def _burn_cpu(seconds: float):
+    # Pure-Python work holds the GIL like model pre/post-processing does, so
+    # thread workers contend for one core while process workers spread out
+    end = time.perf_counter() + seconds
+    value = 0
+    while time.perf_counter() < end:
+        for i in range(1000):
+            value ^= i * i
+
+
+class LatencySimulator:
+    """Latency and failure model behind MockAIServices for capacity tests.
+
+    Each call's latency is base + per_unit * input size, scaled by a
+    log-normal factor and occasionally by a heavy Pareto tail, then split
+    into CPU work and idle waiting. Draws come from an RNG seeded by
+    (seed, method, input, occurrence), so a seeded run reproduces the same
+    latencies and failures for the same traffic however calls interleave.
+    """
+
+    def __init__(self, enabled: bool = AI_SIMULATOR, seed: Optional[str] = AI_SIM_SEED,
+                 profiles: Optional[Dict[str, Dict[str, Any]]] = None, hang_seconds: float = AI_SIM_HANG_SECONDS):
+        self.enabled = enabled
+        self.seed = seed
+        self.hang_seconds = hang_seconds
+        self.profiles = {}
+        for method, profile in DEFAULT_PROFILES.items():
+            self.profiles[method] = {**DEFAULT_PROFILE, **profile, **(profiles or {}).get(method, {})}
+        self._occurrences: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LatencySimulator":
+        profiles = json.loads(AI_SIM_PROFILES) if AI_SIM_PROFILES else {}
+        for method in DEFAULT_PROFILES:
+            overrides = profiles.setdefault(method, {})
+            if AI_SIM_ERROR_RATE is not None:
+                overrides.setdefault("error_rate", float(AI_SIM_ERROR_RATE))
+            if AI_SIM_TIMEOUT_RATE is not None:
+                overrides.setdefault("timeout_rate", float(AI_SIM_TIMEOUT_RATE))
+        return cls(profiles=profiles)
+
+    def rng(self, method: str, key: str) -> random.Random:
+        """RNG for one call; unseeded unless a seed is configured"""
+        if self.seed is None:
+            return random.Random()
+        digest = hashlib.sha256(f"{method}:{key}".encode("utf-8")).hexdigest()
+        with self._lock:
+            occurrence = self._occurrences.pop(digest, 0)
+            self._occurrences[digest] = occurrence + 1
+            if len(self._occurrences) > 100000:
+                self._occurrences.popitem(last=False)
+        return random.Random(f"{self.seed}:{digest}:{occurrence}")
+
+    def latency(self, method: str, units: float, rng: random.Random, batch_size: int = 1) -> float:
+        if not self.enabled:
+            return FIXED_SECONDS[method] * (1 + BATCH_ITEM_COST * (batch_size - 1))
+        profile = self.profiles[method]
+        seconds = profile["base"] * (1 + BATCH_ITEM_COST * (batch_size - 1)) + profile["per_unit"] * units
+        seconds *= rng.lognormvariate(0, profile["sigma"])
+        if rng.random() < profile["tail_probability"]:
+            seconds *= min(rng.paretovariate(profile["tail_alpha"]), profile["max_tail_factor"])
+        return seconds
+
+    def run(self, method: str, units: float, rng: random.Random, batch_size: int = 1):
+        """Spends the call's simulated time, raising or hanging when a
+        failure is drawn"""
+        seconds = self.latency(method, units, rng, batch_size)
+        if self.enabled:
+            profile = self.profiles[method]
+            draw = rng.random()
+            if draw < profile["timeout_rate"]:
+                time.sleep(self.hang_seconds)
+                raise SimulatedServiceError(f"{method} simulated hang")
+            if draw < profile["timeout_rate"] + profile["error_rate"]:
+                # Failures surface part-way through the work
+                seconds *= rng.random()
+                time.sleep(seconds)
+                raise SimulatedServiceError(f"{method} simulated failure")
+            cpu_seconds = seconds * profile["cpu_fraction"]
+            _burn_cpu(cpu_seconds)
+            seconds -= cpu_seconds
+        time.sleep(seconds)
+
+
+simulator = LatencySimulator.from_env()
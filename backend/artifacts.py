@@ -0,0 +1,417 @@
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from database import fetch_one, fetch_all, execute_many, named_lock
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_DIR = Path(os.getenv('ARTIFACT_DIR', Path(__file__).parent / 'generated_media'))
+ARTIFACT_MAX_BYTES = int(os.getenv('ARTIFACT_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+ARTIFACT_CACHE_SECONDS = int(os.getenv('ARTIFACT_CACHE_SECONDS', 31536000))
+ARTIFACT_GC_SECONDS = float(os.getenv('ARTIFACT_GC_SECONDS', 3600))
+# Unreferenced artifacts younger than this may still be reachable through the translation cache
+ARTIFACT_ORPHAN_SECONDS = int(os.getenv('ARTIFACT_ORPHAN_SECONDS', 7 * 86400))
+# When set (e.g. "/internal-artifacts/"), responses hand the file to nginx via X-Accel-Redirect
+ARTIFACT_ACCEL_REDIRECT = os.getenv('ARTIFACT_ACCEL_REDIRECT', '')
+ARTIFACT_READ_CHUNK = 256 * 1024
+ARTIFACT_REFERENCE_BATCH = 500
+
+# Kind -> (URL prefix, file extension, media type)
+ARTIFACT_KINDS = {
+    "sign-video": ("/api/mock/sign-video/", "mp4", "video/mp4"),
+    "audio": ("/api/mock/audio/", "wav", "audio/wav"),
+}
+
+_ARTIFACT_ID = re.compile(r"[0-9a-f]{16}")
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class ArtifactNotFoundError(Exception):
+    pass
+
+
+def parse_artifact_url(url: str) -> Optional[Tuple[str, str]]:
+    """Returns (kind, artifact_id) for a generated media URL, or None"""
+    for kind, (prefix, _, _) in ARTIFACT_KINDS.items():
+        if url.startswith(prefix) and _ARTIFACT_ID.fullmatch(url[len(prefix):]):
+            return kind, url[len(prefix):]
+    return None
+
+
+def _count_references(counts: Counter) -> Tuple[str, Tuple]:
+    params = tuple(value for (kind, artifact_id), refs in counts.items() for value in (kind, artifact_id, refs))
+    return (
+        f"""INSERT INTO artifact_references (kind, artifact_id, refs)
+            VALUES {', '.join(['(%s, %s, %s)'] * len(counts))}
+            ON DUPLICATE KEY UPDATE refs = refs + VALUES(refs)""",
+        params
+    )
+
+
+def reference_statement(urls: Iterable[str]) -> Optional[Tuple[str, Tuple]]:
+    """(query, params) counting a reference for every generated media URL
+    among `urls`, or None when there are none; run it in the transaction
+    that writes the rows holding the URLs"""
+    counts = Counter(parsed for parsed in map(parse_artifact_url, urls) if parsed)
+    return _count_references(counts) if counts else None
+
+
+def dereference_statement(url: str) -> Optional[Tuple[str, Tuple]]:
+    """(query, params) dropping the reference a deleted row held, or None"""
+    parsed = parse_artifact_url(url or "")
+    if parsed is None:
+        return None
+    return (
+        "UPDATE artifact_references SET refs = GREATEST(refs - 1, 0) WHERE kind = %s AND artifact_id = %s",
+        parsed
+    )
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Single `bytes=` range as inclusive (start, end); None means serve the
+    whole file. Raises ValueError when the range can't be satisfied."""
+    if not header:
+        return None
+    match = _RANGE.fullmatch(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        # Multi-range and malformed requests get the full representation
+        return None
+    if match.group(1) == "":
+        length = int(match.group(2))
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(match.group(1))
+    end = int(match.group(2)) if match.group(2) else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, min(end, size - 1)
+
+
+class ArtifactResponse(Response):
+    """Sends a byte range of a file without copying it through Python when the
+    server supports the ASGI pathsend/zerocopysend extensions; otherwise it
+    streams the range with pread in a worker thread."""
+
+    def __init__(self, path: Path, start: int, end: int, status_code: int,
+                 headers: Dict[str, str], media_type: str, head: bool = False):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.length = end - start + 1
+        self.head = head
+        self.headers["content-length"] = str(self.length)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.head or self.length <= 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extensions = scope.get("extensions") or {}
+        full_file = self.start == 0 and self.length == self.path.stat().st_size
+        if full_file and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopysend" in extensions:
+                await send({"type": "http.response.zerocopysend", "file": f.fileno(),
+                            "offset": self.start, "count": self.length})
+                return
+            offset, remaining = self.start, self.length
+            while remaining > 0:
+                chunk = await asyncio.to_thread(os.pread, f.fileno(), min(ARTIFACT_READ_CHUNK, remaining), offset)
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b""})
+
+
+class ArtifactStore:
+    """Content-addressed generated media on local disk.
+
+    Artifacts are keyed by the same input hash the AI services put in their
+    URLs, so repeat requests never regenerate. Each media file has a small
+    JSON sidecar holding the text it was rendered from; eviction only removes
+    the media, and a later request re-renders it from the sidecar.
+    """
+
+    def __init__(self, root: Path = ARTIFACT_DIR, max_bytes: int = ARTIFACT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        for kind in ARTIFACT_KINDS:
+            (self.root / kind).mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._referenced = set()
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self.hits = 0
+        self.renders = 0
+        self.evictions = 0
+
+    def _path(self, kind: str, artifact_id: str) -> Path:
+        return self.root / kind / f"{artifact_id}.{ARTIFACT_KINDS[kind][1]}"
+
+    def _sidecar(self, kind: str, artifact_id: str) -> Path:
+        return self.root / kind / f"{artifact_id}.json"
+
+    def _load(self):
+        """Rebuilds the LRU order from file mtimes the first time it's needed"""
+        if self._loaded:
+            return
+        found = []
+        for kind, (_, extension, _) in ARTIFACT_KINDS.items():
+            for path in (self.root / kind).glob(f"*.{extension}"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_mtime, kind, path.stem, stat.st_size))
+        for _, kind, artifact_id, size in sorted(found):
+            self._entries[(kind, artifact_id)] = size
+            self._total_bytes += size
+        self._loaded = True
+
+    def _touch(self, kind: str, artifact_id: str, size: int):
+        with self._lock:
+            self._load()
+            key = (kind, artifact_id)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                self._entries[key] = size
+                self._total_bytes += size
+
+    def _evict(self):
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+            # The newest artifact always survives so it can be served at least once
+            newest = next(reversed(self._entries))
+            # Artifacts no translation_history row points at go first
+            for referenced_pass in (False, True):
+                for key in list(self._entries):
+                    if self._total_bytes <= self.max_bytes:
+                        return
+                    if key == newest or (key[1] in self._referenced) != referenced_pass:
+                        continue
+                    size = self._entries.pop(key)
+                    self._total_bytes -= size
+                    self.evictions += 1
+                    try:
+                        self._path(*key).unlink()
+                    except FileNotFoundError:
+                        pass
+
+    def _write(self, kind: str, artifact_id: str, text: str, language: str, data: bytes):
+        sidecar = self._sidecar(kind, artifact_id)
+        if not sidecar.exists():
+            sidecar.write_text(json.dumps({"text": text, "language": language, "created_at": time.time()}))
+        path = self._path(kind, artifact_id)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    async def ensure(self, kind: str, artifact_id: str, text: str, language: str,
+                     render: Callable[[str, str], bytes]):
+        """Makes sure the artifact exists on disk, rendering it at most once"""
+        path = self._path(kind, artifact_id)
+        key = (kind, artifact_id)
+        if path.exists():
+            return
+        if key in self._inflight:
+            await asyncio.shield(self._inflight[key])
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await asyncio.to_thread(render, text, language)
+            await asyncio.to_thread(self._write, kind, artifact_id, text, language, data)
+            self.renders += 1
+            self._touch(kind, artifact_id, len(data))
+            await asyncio.to_thread(self._evict)
+            future.set_result(None)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def open(self, kind: str, artifact_id: str, render: Callable[[str, str], bytes]) -> Path:
+        """Path of a servable artifact, re-rendering an evicted one from its sidecar"""
+        if kind not in ARTIFACT_KINDS or not _ARTIFACT_ID.fullmatch(artifact_id):
+            raise ArtifactNotFoundError("Artifact not found")
+        path = self._path(kind, artifact_id)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            try:
+                source = json.loads(self._sidecar(kind, artifact_id).read_text())
+            except (FileNotFoundError, ValueError):
+                raise ArtifactNotFoundError("Artifact not found")
+            await self.ensure(kind, artifact_id, source['text'], source['language'], render)
+            return path
+
+        self.hits += 1
+        self._touch(kind, artifact_id, stat.st_size)
+        if time.time() - stat.st_mtime > 60:
+            # mtime is the LRU order other processes (and restarts) see
+            os.utime(path)
+        return path
+
+    def response(self, kind: str, path: Path, headers, method: str = "GET") -> Response:
+        """Builds a conditional, range-aware response for an artifact file"""
+        size = path.stat().st_size
+        etag = f'"{path.stem}"'
+        media_type = ARTIFACT_KINDS[kind][2]
+        common = {
+            "etag": etag,
+            "accept-ranges": "bytes",
+            "cache-control": f"public, max-age={ARTIFACT_CACHE_SECONDS}, immutable",
+        }
+
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+            return Response(status_code=304, headers=common)
+
+        byte_range = None
+        if_range = headers.get("if-range")
+        if not if_range or if_range.strip() == etag:
+            try:
+                byte_range = parse_range(headers.get("range"), size)
+            except ValueError:
+                return Response(status_code=416, headers={**common, "content-range": f"bytes */{size}"})
+
+        start, end = byte_range or (0, size - 1)
+        status_code = 206 if byte_range else 200
+        if byte_range:
+            common["content-range"] = f"bytes {start}-{end}/{size}"
+
+        if ARTIFACT_ACCEL_REDIRECT:
+            # nginx re-applies Range itself and serves the file with sendfile
+            common.pop("content-range", None)
+            return Response(status_code=200, media_type=media_type, headers={
+                **common, "x-accel-redirect": f"{ARTIFACT_ACCEL_REDIRECT.rstrip('/')}/{kind}/{path.name}"
+            })
+        return ArtifactResponse(path, start, end, status_code, common, media_type, head=method == "HEAD")
+
+    async def refresh_references(self):
+        """Looks up which artifacts on disk are still referenced. History
+        writes and deletes keep artifact_references counted, archived rows
+        included, so only the artifacts this store holds are queried."""
+        on_disk = {
+            kind: [sidecar.stem for sidecar in (self.root / kind).glob("*.json")]
+            for kind in ARTIFACT_KINDS
+        }
+        referenced = set()
+        for kind, artifact_ids in on_disk.items():
+            for offset in range(0, len(artifact_ids), ARTIFACT_REFERENCE_BATCH):
+                batch = artifact_ids[offset:offset + ARTIFACT_REFERENCE_BATCH]
+                rows = await fetch_all(
+                    f"""SELECT artifact_id FROM artifact_references
+                        WHERE kind = %s AND artifact_id IN ({', '.join(['%s'] * len(batch))}) AND refs > 0""",
+                    (kind, *batch)
+                )
+                referenced.update(row['artifact_id'] for row in rows or [])
+        self._referenced = referenced
+
+    async def count_archived_references(self, archive) -> bool:
+        """One-time count of references held by history rows archived before
+        artifact_references existed (migration 008 counts the rows still in
+        MySQL). Returns whether the count exists; a stats_counters flag
+        records it. Runs under the archive's compaction lock, so no month is
+        rewritten mid-scan and no two processes count at once."""
+        done = "SELECT value FROM stats_counters WHERE name = 'artifact_references_archived'"
+        if await fetch_one(done, replica=False):
+            return True
+        async with named_lock("history_archive") as acquired:
+            if not acquired or await fetch_one(done, replica=False):
+                return bool(acquired)
+            counts = await archive.count_values(
+                "translation_history", "output_content", lambda url: parse_artifact_url(url or "")
+            )
+            keys = list(counts)
+            for offset in range(0, len(keys), ARTIFACT_REFERENCE_BATCH):
+                batch = Counter({key: counts[key] for key in keys[offset:offset + ARTIFACT_REFERENCE_BATCH]})
+                await execute_many([_count_references(batch)])
+            await execute_many([(
+                "INSERT INTO stats_counters (name, value) VALUES ('artifact_references_archived', %s)",
+                (sum(counts.values()),)
+            )])
+            logger.info(f"Counted {sum(counts.values())} archived artifact references")
+            return True
+
+    def remove_orphans(self, max_age: int = ARTIFACT_ORPHAN_SECONDS) -> int:
+        """Deletes artifacts and sidecars that no history row, hot or
+        archived, references"""
+        cutoff = time.time() - max_age
+        removed = 0
+        for kind in ARTIFACT_KINDS:
+            for sidecar in (self.root / kind).glob("*.json"):
+                artifact_id = sidecar.stem
+                if artifact_id in self._referenced:
+                    continue
+                try:
+                    if sidecar.stat().st_mtime >= cutoff:
+                        continue
+                    with self._lock:
+                        size = self._entries.pop((kind, artifact_id), None)
+                        if size is not None:
+                            self._total_bytes -= size
+                    self._path(kind, artifact_id).unlink(missing_ok=True)
+                    sidecar.unlink()
+                    removed += 1
+                except OSError as e:
+                    logger.error(f"Artifact cleanup error for {sidecar.name}: {e}")
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._load()
+            return {
+                "artifacts": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "referenced": len(self._referenced),
+                "hits": self.hits,
+                "renders": self.renders,
+                "evictions": self.evictions
+            }
+
+    async def run(self, archive=None, interval: float = ARTIFACT_GC_SECONDS):
+        counted = archive is None
+        while True:
+            try:
+                # Nothing is removed until archived history has been counted
+                counted = counted or await self.count_archived_references(archive)
+                if counted:
+                    await self.refresh_references()
+                    removed = await asyncio.to_thread(self.remove_orphans)
+                    if removed:
+                        logger.info(f"Removed {removed} unreferenced artifacts")
+                await asyncio.to_thread(self._evict)
+            except Exception as e:
+                logger.error(f"Artifact GC error: {e}")
+            await asyncio.sleep(interval)
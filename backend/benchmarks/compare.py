@@ -0,0 +1,69 @@
+"""Compares two load-test reports endpoint by endpoint.
+
+Run from the backend directory:
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Exits non-zero when any endpoint's p95 or throughput regressed by more
+than --threshold percent, so it can gate CI runs.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms")
+# For these a larger value is worse
+HIGHER_IS_WORSE = {"p50_ms", "p95_ms", "p99_ms"}
+
+
+def _change(old: float, new: float) -> float:
+    if not old:
+        return 0.0
+    return round((new - old) / old * 100, 1)
+
+
+def compare(baseline: dict, candidate: dict, threshold: float) -> dict:
+    endpoints = {}
+    regressions = []
+    names = sorted(set(baseline.get("endpoints", {})) | set(candidate.get("endpoints", {})))
+    for name in names:
+        old = baseline.get("endpoints", {}).get(name)
+        new = candidate.get("endpoints", {}).get(name)
+        if old is None or new is None:
+            endpoints[name] = {"only_in": "candidate" if old is None else "baseline"}
+            continue
+        entry = {}
+        for metric in METRICS:
+            change = _change(old[metric], new[metric])
+            entry[metric] = {"baseline": old[metric], "candidate": new[metric], "change_pct": change}
+            worse = change if metric in HIGHER_IS_WORSE else -change
+            if metric in ("rps", "p95_ms") and worse > threshold:
+                regressions.append(f"{name} {metric} {change:+.1f}%")
+        endpoints[name] = entry
+    return {
+        "benchmark": "compare",
+        "baseline_commit": baseline.get("git_commit"),
+        "candidate_commit": candidate.get("git_commit"),
+        "threshold_pct": threshold,
+        "total": {metric: {"baseline": baseline.get(metric), "candidate": candidate.get(metric),
+                           "change_pct": _change(baseline.get(metric) or 0, candidate.get(metric) or 0)}
+                  for metric in METRICS},
+        "endpoints": endpoints,
+        "regressions": regressions
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10, help="allowed regression in percent")
+    args = parser.parse_args()
+    result = compare(json.loads(Path(args.baseline).read_text()), json.loads(Path(args.candidate).read_text()),
+                     args.threshold)
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
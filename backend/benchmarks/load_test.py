@@ -0,0 +1,345 @@
+"""Drives a realistic request mix against the API and reports latency percentiles.
+
+Seed the database first (python -m benchmarks.seed), then run from the
+backend directory:
+    python -m benchmarks.load_test --duration 60 --concurrency 50 --output run.json
+
+By default a uvicorn server is started on a free local port with the
+current tree; pass --url to target an already running deployment instead.
+Compare two runs with python -m benchmarks.compare old.json new.json.
+Add --simulate to give the mock AI services realistic, seeded latencies
+(see ai_simulator for the AI_SIM_* knobs).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import websockets
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+DEFAULT_MIX = "login=1,translate=5,history=3,live=2,admin=1"
+PHRASES = (
+    "Hello", "Thank you", "Good morning, how are you?", "I need help with my appointment",
+    "Where is the nearest hospital?", "Please speak slowly", "Nice to meet you",
+)
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Per-endpoint latency samples, keyed by method and route template"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    def record(self, endpoint: str, seconds: float, status: int):
+        if not self.recording:
+            return
+        self.samples[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+        if status >= 400 or status == 0:
+            self.errors[endpoint] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, values in sorted(self.samples.items()):
+            values = sorted(values)
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors[endpoint],
+                "statuses": {str(code): count for code, count in sorted(self.statuses[endpoint].items())},
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2)
+            }
+        every = sorted(v for values in self.samples.values() for v in values)
+        return {
+            "requests": len(every),
+            "errors": sum(self.errors.values()),
+            "rps": round(len(every) / elapsed, 2),
+            "p50_ms": round(percentile(every, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(every, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(every, 0.99) * 1000, 2),
+            "endpoints": endpoints
+        }
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random,
+                 email: str, password: str, ws_url: str):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.email = email
+        self.password = password
+        self.ws_url = ws_url
+        self.token = None
+
+    @property
+    def headers(self):
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+    async def request(self, endpoint: str, method: str, path: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, headers=self.headers, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(endpoint, time.perf_counter() - start, 0)
+            return None
+        self.recorder.record(endpoint, time.perf_counter() - start, response.status_code)
+        return response
+
+    async def login(self):
+        response = await self.request("POST /api/auth/login", "POST", "/api/auth/login",
+                                      json={"email": self.email, "password": self.password})
+        if response is not None and response.status_code == 200:
+            self.token = response.json()["token"]
+
+    async def translate(self):
+        text = self.rng.choice(PHRASES)
+        output_type = self.rng.choices(("text", "sign", "audio"), weights=(6, 3, 1))[0]
+        await self.request("POST /api/translate", "POST", "/api/translate", json={
+            "input_type": "text", "input_content": text, "input_language": "en",
+            "output_type": output_type, "output_language": "ar" if output_type == "text" else "en"
+        })
+
+    async def history(self):
+        cursor = None
+        # Most users look at the first page; some keep scrolling
+        for _ in range(self.rng.choice((1, 1, 1, 2, 3))):
+            params = {"limit": 20}
+            if cursor:
+                params["cursor"] = cursor
+            response = await self.request("GET /api/translations/history", "GET", "/api/translations/history",
+                                          params=params)
+            if response is None or response.status_code != 200:
+                return
+            cursor = response.json().get("next_cursor")
+            if not cursor:
+                return
+
+    async def live(self, messages: int):
+        response = await self.request("POST /api/live-session/start", "POST", "/api/live-session/start")
+        if response is None or response.status_code != 200:
+            return
+        session_id = response.json()["session_id"]
+        url = f"{self.ws_url}/api/live-session/{session_id}/ws?token={self.token}"
+        try:
+            async with websockets.connect(url) as ws:
+                for i in range(messages):
+                    start = time.perf_counter()
+                    await ws.send(json.dumps({
+                        "type": "message", "id": i, "message_type": "text",
+                        "original_content": self.rng.choice(PHRASES), "translated_content": ""
+                    }))
+                    # Skip server heartbeats until the ack for this frame arrives
+                    while json.loads(await ws.recv()).get("id") != i:
+                        pass
+                    self.recorder.record("WS /api/live-session/{session_id}/ws message",
+                                         time.perf_counter() - start, 200)
+        except (OSError, websockets.WebSocketException):
+            self.recorder.record("WS /api/live-session/{session_id}/ws message", 0.0, 0)
+        await self.request("POST /api/live-session/{session_id}/end", "POST",
+                           f"/api/live-session/{session_id}/end")
+
+
+async def admin_stats(client: httpx.AsyncClient, recorder: Recorder, token: str):
+    start = time.perf_counter()
+    try:
+        response = await client.get("/api/admin/stats", headers={"Authorization": f"Bearer {token}"})
+        status = response.status_code
+    except httpx.HTTPError:
+        status = 0
+    recorder.record("GET /api/admin/stats", time.perf_counter() - start, status)
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - {"login", "translate", "history", "live", "admin"}
+    if unknown:
+        raise SystemExit(f"Unknown scenarios in --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+async def run(args) -> dict:
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    scenarios, weights = zip(*mix.items())
+    ws_url = args.url.replace("http", "ws", 1)
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        admin = await client.post("/api/auth/login", json={"email": args.admin_email, "password": args.admin_password})
+        admin_token = admin.json().get("token") if admin.status_code == 200 else None
+
+        users = [
+            VirtualUser(client, recorder, random.Random(rng.random()),
+                        f"loadtest{rng.randrange(args.users)}@example.com", args.password, ws_url)
+            for _ in range(args.concurrency)
+        ]
+        # Log everyone in before the clock starts; the login scenario measures storms separately
+        await asyncio.gather(*(user.login() for user in users))
+
+        deadline = None
+
+        async def drive(user: VirtualUser):
+            while time.perf_counter() < deadline:
+                scenario = user.rng.choices(scenarios, weights=weights)[0]
+                if scenario == "login" or not user.token:
+                    await user.login()
+                elif scenario == "translate":
+                    await user.translate()
+                elif scenario == "history":
+                    await user.history()
+                elif scenario == "live":
+                    await user.live(args.live_messages)
+                elif scenario == "admin" and admin_token:
+                    await admin_stats(client, recorder, admin_token)
+                if args.think_time:
+                    await asyncio.sleep(user.rng.expovariate(1 / args.think_time))
+
+        deadline = time.perf_counter() + args.warmup
+        await asyncio.gather(*(drive(user) for user in users))
+
+        recorder.recording = True
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(drive(user) for user in users))
+        elapsed = time.perf_counter() - started
+
+        server_metrics = None
+        if args.scrape_metrics:
+            response = await client.get("/metrics")
+            if response.status_code == 200:
+                server_metrics = response.text
+
+    result = {
+        "benchmark": "load_test",
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "config": {
+            "url": args.url,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "concurrency": args.concurrency,
+            "mix": mix,
+            "users": args.users,
+            "live_messages": args.live_messages,
+            "think_time_s": args.think_time,
+            "seed": args.seed,
+            "simulated_ai": args.simulate and not args.external,
+            "server_workers": None if args.external else args.workers
+        },
+        "elapsed_s": round(elapsed, 3),
+        **recorder.summary(elapsed)
+    }
+    if server_metrics is not None:
+        result["server_metrics"] = server_metrics
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, simulate_seed: int = None):
+    port = _free_port()
+    env = {**os.environ, "TRACE_SLOW_SECONDS": os.getenv("TRACE_SLOW_SECONDS", "5")}
+    if simulate_seed is not None:
+        # Size-dependent, heavy-tailed AI latencies instead of the fixed mock sleeps
+        env.update(AI_SIMULATOR="1", AI_SIM_SEED=str(simulate_seed))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(120):
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/api/", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise SystemExit("Server did not become ready within 60s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target an existing server instead of starting one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the local server")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario weights, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--users", type=int, default=1000, help="seeded users to log in as")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--admin-email", default="admin@jusoor.com")
+    parser.add_argument("--admin-password", default="admin123")
+    parser.add_argument("--live-messages", type=int, default=10, help="messages per live session")
+    parser.add_argument("--think-time", type=float, default=0, help="mean seconds between a user's actions")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--simulate", action="store_true",
+                        help="run the local server's AI services under the latency simulator, seeded with --seed")
+    parser.add_argument("--scrape-metrics", action="store_true", help="include the server's /metrics in the output")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    args.external = bool(args.url)
+    process = None
+    if not args.external:
+        process, args.url = start_server(args.workers, args.seed if args.simulate else None)
+    try:
+        result = asyncio.run(run(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    report = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Measures bcrypt login throughput through PasswordHasher.
+
+Run from the backend directory:
+    python -m benchmarks.password_hashing --logins 200 --rounds 12
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+
+async def run(logins: int, workers: int) -> dict:
+    # Imported here so --rounds can set BCRYPT_ROUNDS before auth reads it
+    from auth import BCRYPT_ROUNDS, PasswordHasher, hash_password, verify_and_update_password
+
+    password = "benchmark-password"
+    stored_hash = hash_password(password)
+
+    start = time.perf_counter()
+    verify_and_update_password(password, stored_hash)
+    single = time.perf_counter() - start
+
+    hasher = PasswordHasher(workers=workers, max_queue=logins)
+    # Spawn the pool outside the timed region
+    await hasher.verify_and_update(password, stored_hash)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[hasher.verify_and_update(password, stored_hash) for _ in range(logins)])
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+
+    assert all(valid for valid, _ in results)
+    logins_per_sec = logins / elapsed
+    return {
+        "benchmark": "password_hashing",
+        "rounds": BCRYPT_ROUNDS,
+        "workers": workers,
+        "logins": logins,
+        "single_verify_ms": round(single * 1000, 2),
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_sec": round(logins_per_sec, 2),
+        "logins_per_sec_per_core": round(logins_per_sec / workers, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rounds", type=int, default=None, help="bcrypt cost, defaults to BCRYPT_ROUNDS")
+    args = parser.parse_args()
+    if args.rounds is not None:
+        os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    print(json.dumps(asyncio.run(run(args.logins, args.workers))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Seeds the configured MySQL/MariaDB database with synthetic load-test data.
+
+Run from the backend directory against a disposable database created from
+database/schema.sql:
+    python -m benchmarks.seed --users 1000 --history 1000000 --feedback 20000
+
+Every seeded user is loadtest<N>@example.com with the password given by
+--password, so the load test can log in as any of them.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+LANGUAGES = ("en", "ar")
+TRANSLATION_KINDS = (
+    ("text", "text", 0.55),
+    ("text", "sign", 0.2),
+    ("text", "audio", 0.1),
+    ("audio", "text", 0.1),
+    ("video", "text", 0.05),
+)
+PHRASES = (
+    "Hello", "Thank you", "Good morning", "How are you", "I need help",
+    "Where is the hospital", "Please speak slowly", "Nice to meet you",
+    "What time is it", "I am learning sign language",
+)
+
+
+def _chunks(total: int, size: int):
+    for start in range(0, total, size):
+        yield start, min(size, total - start)
+
+
+def _history_row(rng: random.Random, user_id: int, created_at: datetime):
+    input_type, output_type, _ = rng.choices(TRANSLATION_KINDS, weights=[k[2] for k in TRANSLATION_KINDS])[0]
+    source, target = rng.sample(LANGUAGES, 2) if output_type == "text" and input_type == "text" else ("en", "en")
+    content = rng.choice(PHRASES) if input_type == "text" else f"/uploads/seed-{rng.randrange(10 ** 6)}"
+    return (user_id, input_type, content, source, output_type, f"[{target.upper()}] {content}", target,
+            round(rng.uniform(0.2, 2.0), 2), created_at)
+
+
+def seed(users: int, history: int, feedback: int, days: int, batch: int, password: str, seed_value: int) -> dict:
+    # Imported here so the CLI's --help works without database settings
+    from auth import hash_password
+    from database import get_db_connection
+
+    rng = random.Random(seed_value)
+    now = datetime.now().replace(microsecond=0)
+    password_hash = hash_password(password)
+    timings = {}
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            start = time.perf_counter()
+            cursor.execute("SELECT COALESCE(MAX(id), 0) AS id FROM users")
+            first_user = cursor.fetchone()['id'] + 1
+            for offset, count in _chunks(users, batch):
+                cursor.executemany(
+                    """INSERT IGNORE INTO users (email, password_hash, full_name, role, preferred_language, created_at)
+                       VALUES (%s, %s, %s, 'user', %s, %s)""",
+                    [(f"loadtest{offset + i}@example.com", password_hash, f"Load Test {offset + i}",
+                      rng.choice(LANGUAGES), now - timedelta(days=rng.randrange(days)))
+                     for i in range(count)]
+                )
+                conn.commit()
+            cursor.execute("SELECT id FROM users WHERE email LIKE 'loadtest%@example.com'")
+            user_ids = [row['id'] for row in cursor.fetchall()]
+            timings["users_s"] = round(time.perf_counter() - start, 2)
+
+            # Skewed like real traffic: a fifth of the users produce most of the history
+            heavy = user_ids[:max(1, len(user_ids) // 5)]
+            start = time.perf_counter()
+            for _, count in _chunks(history, batch):
+                rows = []
+                for _ in range(count):
+                    user_id = rng.choice(heavy) if rng.random() < 0.8 else rng.choice(user_ids)
+                    created_at = now - timedelta(seconds=rng.randrange(days * 86400))
+                    rows.append(_history_row(rng, user_id, created_at))
+                cursor.executemany(
+                    """INSERT INTO translation_history
+                       (user_id, input_type, input_content, input_language, output_type, output_content,
+                        output_language, translation_duration, created_at)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                    rows
+                )
+                conn.commit()
+            timings["history_s"] = round(time.perf_counter() - start, 2)
+
+            start = time.perf_counter()
+            cursor.execute("SELECT MIN(id) AS low, MAX(id) AS high FROM translation_history")
+            bounds = cursor.fetchone()
+            for _, count in _chunks(feedback, batch):
+                cursor.executemany(
+                    """INSERT INTO feedback (user_id, translation_id, feedback_type, rating, comment, created_at)
+                       VALUES (%s, %s, %s, %s, %s, %s)""",
+                    [(rng.choice(user_ids), rng.randint(bounds['low'], bounds['high']) if bounds['low'] else None,
+                      rng.choice(("bug", "feature", "translation_quality", "general")), rng.randint(1, 5),
+                      "Seeded feedback", now - timedelta(seconds=rng.randrange(days * 86400)))
+                     for _ in range(count)]
+                )
+                conn.commit()
+            timings["feedback_s"] = round(time.perf_counter() - start, 2)
+
+            start = time.perf_counter()
+            cursor.execute(
+                """UPDATE users u
+                   SET translations_count = (SELECT COUNT(*) FROM translation_history t WHERE t.user_id = u.id)
+                   WHERE u.email LIKE 'loadtest%@example.com'"""
+            )
+            # Drop the reconcile marker so the server rebuilds counters and rollups on startup
+            cursor.execute("DELETE FROM stats_counters WHERE name = 'reconciled_at'")
+            conn.commit()
+            timings["counters_s"] = round(time.perf_counter() - start, 2)
+
+    return {
+        "benchmark": "seed",
+        "users": len(user_ids),
+        "first_user_id": first_user,
+        "history": history,
+        "feedback": feedback,
+        "days": days,
+        "seed": seed_value,
+        **timings
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--history", type=int, default=100000)
+    parser.add_argument("--feedback", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=365, help="spread of created_at values")
+    parser.add_argument("--batch", type=int, default=5000, help="rows per INSERT batch")
+    parser.add_argument("--password", default="loadtest-password")
+    parser.add_argument("--seed", type=int, default=42, help="random seed, for reproducible datasets")
+    args = parser.parse_args()
+    print(json.dumps(seed(args.users, args.history, args.feedback, args.days, args.batch, args.password, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
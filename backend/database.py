@@ -1,9 +1,18 @@
 import pymysql
-from pymysql.cursors import DictCursor
+from pymysql.cursors import DictCursor, SSDictCursor
 import os
-from contextlib import contextmanager
+import re
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import contextmanager, asynccontextmanager
 import logging
 
+from metrics import stage, statement_fingerprint, current_trace, DB_QUERY_SECONDS, DB_POOL_WAIT_SECONDS, DB_TARGET_QUERY_SECONDS
+
 logger = logging.getLogger(__name__)
 
 DB_CONFIG = {
@@ -17,25 +26,275 @@ DB_CONFIG = {
     'autocommit': False
 }
 
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', 2))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv('DB_POOL_RECYCLE_SECONDS', 1800))
+DB_POOL_IDLE_SECONDS = int(os.getenv('DB_POOL_IDLE_SECONDS', 300))
+DB_POOL_PING_INTERVAL = int(os.getenv('DB_POOL_PING_INTERVAL', 30))
+DB_STREAM_BATCH = int(os.getenv('DB_STREAM_BATCH', 1000))
+
+# Read replicas as host[:port], comma separated; they share DB_CONFIG's credentials
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv('DB_REPLICA_HOSTS', '').split(',') if host.strip()]
+DB_REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', 5))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 2))
+# Off for stand-in replicas that aren't replicating, e.g. the primary listed again
+DB_REPLICA_LAG_CHECK = os.getenv('DB_REPLICA_LAG_CHECK', 'on').lower() not in ('0', 'off', 'false')
+# After a user writes, their reads stay on the primary this long
+DB_STICKY_SECONDS = float(os.getenv('DB_STICKY_SECONDS', 5))
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time"""
+
+
+class _PooledConnection:
+    __slots__ = ('connection', 'created_at', 'last_used')
+
+    def __init__(self, connection):
+        now = time.monotonic()
+        self.connection = connection
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """Thread-safe pool of pymysql connections with health checks and recycling"""
+
+    def __init__(self, config, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                 timeout=DB_POOL_TIMEOUT, recycle=DB_POOL_RECYCLE_SECONDS,
+                 idle_timeout=DB_POOL_IDLE_SECONDS, ping_interval=DB_POOL_PING_INTERVAL):
+        self.config = config
+        self.min_size = min_size
+        self.max_size = max(max_size, 1)
+        self.timeout = timeout
+        self.recycle = recycle
+        self.idle_timeout = idle_timeout
+        self.ping_interval = ping_interval
+        self._idle = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        return _PooledConnection(pymysql.connect(**self.config))
+
+    def _discard(self, pooled):
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, pooled):
+        now = time.monotonic()
+        if self.recycle and now - pooled.created_at > self.recycle:
+            return False
+        if self.ping_interval and now - pooled.last_used > self.ping_interval:
+            try:
+                pooled.connection.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def warm_up(self):
+        for _ in range(self.min_size):
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                pooled = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            self.release(pooled)
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeoutError(f"No database connection available after {self.timeout}s")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    pooled = self._idle.pop()
+                else:
+                    pooled = None
+                    self._size += 1
+
+            if pooled is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            if self._is_usable(pooled):
+                return pooled
+            self._discard(pooled)
+            with self._cond:
+                self._size -= 1
+
+    def release(self, pooled, broken=False):
+        with self._cond:
+            if broken or self._closed:
+                self._size -= 1
+                self._cond.notify()
+                discard = True
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+                self._cond.notify()
+                discard = False
+        if discard:
+            self._discard(pooled)
+
+    def prune_idle(self):
+        """Close connections idle longer than idle_timeout, keeping min_size open"""
+        now = time.monotonic()
+        stale = []
+        with self._cond:
+            keep = []
+            # _idle is used as a stack, so the oldest connections sit at the front
+            for pooled in self._idle:
+                expired = now - pooled.last_used > self.idle_timeout
+                if expired and self._size - len(stale) > self.min_size:
+                    stale.append(pooled)
+                else:
+                    keep.append(pooled)
+            self._idle = keep
+            self._size -= len(stale)
+        for pooled in stale:
+            self._discard(pooled)
+        return len(stale)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._discard(pooled)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size
+            }
+
+
+class Replica:
+    """A read replica's pool plus the health the router consults"""
+
+    def __init__(self, host):
+        name, _, port = host.partition(':')
+        self.name = f"replica:{host}"
+        self.pool = ConnectionPool({**DB_CONFIG, 'host': name, 'port': int(port or DB_CONFIG['port'])})
+        self.healthy = False
+        self.lag = None
+        self.check_ms = None
+        self.failures = 0
+        self.last_error = None
+
+    def mark_failed(self, error):
+        self.healthy = False
+        self.failures += 1
+        self.last_error = str(error)
+
+    def check(self):
+        """Refreshes lag and health; a replica that can't report its lag is unhealthy"""
+        started = time.perf_counter()
+        try:
+            with get_db_connection(self) as conn:
+                with conn.cursor() as cursor:
+                    lag = 0
+                    if DB_REPLICA_LAG_CHECK:
+                        try:
+                            cursor.execute("SHOW REPLICA STATUS")
+                        except pymysql.err.ProgrammingError:
+                            # MariaDB before 10.5 and MySQL before 8.0.22
+                            cursor.execute("SHOW SLAVE STATUS")
+                        status = cursor.fetchone() or {}
+                        lag = status.get('Seconds_Behind_Master', status.get('Seconds_Behind_Source'))
+                    else:
+                        cursor.execute("SELECT 1")
+                conn.rollback()
+        except Exception as e:
+            self.mark_failed(e)
+            return
+        self.check_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.lag = lag
+        self.healthy = lag is not None and lag <= DB_REPLICA_MAX_LAG
+        if not self.healthy:
+            self.last_error = "replication stopped" if lag is None else f"lag {lag}s"
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "check_ms": self.check_ms,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "pool": self.pool.stats()
+        }
+
+
+pool = ConnectionPool(DB_CONFIG)
+replicas = [Replica(host) for host in DB_REPLICA_HOSTS]
+_next_replica = 0
+# user id -> when they last wrote, oldest first
+_recent_writers = OrderedDict()
+
+# Sync queries are offloaded here from async routes; sized to the pools so
+# threads never queue on a pool's condition variable instead of the executor
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('DB_EXECUTOR_WORKERS', DB_POOL_MAX_SIZE * (1 + len(replicas)))),
+    thread_name_prefix="db"
+)
+
 @contextmanager
-def get_db_connection():
-    connection = None
+def get_db_connection(replica=None):
+    target = replica.pool if replica is not None else pool
+    with stage("db.acquire", DB_POOL_WAIT_SECONDS):
+        pooled = target.acquire()
+    connection = pooled.connection
+    broken = False
     try:
-        connection = pymysql.connect(**DB_CONFIG)
         yield connection
     except Exception as e:
         logger.error(f"Database connection error: {e}")
-        if connection:
+        try:
             connection.rollback()
+        except Exception:
+            broken = True
+        if isinstance(e, (pymysql.err.OperationalError, pymysql.err.InterfaceError)):
+            broken = True
         raise
     finally:
-        if connection:
-            connection.close()
+        target.release(pooled, broken=broken)
 
-def execute_query(query, params=None, fetch=False, fetch_one=False):
-    with get_db_connection() as conn:
+def execute_query(query, params=None, fetch=False, fetch_one=False, replica=None):
+    with get_db_connection(replica) as conn:
         with conn.cursor() as cursor:
-            cursor.execute(query, params or ())
+            started = time.perf_counter()
+            with stage("db.query", DB_QUERY_SECONDS, statement=statement_fingerprint(query)):
+                cursor.execute(query, params or ())
+            DB_TARGET_QUERY_SECONDS.observe(
+                time.perf_counter() - started, target=replica.name if replica is not None else "primary"
+            )
             if fetch_one:
                 result = cursor.fetchone()
             elif fetch:
@@ -43,4 +302,254 @@ def execute_query(query, params=None, fetch=False, fetch_one=False):
             else:
                 conn.commit()
                 result = cursor.lastrowid
-            return result
\ No newline at end of file
+            if fetch or fetch_one:
+                # End the implicit read transaction so a reused connection
+                # doesn't keep serving a stale REPEATABLE READ snapshot
+                conn.rollback()
+            return result
+
+def run_transaction(work):
+    """Calls work(cursor) inside one transaction and returns its result"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            name = f"transaction:{getattr(work, '__qualname__', 'work')}"
+            with stage("db.transaction", DB_QUERY_SECONDS, statement=name):
+                result = work(cursor)
+                conn.commit()
+            return result
+
+def execute_transaction(statements):
+    """Runs (query, params) pairs in one transaction and returns each lastrowid"""
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            results = []
+            for query, params in statements:
+                with stage("db.query", DB_QUERY_SECONDS, statement=statement_fingerprint(query)):
+                    cursor.execute(query, params or ())
+                results.append(cursor.lastrowid)
+            conn.commit()
+            return results
+
+def _offload(func, *args):
+    # Carry the caller's context into the executor thread so query timings
+    # land on the request trace that issued them
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(_executor, context.run, func, *args)
+
+# Plain reads that may be served by a replica; locking reads stay on the primary
+_READ_STATEMENT = re.compile(r"^\s*(SELECT|SHOW|WITH)\b", re.IGNORECASE)
+_LOCKING_READ = re.compile(r"\bFOR\s+(UPDATE|SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b|\bGET_LOCK\s*\(", re.IGNORECASE)
+
+_primary_reads = contextvars.ContextVar("primary_reads", default=False)
+
+@contextmanager
+def primary_reads():
+    """Pins automatically routed reads in this block to the primary, for
+    results that get cached and must not capture replica lag"""
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+def _request_user():
+    trace = current_trace()
+    return trace.user_id if trace is not None else None
+
+def mark_written(user_ids):
+    """Keeps these users' reads on the primary for DB_STICKY_SECONDS, so
+    they see their own writes despite replica lag"""
+    now = time.monotonic()
+    for user_id in user_ids:
+        if user_id is not None:
+            _recent_writers.pop(user_id, None)
+            _recent_writers[user_id] = now
+    while _recent_writers and next(iter(_recent_writers.values())) < now - DB_STICKY_SECONDS:
+        _recent_writers.popitem(last=False)
+
+def _note_write():
+    user_id = _request_user()
+    if user_id is not None:
+        mark_written((user_id,))
+
+def _read_replica(query, replica):
+    """The replica to send a read to, or None for the primary.
+
+    replica=None routes automatically: plain reads made while serving an
+    authenticated request go to a replica unless that user wrote recently.
+    Anonymous requests and background tasks stay on the primary, since
+    they often read rows they're about to act on. replica=True sends any
+    read to a replica and replica=False pins it to the primary.
+    """
+    global _next_replica
+    if not replicas or replica is False:
+        return None
+    if replica is None:
+        user_id = _request_user()
+        if user_id is None or _primary_reads.get() or not _READ_STATEMENT.match(query) or _LOCKING_READ.search(query):
+            return None
+        written_at = _recent_writers.get(user_id)
+        if written_at is not None and written_at > time.monotonic() - DB_STICKY_SECONDS:
+            return None
+    for _ in range(len(replicas)):
+        _next_replica = (_next_replica + 1) % len(replicas)
+        if replicas[_next_replica].healthy:
+            return replicas[_next_replica]
+    return None
+
+async def run_query(query, params=None, fetch=False, fetch_one=False, replica=None):
+    if fetch or fetch_one:
+        target = _read_replica(query, replica)
+        if target is not None:
+            try:
+                return await _offload(lambda: execute_query(query, params, fetch, fetch_one, replica=target))
+            except (pymysql.err.OperationalError, pymysql.err.InterfaceError, PoolTimeoutError) as e:
+                # Reads are safe to repeat, so a failing replica costs one retry on the primary
+                target.mark_failed(e)
+                logger.warning(f"Replica {target.name} failed, reading from primary: {e}")
+    else:
+        _note_write()
+    return await _offload(lambda: execute_query(query, params, fetch=fetch, fetch_one=fetch_one))
+
+async def fetch_one(query, params=None, replica=None):
+    return await run_query(query, params, fetch_one=True, replica=replica)
+
+async def fetch_all(query, params=None, replica=None):
+    return await run_query(query, params, fetch=True, replica=replica)
+
+async def execute(query, params=None):
+    return await run_query(query, params)
+
+async def execute_many(statements):
+    _note_write()
+    return await _offload(execute_transaction, statements)
+
+async def transaction(work):
+    _note_write()
+    return await _offload(run_transaction, work)
+
+@asynccontextmanager
+async def named_lock(name):
+    """Holds MySQL's GET_LOCK(name) on a dedicated connection for the block
+    and yields whether it was acquired, without waiting for it. The lock
+    is shared by every process on the database and dies with its
+    connection, so a crashed holder never leaves it stuck."""
+    def acquire():
+        connection = pymysql.connect(**{**DB_CONFIG, 'autocommit': True})
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT GET_LOCK(%s, 0) AS acquired", (name,))
+                acquired = (cursor.fetchone() or {}).get('acquired') == 1
+        except Exception:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return None
+        return connection
+
+    def release(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+        except Exception as e:
+            logger.error(f"Releasing lock {name} failed: {e}")
+        finally:
+            connection.close()
+
+    connection = await _offload(acquire)
+    try:
+        yield connection is not None
+    finally:
+        if connection is not None:
+            await _offload(release, connection)
+
+async def stream_rows(query, params=None, batch_size=DB_STREAM_BATCH, replica=None):
+    """Yields lists of up to batch_size rows read through an unbuffered
+    cursor, so the full result never sits in memory on either side. The
+    connection stays checked out until the generator finishes or closes."""
+    target = _read_replica(query, replica)
+    source = target.pool if target is not None else pool
+
+    def start():
+        pooled = source.acquire()
+        try:
+            cursor = pooled.connection.cursor(SSDictCursor)
+            cursor.execute(query, params or ())
+        except Exception:
+            source.release(pooled, broken=True)
+            raise
+        return pooled, cursor
+
+    with stage("db.acquire", DB_POOL_WAIT_SECONDS):
+        pooled, cursor = await _offload(start)
+    exhausted = False
+    try:
+        while True:
+            with stage("db.stream", DB_QUERY_SECONDS, statement=statement_fingerprint(query)):
+                rows = await _offload(cursor.fetchmany, batch_size)
+            if not rows:
+                exhausted = True
+                return
+            yield rows
+    finally:
+        def finish():
+            # An abandoned unbuffered result would have to be read to the end
+            # before the connection is usable again; closing it is cheaper
+            broken = not exhausted
+            try:
+                if exhausted:
+                    cursor.close()
+                    pooled.connection.rollback()
+            except Exception as e:
+                logger.error(f"Streaming cursor release error: {e}")
+                broken = True
+            finally:
+                source.release(pooled, broken=broken)
+
+        await _offload(finish)
+
+async def prune_idle_connections_periodically(interval=60):
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        for target in [pool] + [replica.pool for replica in replicas]:
+            try:
+                await loop.run_in_executor(_executor, target.prune_idle)
+            except Exception as e:
+                logger.error(f"Connection pool prune error: {e}")
+
+async def monitor_replicas(interval=DB_REPLICA_CHECK_INTERVAL):
+    """Re-checks every replica's lag; reads skip replicas that are unhealthy"""
+    while replicas:
+        for replica in replicas:
+            was_healthy = replica.healthy
+            await _offload(replica.check)
+            if was_healthy and not replica.healthy:
+                logger.warning(f"Replica {replica.name} taken out of rotation: {replica.last_error}")
+        await asyncio.sleep(interval)
+
+def open_pool():
+    try:
+        pool.warm_up()
+    except Exception as e:
+        logger.error(f"Connection pool warm-up failed: {e}")
+    for replica in replicas:
+        try:
+            replica.pool.warm_up()
+        except Exception as e:
+            logger.error(f"Replica {replica.name} warm-up failed: {e}")
+        replica.check()
+
+def close_pool():
+    pool.close()
+    for replica in replicas:
+        replica.pool.close()
+    _executor.shutdown(wait=False)
+
+def database_stats():
+    return {
+        "primary": pool.stats(),
+        "replicas": [replica.stats() for replica in replicas],
+        "sticky_users": len(_recent_writers)
+    }
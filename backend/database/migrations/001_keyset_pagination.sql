@@ -0,0 +1,18 @@
+-- Keyset pagination support for databases created before these indexes
+-- were added to schema.sql
+USE jusoor_db;
+
+ALTER TABLE users
+    ADD COLUMN translations_count INT DEFAULT 0,
+    ADD INDEX idx_created_id (created_at, id);
+
+ALTER TABLE translation_history
+    ADD INDEX idx_user_created_id (user_id, created_at, id);
+
+ALTER TABLE feedback
+    ADD INDEX idx_user_created_id (user_id, created_at, id),
+    ADD INDEX idx_created_id (created_at, id);
+
+-- Backfill the per-user counter served as the history total
+UPDATE users u
+SET translations_count = (SELECT COUNT(*) FROM translation_history t WHERE t.user_id = u.id);
@@ -0,0 +1,47 @@
+-- Translation memory for databases created before it was added to schema.sql
+USE jusoor_db;
+
+-- Translation Memory Table (bilingual phrase pairs loaded into the in-memory phrase index)
+CREATE TABLE IF NOT EXISTS translation_memory (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    source_language VARCHAR(10) NOT NULL,
+    target_language VARCHAR(10) NOT NULL,
+    source_hash CHAR(64) NOT NULL,
+    target_hash CHAR(64) NOT NULL,
+    source_text VARCHAR(500) NOT NULL,
+    target_text TEXT NOT NULL,
+    weight INT NOT NULL DEFAULT 1,
+    origin ENUM('seed', 'history', 'feedback') DEFAULT 'history',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uniq_pair (source_language, target_language, source_hash, target_hash),
+    INDEX idx_weight (weight)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Seed translation memory with common phrases
+INSERT INTO translation_memory (source_language, target_language, source_hash, target_hash, source_text, target_text, weight, origin)
+VALUES
+('en', 'ar', SHA2('Hello', 256), SHA2('مرحبا', 256), 'Hello', 'مرحبا', 100, 'seed'),
+('en', 'ar', SHA2('Thank you', 256), SHA2('شكرا لك', 256), 'Thank you', 'شكرا لك', 100, 'seed'),
+('en', 'ar', SHA2('Good morning', 256), SHA2('صباح الخير', 256), 'Good morning', 'صباح الخير', 100, 'seed'),
+('en', 'ar', SHA2('Good evening', 256), SHA2('مساء الخير', 256), 'Good evening', 'مساء الخير', 100, 'seed'),
+('en', 'ar', SHA2('How are you', 256), SHA2('كيف حالك', 256), 'How are you', 'كيف حالك', 100, 'seed'),
+('en', 'ar', SHA2('Please', 256), SHA2('من فضلك', 256), 'Please', 'من فضلك', 100, 'seed'),
+('en', 'ar', SHA2('Help', 256), SHA2('مساعدة', 256), 'Help', 'مساعدة', 100, 'seed'),
+('en', 'ar', SHA2('I need help', 256), SHA2('أحتاج مساعدة', 256), 'I need help', 'أحتاج مساعدة', 100, 'seed'),
+('en', 'ar', SHA2('Welcome', 256), SHA2('أهلا وسهلا', 256), 'Welcome', 'أهلا وسهلا', 100, 'seed'),
+('en', 'ar', SHA2('Yes', 256), SHA2('نعم', 256), 'Yes', 'نعم', 100, 'seed'),
+('en', 'ar', SHA2('No', 256), SHA2('لا', 256), 'No', 'لا', 100, 'seed'),
+('en', 'ar', SHA2('Goodbye', 256), SHA2('مع السلامة', 256), 'Goodbye', 'مع السلامة', 100, 'seed'),
+('ar', 'en', SHA2('مرحبا', 256), SHA2('Hello', 256), 'مرحبا', 'Hello', 100, 'seed'),
+('ar', 'en', SHA2('شكرا', 256), SHA2('Thank you', 256), 'شكرا', 'Thank you', 100, 'seed'),
+('ar', 'en', SHA2('شكرا لك', 256), SHA2('Thank you', 256), 'شكرا لك', 'Thank you', 100, 'seed'),
+('ar', 'en', SHA2('صباح الخير', 256), SHA2('Good morning', 256), 'صباح الخير', 'Good morning', 100, 'seed'),
+('ar', 'en', SHA2('مساء الخير', 256), SHA2('Good evening', 256), 'مساء الخير', 'Good evening', 100, 'seed'),
+('ar', 'en', SHA2('كيف حالك', 256), SHA2('How are you', 256), 'كيف حالك', 'How are you', 100, 'seed'),
+('ar', 'en', SHA2('من فضلك', 256), SHA2('Please', 256), 'من فضلك', 'Please', 100, 'seed'),
+('ar', 'en', SHA2('أحتاج مساعدة', 256), SHA2('I need help', 256), 'أحتاج مساعدة', 'I need help', 100, 'seed'),
+('ar', 'en', SHA2('أهلا وسهلا', 256), SHA2('Welcome', 256), 'أهلا وسهلا', 'Welcome', 100, 'seed'),
+('ar', 'en', SHA2('نعم', 256), SHA2('Yes', 256), 'نعم', 'Yes', 100, 'seed'),
+('ar', 'en', SHA2('لا', 256), SHA2('No', 256), 'لا', 'No', 100, 'seed'),
+('ar', 'en', SHA2('مع السلامة', 256), SHA2('Goodbye', 256), 'مع السلامة', 'Goodbye', 100, 'seed')
+ON DUPLICATE KEY UPDATE weight=weight;
@@ -0,0 +1,17 @@
+-- Convert system_logs to daily RANGE partitions so retention drops whole
+-- partitions instead of deleting rows. Run once on databases created before
+-- the partitioned definition was added to schema.sql; the writer then
+-- splits daily partitions out of p_future on its retention pass.
+USE jusoor_db;
+
+ALTER TABLE system_logs DROP FOREIGN KEY system_logs_ibfk_1;
+
+ALTER TABLE system_logs
+    MODIFY id BIGINT NOT NULL AUTO_INCREMENT,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, created_at);
+
+ALTER TABLE system_logs
+    PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+        PARTITION p_future VALUES LESS THAN MAXVALUE
+    );
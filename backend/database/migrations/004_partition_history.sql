@@ -0,0 +1,46 @@
+-- Convert translation_history and session_messages to monthly RANGE
+-- partitions so months past the hot window can be archived to disk and
+-- dropped whole. Run once on databases created before the partitioned
+-- definitions were added to schema.sql. Partitioned tables can't take part
+-- in foreign keys, so the constraints to and from these tables are dropped;
+-- the archiver splits one partition per month of existing data out of
+-- p_future on its first pass.
+USE jusoor_db;
+
+ALTER TABLE feedback
+    DROP FOREIGN KEY feedback_ibfk_2,
+    ADD INDEX idx_translation_id (translation_id);
+
+ALTER TABLE translation_history DROP FOREIGN KEY translation_history_ibfk_1;
+
+ALTER TABLE translation_history
+    MODIFY id INT NOT NULL AUTO_INCREMENT,
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, created_at);
+
+ALTER TABLE translation_history
+    PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+        PARTITION p_future VALUES LESS THAN MAXVALUE
+    );
+
+ALTER TABLE session_messages DROP FOREIGN KEY session_messages_ibfk_1;
+
+ALTER TABLE session_messages
+    MODIFY id INT NOT NULL AUTO_INCREMENT,
+    MODIFY timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, timestamp);
+
+ALTER TABLE session_messages
+    PARTITION BY RANGE (UNIX_TIMESTAMP(timestamp)) (
+        PARTITION p_future VALUES LESS THAN MAXVALUE
+    );
+
+CREATE TABLE IF NOT EXISTS archive_tombstones (
+    table_name VARCHAR(64) NOT NULL,
+    group_id INT NOT NULL,
+    row_id INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (table_name, group_id, row_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
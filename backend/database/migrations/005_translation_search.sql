@@ -0,0 +1,14 @@
+-- Per-user inverted index behind GET /api/translations/search. Existing
+-- history is indexed by the server's background pass, which starts from
+-- the search_index_id watermark in stats_counters (0 when absent).
+USE jusoor_db;
+
+CREATE TABLE IF NOT EXISTS translation_search_terms (
+    user_id INT NOT NULL,
+    term VARCHAR(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+    translation_id INT NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    hits SMALLINT NOT NULL DEFAULT 1,
+    PRIMARY KEY (user_id, term, translation_id),
+    INDEX idx_translation_id (translation_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,11 @@
+-- Log of response cache bumps that other workers poll to drop their
+-- cached renderings of a user's feedback, settings or session messages.
+USE jusoor_db;
+
+CREATE TABLE IF NOT EXISTS response_cache_invalidations (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    scope VARCHAR(32) NOT NULL,
+    owner_id INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,7 @@
+-- Version claim for access tokens: bumped on every role, status or profile
+-- change and published with each principal invalidation, so workers trusting
+-- token claims can tell a stale token from a current one.
+USE jusoor_db;
+
+ALTER TABLE users ADD COLUMN auth_version INT NOT NULL DEFAULT 0;
+ALTER TABLE principal_invalidations ADD COLUMN auth_version INT NOT NULL DEFAULT 0;
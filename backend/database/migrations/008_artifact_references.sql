@@ -0,0 +1,21 @@
+-- Reference counts for generated media, replacing the hourly scan of
+-- translation_history. Counts the rows still in MySQL; the app counts rows
+-- already moved to the history archive once, on its first cleanup pass, and
+-- removes no artifact before that. Run with the app stopped so no history
+-- row is written between the count and the first write-behind flush.
+USE jusoor_db;
+
+CREATE TABLE IF NOT EXISTS artifact_references (
+    kind VARCHAR(16) NOT NULL,
+    artifact_id CHAR(16) NOT NULL,
+    refs INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, artifact_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT INTO artifact_references (kind, artifact_id, refs)
+SELECT IF(output_content LIKE '/api/mock/sign-video/%', 'sign-video', 'audio'),
+       SUBSTRING_INDEX(output_content, '/', -1), COUNT(*)
+FROM translation_history
+WHERE output_content REGEXP '^/api/mock/(sign-video|audio)/[0-9a-f]{16}$'
+GROUP BY 1, 2
+ON DUPLICATE KEY UPDATE refs = VALUES(refs);
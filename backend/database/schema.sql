@@ -16,13 +16,18 @@ CREATE TABLE IF NOT EXISTS users (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     last_login TIMESTAMP NULL,
     is_active BOOLEAN DEFAULT TRUE,
+    translations_count INT DEFAULT 0,
+    auth_version INT NOT NULL DEFAULT 0,
     INDEX idx_email (email),
-    INDEX idx_role (role)
+    INDEX idx_role (role),
+    INDEX idx_created_id (created_at, id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
--- Translation History Table
+-- Translation History Table (monthly RANGE partitions; months past the hot
+-- window are moved to the on-disk archive and their partitions dropped.
+-- Partitioned tables can't carry foreign keys, so user_id is unconstrained)
 CREATE TABLE IF NOT EXISTS translation_history (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
     user_id INT NOT NULL,
     input_type ENUM('text', 'audio', 'video') NOT NULL,
     input_content TEXT,
@@ -31,11 +36,27 @@ CREATE TABLE IF NOT EXISTS translation_history (
     output_content TEXT,
     output_language VARCHAR(10) DEFAULT 'en',
     translation_duration DECIMAL(6,2),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at),
     INDEX idx_user_id (user_id),
     INDEX idx_created_at (created_at),
-    INDEX idx_input_type (input_type)
+    INDEX idx_input_type (input_type),
+    INDEX idx_user_created_id (user_id, created_at, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+-- Translation Search Terms Table (per-user inverted index over history text;
+-- rows are kept when their translation is archived so search still finds it)
+CREATE TABLE IF NOT EXISTS translation_search_terms (
+    user_id INT NOT NULL,
+    term VARCHAR(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+    translation_id INT NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    hits SMALLINT NOT NULL DEFAULT 1,
+    PRIMARY KEY (user_id, term, translation_id),
+    INDEX idx_translation_id (translation_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Live Sessions Table
@@ -56,18 +77,31 @@ CREATE TABLE IF NOT EXISTS live_sessions (
     INDEX idx_is_active (is_active)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
--- Session Messages Table (for live translation conversations)
+-- Session Messages Table (for live translation conversations; partitioned
+-- and archived like translation_history)
 CREATE TABLE IF NOT EXISTS session_messages (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
     session_id INT NOT NULL,
     message_type ENUM('text', 'audio', 'video', 'sign') NOT NULL,
     sender_type ENUM('user', 'system') DEFAULT 'user',
     original_content TEXT,
     translated_content TEXT,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (session_id) REFERENCES live_sessions(id) ON DELETE CASCADE,
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp),
     INDEX idx_session_id (session_id),
     INDEX idx_timestamp (timestamp)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+PARTITION BY RANGE (UNIX_TIMESTAMP(timestamp)) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+-- Archive Tombstones Table (rows deleted after they were moved to the archive)
+CREATE TABLE IF NOT EXISTS archive_tombstones (
+    table_name VARCHAR(64) NOT NULL,
+    group_id INT NOT NULL,
+    row_id INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (table_name, group_id, row_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Feedback Table
@@ -82,16 +116,19 @@ CREATE TABLE IF NOT EXISTS feedback (
     status ENUM('pending', 'reviewed', 'resolved') DEFAULT 'pending',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL,
-    FOREIGN KEY (translation_id) REFERENCES translation_history(id) ON DELETE SET NULL,
     FOREIGN KEY (session_id) REFERENCES live_sessions(id) ON DELETE SET NULL,
     INDEX idx_user_id (user_id),
+    INDEX idx_translation_id (translation_id),
     INDEX idx_feedback_type (feedback_type),
-    INDEX idx_status (status)
+    INDEX idx_status (status),
+    INDEX idx_user_created_id (user_id, created_at, id),
+    INDEX idx_created_id (created_at, id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
--- System Logs Table
+-- System Logs Table (daily RANGE partitions rotated by the system log writer;
+-- partitioned tables can't carry foreign keys, so user_id is unconstrained)
 CREATE TABLE IF NOT EXISTS system_logs (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id BIGINT AUTO_INCREMENT,
     log_level ENUM('INFO', 'WARNING', 'ERROR', 'CRITICAL') NOT NULL,
     log_category VARCHAR(50),
     message TEXT NOT NULL,
@@ -100,10 +137,99 @@ CREATE TABLE IF NOT EXISTS system_logs (
     user_agent TEXT,
     additional_data JSON,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL,
+    PRIMARY KEY (id, created_at),
     INDEX idx_log_level (log_level),
     INDEX idx_created_at (created_at),
     INDEX idx_user_id (user_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+-- Translation Jobs Table (durable queue for long-running translations)
+CREATE TABLE IF NOT EXISTS translation_jobs (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    status ENUM('queued', 'running', 'succeeded', 'failed', 'cancelled') DEFAULT 'queued',
+    priority TINYINT DEFAULT 0,
+    request JSON NOT NULL,
+    result JSON,
+    error TEXT,
+    progress TINYINT DEFAULT 0,
+    attempts INT DEFAULT 0,
+    max_attempts INT DEFAULT 3,
+    worker_id VARCHAR(128),
+    available_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    lease_expires_at TIMESTAMP NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP NULL,
+    finished_at TIMESTAMP NULL,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_claim (status, priority, id),
+    INDEX idx_user_status (user_id, status),
+    INDEX idx_lease (status, lease_expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Principal Invalidations Table (cross-worker auth cache invalidation log)
+CREATE TABLE IF NOT EXISTS principal_invalidations (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    auth_version INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Response Cache Invalidations Table (cross-worker response cache bumps)
+CREATE TABLE IF NOT EXISTS response_cache_invalidations (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    scope VARCHAR(32) NOT NULL,
+    owner_id INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_created_at (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Artifact References Table (history rows pointing at each generated
+-- media file, archived rows included; kept in step with history writes and
+-- deletes so artifact cleanup never has to scan history)
+CREATE TABLE IF NOT EXISTS artifact_references (
+    kind VARCHAR(16) NOT NULL,
+    artifact_id CHAR(16) NOT NULL,
+    refs INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, artifact_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Stats Counters Table (incrementally maintained admin totals)
+CREATE TABLE IF NOT EXISTS stats_counters (
+    name VARCHAR(64) PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Translation Daily Rollups Table (UTC day buckets for windowed admin stats)
+CREATE TABLE IF NOT EXISTS translation_daily_rollups (
+    bucket_date DATE NOT NULL,
+    input_type VARCHAR(10) NOT NULL,
+    output_type VARCHAR(10) NOT NULL,
+    input_language VARCHAR(10) NOT NULL,
+    output_language VARCHAR(10) NOT NULL,
+    translations INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_date, input_type, output_type, input_language, output_language)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Translation Memory Table (bilingual phrase pairs loaded into the in-memory phrase index)
+CREATE TABLE IF NOT EXISTS translation_memory (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    source_language VARCHAR(10) NOT NULL,
+    target_language VARCHAR(10) NOT NULL,
+    source_hash CHAR(64) NOT NULL,
+    target_hash CHAR(64) NOT NULL,
+    source_text VARCHAR(500) NOT NULL,
+    target_text TEXT NOT NULL,
+    weight INT NOT NULL DEFAULT 1,
+    origin ENUM('seed', 'history', 'feedback') DEFAULT 'history',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    UNIQUE KEY uniq_pair (source_language, target_language, source_hash, target_hash),
+    INDEX idx_weight (weight)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Accessibility Settings Table
@@ -131,3 +257,32 @@ ON DUPLICATE KEY UPDATE email=email;
 INSERT INTO users (email, password_hash, full_name, role) 
 VALUES ('demo@jusoor.com', '$2b$12$92IXUNpkjO0rOQ5byMi.Ye4oKoEa3Ro9llC/.og/at2.uheWG/igi', 'Demo User', 'user')
 ON DUPLICATE KEY UPDATE email=email;
+
+-- Seed translation memory with common phrases
+INSERT INTO translation_memory (source_language, target_language, source_hash, target_hash, source_text, target_text, weight, origin)
+VALUES
+('en', 'ar', SHA2('Hello', 256), SHA2('مرحبا', 256), 'Hello', 'مرحبا', 100, 'seed'),
+('en', 'ar', SHA2('Thank you', 256), SHA2('شكرا لك', 256), 'Thank you', 'شكرا لك', 100, 'seed'),
+('en', 'ar', SHA2('Good morning', 256), SHA2('صباح الخير', 256), 'Good morning', 'صباح الخير', 100, 'seed'),
+('en', 'ar', SHA2('Good evening', 256), SHA2('مساء الخير', 256), 'Good evening', 'مساء الخير', 100, 'seed'),
+('en', 'ar', SHA2('How are you', 256), SHA2('كيف حالك', 256), 'How are you', 'كيف حالك', 100, 'seed'),
+('en', 'ar', SHA2('Please', 256), SHA2('من فضلك', 256), 'Please', 'من فضلك', 100, 'seed'),
+('en', 'ar', SHA2('Help', 256), SHA2('مساعدة', 256), 'Help', 'مساعدة', 100, 'seed'),
+('en', 'ar', SHA2('I need help', 256), SHA2('أحتاج مساعدة', 256), 'I need help', 'أحتاج مساعدة', 100, 'seed'),
+('en', 'ar', SHA2('Welcome', 256), SHA2('أهلا وسهلا', 256), 'Welcome', 'أهلا وسهلا', 100, 'seed'),
+('en', 'ar', SHA2('Yes', 256), SHA2('نعم', 256), 'Yes', 'نعم', 100, 'seed'),
+('en', 'ar', SHA2('No', 256), SHA2('لا', 256), 'No', 'لا', 100, 'seed'),
+('en', 'ar', SHA2('Goodbye', 256), SHA2('مع السلامة', 256), 'Goodbye', 'مع السلامة', 100, 'seed'),
+('ar', 'en', SHA2('مرحبا', 256), SHA2('Hello', 256), 'مرحبا', 'Hello', 100, 'seed'),
+('ar', 'en', SHA2('شكرا', 256), SHA2('Thank you', 256), 'شكرا', 'Thank you', 100, 'seed'),
+('ar', 'en', SHA2('شكرا لك', 256), SHA2('Thank you', 256), 'شكرا لك', 'Thank you', 100, 'seed'),
+('ar', 'en', SHA2('صباح الخير', 256), SHA2('Good morning', 256), 'صباح الخير', 'Good morning', 100, 'seed'),
+('ar', 'en', SHA2('مساء الخير', 256), SHA2('Good evening', 256), 'مساء الخير', 'Good evening', 100, 'seed'),
+('ar', 'en', SHA2('كيف حالك', 256), SHA2('How are you', 256), 'كيف حالك', 'How are you', 100, 'seed'),
+('ar', 'en', SHA2('من فضلك', 256), SHA2('Please', 256), 'من فضلك', 'Please', 100, 'seed'),
+('ar', 'en', SHA2('أحتاج مساعدة', 256), SHA2('I need help', 256), 'أحتاج مساعدة', 'I need help', 100, 'seed'),
+('ar', 'en', SHA2('أهلا وسهلا', 256), SHA2('Welcome', 256), 'أهلا وسهلا', 'Welcome', 100, 'seed'),
+('ar', 'en', SHA2('نعم', 256), SHA2('Yes', 256), 'نعم', 'Yes', 100, 'seed'),
+('ar', 'en', SHA2('لا', 256), SHA2('No', 256), 'لا', 'No', 100, 'seed'),
+('ar', 'en', SHA2('مع السلامة', 256), SHA2('Goodbye', 256), 'مع السلامة', 'Goodbye', 100, 'seed')
+ON DUPLICATE KEY UPDATE weight=weight;
@@ -0,0 +1,473 @@
+import os
+import json
+import gzip
+import uuid
+import asyncio
+import logging
+from collections import Counter, OrderedDict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from database import fetch_one, fetch_all, execute_many, transaction, named_lock
+from partitions import (
+    CATCH_ALL, month_start, next_month, monthly_ranges, list_partitions, add_partitions, drop_partitions
+)
+
+logger = logging.getLogger(__name__)
+
+HISTORY_ARCHIVE_DIR = os.getenv('HISTORY_ARCHIVE_DIR', str(Path(__file__).parent / 'history_archive'))
+# Months (including the current one) kept in MySQL; older ones are archived
+HISTORY_HOT_MONTHS = int(os.getenv('HISTORY_HOT_MONTHS', 6))
+HISTORY_PARTITION_MONTHS_AHEAD = int(os.getenv('HISTORY_PARTITION_MONTHS_AHEAD', 2))
+HISTORY_ARCHIVE_SECONDS = float(os.getenv('HISTORY_ARCHIVE_SECONDS', 6 * 3600))
+HISTORY_ARCHIVE_BLOCK_CACHE = int(os.getenv('HISTORY_ARCHIVE_BLOCK_CACHE', 256))
+HISTORY_ARCHIVE_GROUP_BATCH = 500
+HISTORY_ARCHIVE_DELETE_BATCH = 5000
+
+# Archived table -> how its rows are grouped into blocks and counted
+ARCHIVED_TABLES = {
+    "translation_history": {
+        "time_column": "created_at",
+        "group_column": "user_id",
+        "counter": "archived_translations",
+        # stats_counters watermarks of jobs that tail the table by id; a month
+        # is only archived once all of them have read past it
+        "consumers": ("tm_history_id", "search_index_id"),
+        "columns": (
+            "id", "user_id", "input_type", "input_content", "input_language", "output_type",
+            "output_content", "output_language", "translation_duration", "created_at"
+        ),
+    },
+    "session_messages": {
+        "time_column": "timestamp",
+        "group_column": "session_id",
+        "counter": "archived_session_messages",
+        "consumers": (),
+        "columns": (
+            "id", "session_id", "message_type", "sender_type", "original_content", "translated_content", "timestamp"
+        ),
+    },
+}
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def encode_block(rows: List[Dict[str, Any]], columns, time_column: str) -> bytes:
+    """One gzip member holding the rows column by column, which compresses
+    far better than row-wise JSON for repetitive history data"""
+    block = {
+        "rows": len(rows),
+        "columns": {column: [_json_value(row[column]) for row in rows] for column in columns},
+        "time_column": time_column
+    }
+    return gzip.compress(json.dumps(block, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def decode_block(data: bytes) -> List[Dict[str, Any]]:
+    block = json.loads(gzip.decompress(data))
+    columns = block["columns"]
+    times = [datetime.fromisoformat(value) if value else None for value in columns[block["time_column"]]]
+    columns[block["time_column"]] = times
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*(columns[name] for name in names))]
+
+
+def _newest_first(row: Dict[str, Any], time_column: str):
+    return (row[time_column], row["id"])
+
+
+class _MonthWriter:
+    """Builds a month's data file group by group, then swaps the index in
+    atomically; readers keep using the previous file until then"""
+
+    def __init__(self, directory: Path, table: str, month: str, previous: Optional[Dict[str, Any]]):
+        self.directory = directory
+        self.spec = ARCHIVED_TABLES[table]
+        self.previous = previous
+        directory.mkdir(parents=True, exist_ok=True)
+        self.index = {
+            "table": table, "month": month, "data_file": f"{month}.{uuid.uuid4().hex[:12]}.gz",
+            "rows": 0, "groups": {}
+        }
+        self._out = open(directory / self.index["data_file"], "wb")
+
+    def _append(self, key: str, data: bytes, entry: Dict[str, Any]):
+        entry["offset"] = self._out.tell()
+        entry["length"] = len(data)
+        self._out.write(data)
+        self.index["groups"][key] = entry
+        self.index["rows"] += entry["rows"]
+
+    def add_groups(self, groups: Dict[str, List[Dict[str, Any]]], read_block) -> int:
+        """Writes the groups and returns how many of their rows weren't
+        already in the previous archive"""
+        time_column = self.spec["time_column"]
+        added = 0
+        for key, rows in groups.items():
+            added += len(rows)
+            if self.previous is not None and key in self.previous["groups"]:
+                # Late rows for an already archived month are merged into its block
+                archived = read_block(self.index["table"], self.previous, key)
+                archived_ids = {row["id"] for row in archived}
+                added -= sum(1 for row in rows if row["id"] in archived_ids)
+                seen = {row["id"] for row in rows}
+                rows.extend(row for row in archived if row["id"] not in seen)
+            rows.sort(key=lambda row: _newest_first(row, time_column), reverse=True)
+            self._append(key, encode_block(rows, self.spec["columns"], time_column), {
+                "rows": len(rows), "min_id": min(row["id"] for row in rows), "max_id": max(row["id"] for row in rows)
+            })
+        return added
+
+    def commit(self) -> Dict[str, Any]:
+        if self.previous is not None:
+            # Carry over untouched groups byte for byte
+            with open(self.directory / self.previous["data_file"], "rb") as f:
+                for key, entry in self.previous["groups"].items():
+                    if key not in self.index["groups"]:
+                        self._append(key, os.pread(f.fileno(), entry["length"], entry["offset"]), dict(entry))
+        self._out.flush()
+        os.fsync(self._out.fileno())
+        self._out.close()
+        entries = self.index["groups"].values()
+        self.index["min_id"] = min((entry["min_id"] for entry in entries), default=0)
+        self.index["max_id"] = max((entry["max_id"] for entry in entries), default=0)
+
+        temp = self.directory / f".{self.index['month']}.json.tmp"
+        temp.write_text(json.dumps(self.index), encoding="utf-8")
+        os.replace(temp, self.directory / f"{self.index['month']}.json")
+        if self.previous is not None:
+            (self.directory / self.previous["data_file"]).unlink(missing_ok=True)
+        return self.index
+
+    def abort(self):
+        self._out.close()
+        (self.directory / self.index["data_file"]).unlink(missing_ok=True)
+
+
+class HistoryArchive:
+    """Cold storage for translation_history and session_messages.
+
+    Months older than the hot window are compacted into one file per table
+    and month: a gzip member per user (or session) with the rows stored
+    column-wise, plus a JSON index of member offsets. The month is then
+    removed from MySQL by dropping its partition, so the hot tables stay
+    small. Reads page through the archive transparently; deleting an
+    archived row records a tombstone instead of rewriting the file.
+    """
+
+    def __init__(self, root: str = HISTORY_ARCHIVE_DIR, hot_months: int = HISTORY_HOT_MONTHS,
+                 interval: float = HISTORY_ARCHIVE_SECONDS, block_cache: int = HISTORY_ARCHIVE_BLOCK_CACHE):
+        self.root = Path(root)
+        self.hot_months = hot_months
+        self.interval = interval
+        self.block_cache = block_cache
+        self._indexes: Dict[Tuple[str, str], Tuple[int, Dict[str, Any]]] = {}
+        self._blocks: "OrderedDict[Tuple[str, str], List[Dict[str, Any]]]" = OrderedDict()
+        self._compact_lock = asyncio.Lock()
+        self.counters = Counter()
+
+    # ----- Archive files -----
+
+    def _table_dir(self, table: str) -> Path:
+        return self.root / table
+
+    def months(self, table: str) -> List[str]:
+        """Archived months as YYYY-MM, newest first"""
+        try:
+            names = os.listdir(self._table_dir(table))
+        except FileNotFoundError:
+            return []
+        return sorted((name[:-len(".json")] for name in names if name.endswith(".json")), reverse=True)
+
+    def _index(self, table: str, month: str) -> Optional[Dict[str, Any]]:
+        path = self._table_dir(table) / f"{month}.json"
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._indexes.get((table, month))
+        if cached and cached[0] == mtime:
+            return cached[1]
+        index = json.loads(path.read_text(encoding="utf-8"))
+        self._indexes[(table, month)] = (mtime, index)
+        return index
+
+    def _block(self, table: str, index: Dict[str, Any], key) -> List[Dict[str, Any]]:
+        entry = index["groups"].get(str(key))
+        if entry is None:
+            return []
+        cache_key = (index["data_file"], str(key))
+        rows = self._blocks.get(cache_key)
+        if rows is not None:
+            self._blocks.move_to_end(cache_key)
+            self.counters["block_cache_hits"] += 1
+            return rows
+        with open(self._table_dir(table) / index["data_file"], "rb") as f:
+            rows = decode_block(os.pread(f.fileno(), entry["length"], entry["offset"]))
+        self.counters["blocks_read"] += 1
+        self._blocks[cache_key] = rows
+        while len(self._blocks) > self.block_cache:
+            self._blocks.popitem(last=False)
+        return rows
+
+    def _read_group(self, table: str, key, before: Optional[Tuple[datetime, int]], limit: Optional[int],
+                    removed: set) -> List[Dict[str, Any]]:
+        time_column = ARCHIVED_TABLES[table]["time_column"]
+        found = []
+        for month in self.months(table):
+            if before and datetime.strptime(month, "%Y-%m") > before[0]:
+                continue
+            index = self._index(table, month)
+            if index is None:
+                continue
+            for row in self._block(table, index, key):
+                if row["id"] in removed:
+                    continue
+                if before and _newest_first(row, time_column) >= before:
+                    continue
+                found.append(row)
+                if limit is not None and len(found) >= limit:
+                    return found
+        return found
+
+    async def _tombstones(self, table: str, key) -> set:
+        rows = await fetch_all(
+            "SELECT row_id FROM archive_tombstones WHERE table_name = %s AND group_id = %s",
+            (table, key)
+        )
+        return {row['row_id'] for row in rows or []}
+
+    async def read(self, table: str, key, columns: Sequence[str], before: Optional[Tuple[datetime, int]] = None,
+                   limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Archived rows of one user (or session), newest first, strictly
+        after `before` in (time DESC, id DESC) order"""
+        if not self.months(table):
+            return []
+        removed = await self._tombstones(table, key)
+        rows = await asyncio.to_thread(self._read_group, table, key, before, limit, removed)
+        self.counters["rows_read"] += len(rows)
+        return [{column: row[column] for column in columns} for row in rows]
+
+    async def find(self, table: str, row_id: int, key=None) -> Optional[Dict[str, Any]]:
+        """Looks up one archived row by id; `key` narrows the search to one group"""
+        return await asyncio.to_thread(self._find, table, row_id, key)
+
+    def _find(self, table: str, row_id: int, key) -> Optional[Dict[str, Any]]:
+        for month in self.months(table):
+            index = self._index(table, month)
+            if index is None or not index["min_id"] <= row_id <= index["max_id"]:
+                continue
+            keys = [str(key)] if key is not None else list(index["groups"])
+            for group in keys:
+                entry = index["groups"].get(group)
+                if entry is None or not entry["min_id"] <= row_id <= entry["max_id"]:
+                    continue
+                for row in self._block(table, index, group):
+                    if row["id"] == row_id:
+                        return row
+        return None
+
+    async def count_values(self, table: str, column: str, key: Callable[[Any], Any]) -> Counter:
+        """Counts key(value) of one column over every archived row that
+        hasn't been removed, skipping rows whose key is None"""
+        rows = await fetch_all("SELECT row_id FROM archive_tombstones WHERE table_name = %s", (table,))
+        removed = {row['row_id'] for row in rows or []}
+        return await asyncio.to_thread(self._count_values, table, column, key, removed)
+
+    def _count_values(self, table: str, column: str, key: Callable[[Any], Any], removed: set) -> Counter:
+        counts = Counter()
+        for month in self.months(table):
+            index = self._index(table, month)
+            if index is None:
+                continue
+            # Read straight from the file rather than through the block cache,
+            # which a full scan would only flush
+            with open(self._table_dir(table) / index["data_file"], "rb") as f:
+                for entry in index["groups"].values():
+                    block = json.loads(gzip.decompress(os.pread(f.fileno(), entry["length"], entry["offset"])))
+                    for row_id, value in zip(block["columns"]["id"], block["columns"][column]):
+                        if row_id not in removed and (counted := key(value)) is not None:
+                            counts[counted] += 1
+        return counts
+
+    async def remove(self, table: str, key, row_id: int) -> bool:
+        """Hides an archived row from reads; returns False if it was already removed"""
+        if row_id in await self._tombstones(table, key):
+            return False
+        await execute_many([
+            ("INSERT IGNORE INTO archive_tombstones (table_name, group_id, row_id) VALUES (%s, %s, %s)",
+             (table, key, row_id)),
+            ("UPDATE stats_counters SET value = GREATEST(value - 1, 0) WHERE name = %s",
+             (ARCHIVED_TABLES[table]["counter"],))
+        ])
+        self.counters["rows_removed"] += 1
+        return True
+
+    # ----- Compaction -----
+
+    async def compact_month(self, table: str, start: date) -> int:
+        """Archives every row of `table` in the month starting at `start`,
+        merging with an existing archive for that month, then removes them
+        from MySQL. Returns the number of rows newly archived; callers hold
+        the cross-process compaction lock."""
+        spec = ARCHIVED_TABLES[table]
+        group, time_column = spec["group_column"], spec["time_column"]
+        end = next_month(start)
+        month = f"{start:%Y-%m}"
+        in_range = f"{time_column} >= %s AND {time_column} < %s"
+
+        keys = await fetch_all(
+            f"SELECT DISTINCT {group} AS k FROM {table} WHERE {in_range} ORDER BY k", (start, end)
+        )
+        keys = [row['k'] for row in keys or []]
+        moved = 0
+        if keys:
+            # Another process may have rewritten the index since it was cached
+            self._indexes.pop((table, month), None)
+            previous = await asyncio.to_thread(self._index, table, month)
+            writer = _MonthWriter(self._table_dir(table), table, month, previous)
+            try:
+                for offset in range(0, len(keys), HISTORY_ARCHIVE_GROUP_BATCH):
+                    batch = keys[offset:offset + HISTORY_ARCHIVE_GROUP_BATCH]
+                    rows = await fetch_all(
+                        f"""SELECT {', '.join(spec['columns'])} FROM {table}
+                            WHERE {in_range} AND {group} IN ({', '.join(['%s'] * len(batch))})""",
+                        (start, end, *batch)
+                    )
+                    by_key: Dict[str, List] = {}
+                    for row in rows or []:
+                        by_key.setdefault(str(row[group]), []).append(row)
+                    moved += await asyncio.to_thread(writer.add_groups, by_key, self._block)
+                if previous is not None and not moved:
+                    # Archived by an earlier run that stopped before removing the month
+                    writer.abort()
+                else:
+                    await asyncio.to_thread(writer.commit)
+            except BaseException:
+                writer.abort()
+                raise
+            if moved:
+                await execute_many([(
+                    """INSERT INTO stats_counters (name, value) VALUES (%s, %s)
+                       ON DUPLICATE KEY UPDATE value = value + VALUES(value)""",
+                    (spec["counter"], moved)
+                )])
+                self.counters["months_compacted"] += 1
+                self.counters["rows_archived"] += moved
+                logger.info(f"Archived {moved} {table} rows from {month}")
+            else:
+                self.counters["months_already_archived"] += 1
+        await self._remove_month(table, start, end)
+        return moved
+
+    async def _remove_month(self, table: str, start: date, end: date):
+        time_column = ARCHIVED_TABLES[table]["time_column"]
+        partitions = await list_partitions(table)
+        if CATCH_ALL in partitions:
+            # Everything before `end` is archived by now, so every partition up
+            # to and including this month's can go
+            expired = [name for name in partitions if name != CATCH_ALL and name <= f"p{start:%Y%m}"]
+            if f"p{start:%Y%m}" in expired:
+                self.counters["partitions_dropped"] += await drop_partitions(table, expired)
+                return
+
+        def delete_batch(cursor):
+            cursor.execute(
+                f"DELETE FROM {table} WHERE {time_column} >= %s AND {time_column} < %s LIMIT %s",
+                (start, end, HISTORY_ARCHIVE_DELETE_BATCH)
+            )
+            return cursor.rowcount
+
+        # Unpartitioned table, or a month without its own partition
+        while await transaction(delete_batch):
+            await asyncio.sleep(0.1)
+
+    def cutoff(self, today: Optional[date] = None) -> date:
+        """First day of the oldest month that stays in MySQL"""
+        first = month_start(today or datetime.now().date())
+        for _ in range(max(self.hot_months - 1, 0)):
+            first = month_start(first - timedelta(days=1))
+        return first
+
+    async def ensure_partitions(self, table: str):
+        """Keeps monthly partitions split out ahead of the current month"""
+        partitions = await list_partitions(table)
+        if CATCH_ALL not in partitions:
+            return
+        monthly = [name for name in partitions if name != CATCH_ALL]
+        if monthly:
+            first = next_month(datetime.strptime(monthly[-1], "p%Y%m").date())
+        else:
+            # First run after partitioning: give every month of existing data its own partition
+            oldest = await fetch_one(
+                f"SELECT MIN({ARCHIVED_TABLES[table]['time_column']}) AS oldest FROM {table}"
+            )
+            first = (oldest and oldest['oldest'] or datetime.now()).date()
+        last = datetime.now().date()
+        for _ in range(HISTORY_PARTITION_MONTHS_AHEAD):
+            last = next_month(last)
+        self.counters["partitions_added"] += await add_partitions(table, partitions, monthly_ranges(first, last))
+
+    async def compact(self):
+        """Archives every month older than the hot window, oldest first.
+
+        Every API and job worker process runs this, so the work is guarded
+        by a database lock; a process that finds it taken skips the round.
+        """
+        async with self._compact_lock, named_lock("history_archive") as acquired:
+            if not acquired:
+                self.counters["compactions_skipped"] += 1
+                return
+            cutoff = self.cutoff()
+            for table, spec in ARCHIVED_TABLES.items():
+                await self.ensure_partitions(table)
+                while True:
+                    oldest = await fetch_one(f"SELECT MIN({spec['time_column']}) AS oldest FROM {table}")
+                    if not oldest or oldest['oldest'] is None or oldest['oldest'].date() >= cutoff:
+                        break
+                    start = month_start(oldest['oldest'].date())
+                    if not await self._consumed(table, start):
+                        self.counters["months_deferred"] += 1
+                        break
+                    await self.compact_month(table, start)
+
+    async def _consumed(self, table: str, start: date) -> bool:
+        consumers = ARCHIVED_TABLES[table]["consumers"]
+        if not consumers:
+            return True
+        time_column = ARCHIVED_TABLES[table]["time_column"]
+        newest = await fetch_one(
+            f"SELECT MAX(id) AS id FROM {table} WHERE {time_column} >= %s AND {time_column} < %s",
+            (start, next_month(start))
+        )
+        watermarks = await fetch_all(
+            f"SELECT value FROM stats_counters WHERE name IN ({', '.join(['%s'] * len(consumers))})",
+            consumers
+        )
+        # A consumer that has never run here has no watermark and doesn't hold archiving back
+        return all(int(row['value']) >= (newest['id'] or 0) for row in watermarks or [])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "hot_months": self.hot_months,
+            "cutoff": self.cutoff().isoformat(),
+            "archived_months": {table: len(self.months(table)) for table in ARCHIVED_TABLES},
+            "cached_blocks": len(self._blocks)
+        }
+
+    async def run(self):
+        while True:
+            try:
+                await self.compact()
+            except Exception as e:
+                logger.error(f"History archive error: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,246 @@
+import os
+import queue
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from metrics import stage, INFERENCE_SECONDS, INFERENCE_QUEUE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_EXECUTOR = os.getenv('INFERENCE_EXECUTOR', 'thread')
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', 8))
+INFERENCE_TIMEOUT = float(os.getenv('INFERENCE_TIMEOUT', 30))
+
+# Service method -> modality; each modality gets its own concurrency and queue budget
+MODALITIES = {
+    "sign_language_to_text": "sign_to_text",
+    "text_to_sign_language": "text_to_sign",
+    "speech_to_text": "speech_to_text",
+    "text_to_speech": "text_to_speech",
+    "translate_text": "text_translation",
+    "speech_to_text_stream": "speech_to_text",
+    "sign_language_to_text_stream": "sign_to_text",
+    "sign_language_to_text_batch": "sign_to_text",
+    "text_to_sign_language_batch": "text_to_sign",
+    "speech_to_text_batch": "speech_to_text",
+    "text_to_speech_batch": "text_to_speech",
+    "translate_text_batch": "text_translation",
+}
+
+DEFAULT_CONCURRENCY = {
+    "sign_to_text": 2,
+    "text_to_sign": 2,
+    "speech_to_text": 2,
+    "text_to_speech": 2,
+    "text_translation": 4,
+}
+
+
+def _modality_setting(prefix: str, modality: str, default: int) -> int:
+    return int(os.getenv(f"{prefix}_{modality.upper()}", default))
+
+
+class InferenceError(Exception):
+    status_code = 500
+
+
+class InferenceQueueFullError(InferenceError):
+    """Raised when a modality already has its maximum number of queued calls"""
+    status_code = 503
+
+
+class InferenceTimeoutError(InferenceError):
+    status_code = 504
+
+
+class _ModalityLimiter:
+    def __init__(self, concurrency: int, max_queue: int):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.waiting = 0
+        self.active = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting
+        }
+
+
+class InferenceExecutor:
+    """Runs blocking AI service calls off the event loop with per-modality limits"""
+
+    def __init__(self, services, executor: str = INFERENCE_EXECUTOR,
+                 max_workers: int = INFERENCE_WORKERS, timeout: float = INFERENCE_TIMEOUT):
+        self.services = services
+        self.timeout = timeout
+        if executor == 'process':
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self._stream_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference-stream")
+        self._limiters = {}
+        for modality, default in DEFAULT_CONCURRENCY.items():
+            concurrency = _modality_setting("INFERENCE_CONCURRENCY", modality, default)
+            max_queue = _modality_setting("INFERENCE_MAX_QUEUE", modality, concurrency * 8)
+            self._limiters[modality] = _ModalityLimiter(concurrency, max_queue)
+
+    async def call(self, method: str, *args, timeout: float = None,
+                   on_release: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+        """Runs one service call. `on_release` is called once the call stops
+        holding capacity: when its worker finishes, which can be after the
+        caller timed out or was cancelled, or right away if it never started."""
+        modality = MODALITIES[method]
+        limiter = self._limiters[modality]
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        try:
+            if not limiter.semaphore.locked():
+                # A free slot is taken without suspending, so it never counts as queued
+                await limiter.semaphore.acquire()
+            elif limiter.waiting >= limiter.max_queue:
+                raise InferenceQueueFullError(f"{modality} queue is full, try again later")
+            else:
+                limiter.waiting += 1
+                try:
+                    with stage("ai.queue", INFERENCE_QUEUE_SECONDS, modality=modality):
+                        await asyncio.wait_for(limiter.semaphore.acquire(), timeout)
+                except asyncio.TimeoutError:
+                    raise InferenceTimeoutError(f"{modality} timed out waiting for capacity")
+                finally:
+                    limiter.waiting -= 1
+        except BaseException:
+            if on_release is not None:
+                on_release()
+            raise
+
+        limiter.active += 1
+        # Timed here rather than inside the service so it works for process pools too
+        started = loop.time()
+        future = loop.run_in_executor(self._executor, partial(getattr(self.services, method), *args))
+
+        def _release(_):
+            # The worker can't be interrupted, so the slot is only freed once
+            # the call really finishes, even if the caller already timed out
+            INFERENCE_SECONDS.observe(loop.time() - started, modality=modality, method=method)
+            limiter.active -= 1
+            limiter.semaphore.release()
+            if on_release is not None:
+                on_release()
+
+        future.add_done_callback(_release)
+        try:
+            with stage(f"ai.{modality}"):
+                return await asyncio.wait_for(asyncio.shield(future), max(deadline - loop.time(), 0))
+        except asyncio.TimeoutError:
+            logger.warning(f"Inference call {method} exceeded {timeout}s")
+            raise InferenceTimeoutError(f"{modality} timed out after {timeout}s")
+
+    async def stream(self, method: str, chunks: AsyncIterator[bytes], *args) -> AsyncIterator[Dict[str, Any]]:
+        """Feeds an async chunk source into a generator-style service method
+        running on a worker thread, yielding its partial results as they appear.
+
+        Streams hold a modality slot for their whole duration and always run
+        on a thread, since generators can't cross a process pool.
+        """
+        modality = MODALITIES[method]
+        limiter = self._limiters[modality]
+        if limiter.semaphore.locked() and limiter.waiting >= limiter.max_queue:
+            raise InferenceQueueFullError(f"{modality} queue is full, try again later")
+        limiter.waiting += 1
+        try:
+            await limiter.semaphore.acquire()
+        finally:
+            limiter.waiting -= 1
+        limiter.active += 1
+
+        loop = asyncio.get_running_loop()
+        inputs = queue.Queue(maxsize=8)
+        outputs = asyncio.Queue()
+        done = object()
+
+        def input_iterator():
+            while True:
+                chunk = inputs.get()
+                if chunk is done:
+                    return
+                yield chunk
+
+        def worker():
+            try:
+                for item in getattr(self.services, method)(input_iterator(), *args):
+                    loop.call_soon_threadsafe(outputs.put_nowait, item)
+            except Exception as e:
+                loop.call_soon_threadsafe(outputs.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(outputs.put_nowait, done)
+
+        async def feed():
+            try:
+                async for chunk in chunks:
+                    await asyncio.to_thread(inputs.put, chunk)
+            finally:
+                await asyncio.to_thread(inputs.put, done)
+
+        started = loop.time()
+        thread_future = loop.run_in_executor(self._stream_executor, worker)
+        feeder = asyncio.create_task(feed())
+        try:
+            while True:
+                item = await outputs.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+            await feeder
+        finally:
+            feeder.cancel()
+            try:
+                await feeder
+            except BaseException:
+                pass
+            # Unblock the worker if we stopped early, then wait for it to exit
+            while True:
+                try:
+                    inputs.put_nowait(done)
+                    break
+                except queue.Full:
+                    try:
+                        inputs.get_nowait()
+                    except queue.Empty:
+                        pass
+            await thread_future
+            INFERENCE_SECONDS.observe(loop.time() - started, modality=modality, method=method)
+            limiter.active -= 1
+            limiter.semaphore.release()
+
+    async def sign_language_to_text(self, video_path: str, language: str = "en") -> Dict[str, Any]:
+        return await self.call("sign_language_to_text", video_path, language)
+
+    async def text_to_sign_language(self, text: str, language: str = "en") -> Dict[str, Any]:
+        return await self.call("text_to_sign_language", text, language)
+
+    async def speech_to_text(self, audio_path: str, language: str = "en") -> Dict[str, Any]:
+        return await self.call("speech_to_text", audio_path, language)
+
+    async def text_to_speech(self, text: str, language: str = "en") -> Dict[str, Any]:
+        return await self.call("text_to_speech", text, language)
+
+    async def translate_text(self, text: str, source_lang: str, target_lang: str) -> Dict[str, Any]:
+        return await self.call("translate_text", text, source_lang, target_lang)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {modality: limiter.stats() for modality, limiter in self._limiters.items()}
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        self._stream_executor.shutdown(wait=False)
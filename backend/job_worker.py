@@ -0,0 +1,53 @@
+"""Runs translation job workers outside the API processes.
+
+    python job_worker.py --processes 4 --concurrency 2
+
+Each process claims jobs from the translation_jobs table independently, so
+workers can be added or removed on any host that reaches the database.
+"""
+import os
+import signal
+import asyncio
+import argparse
+import multiprocessing
+
+
+def run_worker(concurrency: int):
+    os.environ['JOB_WORKERS'] = str(concurrency)
+    # Imported after JOB_WORKERS is set so the queue picks up the concurrency
+    import server
+
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await server.startup()
+        await stop.wait()
+        await server.shutdown()
+
+    asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jusoor translation job worker")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv('JOB_WORKERS', 2)))
+    args = parser.parse_args()
+
+    if args.processes == 1:
+        run_worker(args.concurrency)
+        return
+
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(args.concurrency,), name=f"job-worker-{i}")
+        for i in range(args.processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import os
+import json
+import uuid
+import socket
+import asyncio
+import logging
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from database import fetch_one, execute, transaction
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', 1))
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 300))
+# A running job's lease is renewed this often, so long jobs outlive JOB_LEASE_SECONDS
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', JOB_LEASE_SECONDS / 3))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+JOB_RETRY_BACKOFF_SECONDS = int(os.getenv('JOB_RETRY_BACKOFF_SECONDS', 5))
+JOB_MAX_ACTIVE_PER_USER = int(os.getenv('JOB_MAX_ACTIVE_PER_USER', 50))
+JOB_MAX_RUNNING_PER_USER = int(os.getenv('JOB_MAX_RUNNING_PER_USER', 2))
+JOB_CLAIM_WINDOW = int(os.getenv('JOB_CLAIM_WINDOW', 32))
+
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+JobHandler = Callable[[int, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class JobQuotaExceededError(Exception):
+    pass
+
+
+class RetryableJobError(Exception):
+    """Raised by a handler when the job should be attempted again"""
+
+
+class JobCancelledError(Exception):
+    """Raised by JobQueue.ensure_running when the job being processed was
+    cancelled or taken over by another worker"""
+
+
+# Id of the job the current handler call is processing
+_current_job: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("current_job", default=None)
+
+
+def _claim(cursor, worker_id: str) -> Optional[Dict[str, Any]]:
+    # Lock a window of the highest-priority runnable jobs; SKIP LOCKED lets
+    # workers in other processes claim from the rest of the queue concurrently.
+    # Users already at their running cap are left out of the window, so one
+    # user's backlog can't fill it and starve everyone queued behind them.
+    cursor.execute(
+        """SELECT id, user_id, priority FROM translation_jobs
+           WHERE status = 'queued' AND available_at <= NOW()
+             AND user_id NOT IN (
+                 SELECT user_id FROM (
+                     SELECT user_id FROM translation_jobs WHERE status = 'running'
+                     GROUP BY user_id HAVING COUNT(*) >= %s
+                 ) AS capped
+             )
+           ORDER BY priority DESC, id ASC
+           LIMIT %s
+           FOR UPDATE SKIP LOCKED""",
+        (JOB_MAX_RUNNING_PER_USER, JOB_CLAIM_WINDOW)
+    )
+    candidates = cursor.fetchall()
+    if not candidates:
+        return None
+
+    user_ids = tuple({job['user_id'] for job in candidates})
+    cursor.execute(
+        f"""SELECT user_id, COUNT(*) AS running FROM translation_jobs
+            WHERE status = 'running' AND user_id IN ({', '.join(['%s'] * len(user_ids))})
+            GROUP BY user_id""",
+        user_ids
+    )
+    running = {row['user_id']: row['running'] for row in cursor.fetchall()}
+
+    # Fairness: within the window, prefer users with the fewest running jobs
+    # so one user's bulk submission can't monopolize every worker; the cap is
+    # checked again in case a job started since the window was read
+    eligible = [job for job in candidates if running.get(job['user_id'], 0) < JOB_MAX_RUNNING_PER_USER]
+    if not eligible:
+        return None
+    job = min(eligible, key=lambda j: (running.get(j['user_id'], 0), -j['priority'], j['id']))
+
+    cursor.execute(
+        """UPDATE translation_jobs
+           SET status = 'running', worker_id = %s, attempts = attempts + 1, progress = 10,
+               started_at = COALESCE(started_at, NOW()),
+               lease_expires_at = DATE_ADD(NOW(), INTERVAL %s SECOND)
+           WHERE id = %s""",
+        (worker_id, JOB_LEASE_SECONDS, job['id'])
+    )
+    cursor.execute(
+        "SELECT id, user_id, request, attempts, max_attempts FROM translation_jobs WHERE id = %s",
+        (job['id'],)
+    )
+    return cursor.fetchone()
+
+
+class JobQueue:
+    """MySQL-backed job queue; any number of processes can run workers against it"""
+
+    def __init__(self, handler: JobHandler, concurrency: int = JOB_WORKERS):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._wakeup = asyncio.Event()
+
+    async def submit(self, user_id: int, request: Dict[str, Any], priority: int = 0) -> int:
+        active = await fetch_one(
+            "SELECT COUNT(*) AS count FROM translation_jobs WHERE user_id = %s AND status IN ('queued', 'running')",
+            (user_id,)
+        )
+        if active and active['count'] >= JOB_MAX_ACTIVE_PER_USER:
+            raise JobQuotaExceededError(f"At most {JOB_MAX_ACTIVE_PER_USER} active jobs per user")
+
+        job_id = await execute(
+            """INSERT INTO translation_jobs (user_id, priority, request, max_attempts)
+               VALUES (%s, %s, %s, %s)""",
+            (user_id, priority, json.dumps(request, ensure_ascii=False), JOB_MAX_ATTEMPTS)
+        )
+        self._wakeup.set()
+        return job_id
+
+    async def get(self, job_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        job = await fetch_one(
+            """SELECT id, status, priority, progress, attempts, max_attempts, result, error,
+                      created_at, started_at, finished_at
+               FROM translation_jobs WHERE id = %s AND user_id = %s""",
+            (job_id, user_id)
+        )
+        if job and isinstance(job.get('result'), str):
+            job['result'] = json.loads(job['result'])
+        return job
+
+    async def cancel(self, job_id: int, user_id: int) -> bool:
+        await execute(
+            """UPDATE translation_jobs SET status = 'cancelled', finished_at = NOW()
+               WHERE id = %s AND user_id = %s AND status IN ('queued', 'running')""",
+            (job_id, user_id)
+        )
+        job = await fetch_one("SELECT status FROM translation_jobs WHERE id = %s AND user_id = %s", (job_id, user_id))
+        return bool(job) and job['status'] == 'cancelled'
+
+    async def ensure_running(self):
+        """Called by a handler before side effects that must not outlive a
+        cancellation, such as writing history; raises JobCancelledError once
+        the job is no longer running on this worker. The handler itself isn't
+        interrupted, so results computed until then are simply discarded."""
+        job_id = _current_job.get()
+        if job_id is None:
+            return
+        job = await fetch_one(
+            "SELECT status, worker_id FROM translation_jobs WHERE id = %s", (job_id,), replica=False
+        )
+        if not job or job['status'] != 'running' or job['worker_id'] != self.worker_id:
+            raise JobCancelledError(f"Job {job_id} is no longer running on this worker")
+
+    async def _finish(self, job: Dict[str, Any], result: Dict[str, Any]):
+        # The status guard drops the result if the job was cancelled or its
+        # lease was taken over while this worker was busy
+        await execute(
+            """UPDATE translation_jobs
+               SET status = 'succeeded', progress = 100, result = %s, error = NULL, finished_at = NOW()
+               WHERE id = %s AND status = 'running' AND worker_id = %s""",
+            (json.dumps(result, ensure_ascii=False, default=str), job['id'], self.worker_id)
+        )
+
+    async def _fail(self, job: Dict[str, Any], error: str, retryable: bool):
+        if retryable and job['attempts'] < job['max_attempts']:
+            await execute(
+                """UPDATE translation_jobs
+                   SET status = 'queued', progress = 0, error = %s, worker_id = NULL,
+                       available_at = DATE_ADD(NOW(), INTERVAL %s SECOND)
+                   WHERE id = %s AND status = 'running' AND worker_id = %s""",
+                (error, JOB_RETRY_BACKOFF_SECONDS * job['attempts'], job['id'], self.worker_id)
+            )
+        else:
+            await execute(
+                """UPDATE translation_jobs SET status = 'failed', error = %s, finished_at = NOW()
+                   WHERE id = %s AND status = 'running' AND worker_id = %s""",
+                (error, job['id'], self.worker_id)
+            )
+
+    async def _heartbeat(self, job: Dict[str, Any]):
+        """Keeps extending the job's lease while the handler runs, so the
+        reaper only requeues jobs whose worker actually died"""
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                await execute(
+                    """UPDATE translation_jobs SET lease_expires_at = DATE_ADD(NOW(), INTERVAL %s SECOND)
+                       WHERE id = %s AND status = 'running' AND worker_id = %s""",
+                    (JOB_LEASE_SECONDS, job['id'], self.worker_id)
+                )
+            except Exception as e:
+                logger.error(f"Job {job['id']} lease renewal error: {e}")
+
+    async def _process(self, job: Dict[str, Any]):
+        request = job['request']
+        if isinstance(request, str):
+            request = json.loads(request)
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        token = _current_job.set(job['id'])
+        try:
+            result = await self.handler(job['user_id'], request)
+        except JobCancelledError as e:
+            logger.info(str(e))
+        except RetryableJobError as e:
+            await self._fail(job, str(e), retryable=True)
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {e}")
+            await self._fail(job, str(e) or "Job failed", retryable=False)
+        else:
+            await self._finish(job, result)
+        finally:
+            _current_job.reset(token)
+            heartbeat.cancel()
+
+    async def requeue_expired(self):
+        """Return jobs whose worker died mid-run to the queue, or fail them when out of attempts"""
+        await execute(
+            """UPDATE translation_jobs
+               SET status = IF(attempts < max_attempts, 'queued', 'failed'),
+                   error = 'Worker lease expired', worker_id = NULL,
+                   finished_at = IF(attempts < max_attempts, NULL, NOW())
+               WHERE status = 'running' AND lease_expires_at < NOW()"""
+        )
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await transaction(lambda cursor: _claim(cursor, self.worker_id))
+            except Exception as e:
+                logger.error(f"Job claim error: {e}")
+                job = None
+            if job:
+                await self._process(job)
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _reaper(self):
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 4)
+            try:
+                await self.requeue_expired()
+            except Exception as e:
+                logger.error(f"Job reaper error: {e}")
+
+    async def run(self):
+        if self.concurrency <= 0:
+            return
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        workers.append(asyncio.create_task(self._reaper()))
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
@@ -0,0 +1,166 @@
+import os
+import json
+import zlib
+import uuid
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from metrics import stage
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same output just slower
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this aren't worth the CPU or the extra header
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 4))
+# Streamed responses are flushed to the client every this many bytes of JSON
+STREAM_FLUSH_BYTES = int(os.getenv('STREAM_FLUSH_BYTES', 64 * 1024))
+
+
+def _default(value: Any) -> Any:
+    """Types DictCursor rows carry that the encoders don't handle natively,
+    converted the way jsonable_encoder converts them"""
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, bytes):
+        return value.decode()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload: Any) -> bytes:
+    """Compact UTF-8 JSON for plain dicts and lists of database rows"""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        payload, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """br or gzip when the client accepts it (q > 0), preferring br"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", accepted.get("*", 0)) > 0:
+        return "gzip"
+    return None
+
+
+def _gzip_compressor():
+    # wbits 16 + MAX_WBITS writes the gzip header and trailer
+    return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    compressor = _gzip_compressor()
+    return compressor.compress(body) + compressor.flush()
+
+
+class FastJSONResponse(Response):
+    """JSON response rendered without jsonable_encoder. Routes return it
+    directly, which also skips FastAPI's own encoding pass."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(request: Request, payload: Any, status_code: int = 200) -> Response:
+    """FastJSONResponse, compressed when it's big enough and the client accepts it"""
+    with stage("serialize"):
+        body = dumps(payload)
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(request.headers.get("accept-encoding")) if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding:
+        with stage("compress"):
+            body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(body, status_code=status_code, media_type=FastJSONResponse.media_type, headers=headers)
+
+
+class _StreamEncoder:
+    """Incremental gzip/brotli for a streamed body; identity when encoding is None"""
+
+    def __init__(self, encoding: Optional[str]):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        elif encoding == "gzip":
+            self._compressor = _gzip_compressor()
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        if self.encoding == "gzip":
+            return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return data
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        if self.encoding == "gzip":
+            return self._compressor.flush()
+        return b""
+
+
+def ndjson_stream(request: Request, rows: AsyncIterator[Iterable[Dict[str, Any]]],
+                  filename: Optional[str] = None) -> StreamingResponse:
+    """Streams batches of rows as newline-delimited JSON, one row per line,
+    so only one batch is ever held in memory"""
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    encoder = _StreamEncoder(encoding)
+
+    async def body():
+        buffered = []
+        size = 0
+        async for batch in rows:
+            for row in batch:
+                line = dumps(row) + b"\n"
+                buffered.append(line)
+                size += len(line)
+            if size >= STREAM_FLUSH_BYTES:
+                yield encoder.chunk(b"".join(buffered))
+                buffered, size = [], 0
+        tail = encoder.chunk(b"".join(buffered)) if buffered else b""
+        yield tail + encoder.finish()
+
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-store"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return StreamingResponse(body(), media_type="application/x-ndjson", headers=headers)
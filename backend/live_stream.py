@@ -0,0 +1,101 @@
+import os
+import json
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+logger = logging.getLogger(__name__)
+
+LIVE_WS_HEARTBEAT_SECONDS = float(os.getenv('LIVE_WS_HEARTBEAT_SECONDS', 15))
+LIVE_WS_IDLE_TIMEOUT = float(os.getenv('LIVE_WS_IDLE_TIMEOUT', 60))
+LIVE_WS_MAX_PENDING = int(os.getenv('LIVE_WS_MAX_PENDING', 32))
+
+MessageHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class LiveSessionStream:
+    """Drives one authenticated live-session WebSocket.
+
+    Frames are read into a bounded queue; once it is full the reader stops
+    pulling from the socket, so TCP flow control pushes back on the client.
+    Outgoing frames go through a second bounded queue, so a slow consumer
+    stalls processing instead of buffering without limit.
+    """
+
+    def __init__(self, websocket: WebSocket, handler: MessageHandler,
+                 heartbeat_interval: float = LIVE_WS_HEARTBEAT_SECONDS,
+                 idle_timeout: float = LIVE_WS_IDLE_TIMEOUT,
+                 max_pending: int = LIVE_WS_MAX_PENDING):
+        self.websocket = websocket
+        self.handler = handler
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self._incoming = asyncio.Queue(maxsize=max_pending)
+        self._outgoing = asyncio.Queue(maxsize=max_pending)
+        self._last_seen = asyncio.get_running_loop().time()
+
+    async def _reader(self):
+        while True:
+            text = await self.websocket.receive_text()
+            self._last_seen = asyncio.get_running_loop().time()
+            try:
+                frame = json.loads(text)
+            except ValueError:
+                frame = None
+            if not isinstance(frame, dict):
+                await self._outgoing.put({"type": "error", "detail": "Frames must be JSON objects"})
+                continue
+            kind = frame.get("type")
+            if kind == "pong":
+                continue
+            if kind == "ping":
+                await self._outgoing.put({"type": "pong"})
+                continue
+            await self._incoming.put(frame)
+
+    async def _processor(self):
+        while True:
+            frame = await self._incoming.get()
+            try:
+                reply = await self.handler(frame)
+            except Exception as e:
+                logger.error(f"Live session frame error: {e}")
+                reply = {"type": "error", "detail": str(e) or "Failed to process message"}
+            if frame.get("id") is not None:
+                reply["id"] = frame["id"]
+            await self._outgoing.put(reply)
+
+    async def _writer(self):
+        while True:
+            await self.websocket.send_json(await self._outgoing.get())
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if loop.time() - self._last_seen > self.idle_timeout:
+                await self.websocket.close(code=1001)
+                return
+            # Skip the ping rather than block behind a full queue
+            if not self._outgoing.full():
+                self._outgoing.put_nowait({"type": "ping"})
+
+    async def run(self):
+        tasks = [
+            asyncio.create_task(self._reader()),
+            asyncio.create_task(self._processor()),
+            asyncio.create_task(self._writer()),
+            asyncio.create_task(self._heartbeat()),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error and not isinstance(error, WebSocketDisconnect):
+                    logger.error(f"Live session stream error: {error}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,245 @@
+import os
+import re
+import json
+import time
+import uuid
+import bisect
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TRACE_SLOW_SECONDS = float(os.getenv('TRACE_SLOW_SECONDS', 1.0))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["Histogram"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: List[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with a fixed label set"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[position] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        for key, series in sorted(snapshot.items()):
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {cumulative}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition format for every registered histogram"""
+    lines = []
+    for histogram in _registry:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "jusoor_http_request_duration_seconds", "HTTP request latency by route",
+    ("method", "route", "status")
+)
+DB_QUERY_SECONDS = Histogram(
+    "jusoor_db_query_duration_seconds", "SQL execution time by statement fingerprint", ("statement",)
+)
+DB_TARGET_QUERY_SECONDS = Histogram(
+    "jusoor_db_target_query_seconds", "SQL execution time by database server (primary or replica)", ("target",)
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "jusoor_db_pool_wait_seconds", "Time spent acquiring a pooled connection"
+)
+INFERENCE_SECONDS = Histogram(
+    "jusoor_inference_duration_seconds", "AI service call time by modality and method", ("modality", "method")
+)
+INFERENCE_QUEUE_SECONDS = Histogram(
+    "jusoor_inference_queue_seconds", "Time spent waiting for a modality slot", ("modality",)
+)
+INFERENCE_BATCH_SIZE = Histogram(
+    "jusoor_inference_batch_size", "Requests dispatched per micro-batch", ("modality",),
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+INFERENCE_BATCH_WAIT_SECONDS = Histogram(
+    "jusoor_inference_batch_wait_seconds", "Time a request waited for its micro-batch to dispatch", ("modality",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+STAGE_SECONDS = Histogram(
+    "jusoor_stage_duration_seconds", "Request stage time by stage name", ("stage",)
+)
+
+
+# ===== Tracing =====
+
+class Trace:
+    def __init__(self, request_id: str, method: str, path: str):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float, float]] = []
+        self.user_id: Optional[int] = None
+        self.client_ip: Optional[str] = None
+        self.user_agent: Optional[str] = None
+
+    def add(self, name: str, started: float, elapsed: float):
+        # list.append is atomic, so executor threads can record stages too
+        self.stages.append((name, started - self.started, elapsed))
+
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        totals: Dict[str, Dict[str, float]] = {}
+        for name, _, elapsed in self.stages:
+            entry = totals.setdefault(name, {"count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] = round(entry["seconds"] + elapsed, 6)
+        return totals
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def stage(name: str, histogram: Histogram = None, **labels):
+    """Times a block, recording it on the current request trace and in
+    `histogram` (the generic per-stage histogram when none is given)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if histogram is None:
+            STAGE_SECONDS.observe(elapsed, stage=name)
+        else:
+            histogram.observe(elapsed, **labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(name, started, elapsed)
+
+
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+_VALUE_ROWS = re.compile(r"(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+")
+
+
+@lru_cache(maxsize=1024)
+def statement_fingerprint(query: str) -> str:
+    """Collapses literals, placeholder lists and multi-row VALUES so every
+    call site maps to one bounded metric label"""
+    text = " ".join(query.split())
+    text = _LITERALS.sub("?", text)
+    text = _PLACEHOLDER_LISTS.sub("(...)", text)
+    text = _VALUE_ROWS.sub(r"\1", text)
+    return text[:160]
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request id to log records as %(request_id)s"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace = _current_trace.get()
+        record.request_id = trace.request_id if trace else "-"
+        return True
+
+
+class TracingMiddleware:
+    """ASGI middleware that opens a trace per HTTP request, records the route
+    latency histogram and logs a per-stage breakdown for slow requests"""
+
+    def __init__(self, app, slow_seconds: float = TRACE_SLOW_SECONDS):
+        self.app = app
+        self.slow_seconds = slow_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        trace = Trace(request_id, scope["method"], scope["path"])
+        forwarded = headers.get(b"x-forwarded-for", b"").decode("latin-1").split(",")[0].strip()
+        trace.client_ip = forwarded or (scope.get("client") or (None,))[0]
+        trace.user_agent = headers.get(b"user-agent", b"").decode("latin-1") or None
+        token = _current_trace.set(trace)
+        status = {"code": 500}
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except Exception:
+            logger.exception(f"Unhandled error in {scope['method']} {scope['path']} (request {request_id})")
+            raise
+        finally:
+            _current_trace.reset(token)
+            elapsed = time.perf_counter() - trace.started
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=scope["method"], route=route_path, status=status["code"])
+            if elapsed >= self.slow_seconds:
+                logger.warning(json.dumps({
+                    "event": "slow_request",
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "route": route_path,
+                    "path": scope["path"],
+                    "status": status["code"],
+                    "seconds": round(elapsed, 6),
+                    "stages": trace.breakdown(),
+                    "timeline": [
+                        {"stage": name, "offset": round(offset, 6), "seconds": round(seconds, 6)}
+                        for name, offset, seconds in trace.stages
+                    ]
+                }, ensure_ascii=False))
@@ -0,0 +1,150 @@
+import os
+import asyncio
+from collections import Counter
+from typing import Any, Dict, Hashable, List, Tuple
+
+from inference import MODALITIES, DEFAULT_CONCURRENCY, _modality_setting
+from metrics import stage, INFERENCE_BATCH_SIZE, INFERENCE_BATCH_WAIT_SECONDS
+
+# Single-call method -> batched service method taking a list of the first argument
+BATCH_METHODS = {
+    "sign_language_to_text": "sign_language_to_text_batch",
+    "text_to_sign_language": "text_to_sign_language_batch",
+    "speech_to_text": "speech_to_text_batch",
+    "text_to_speech": "text_to_speech_batch",
+    "translate_text": "translate_text_batch",
+}
+
+# How long the first request of a batch waits for company, and the size that
+# dispatches a batch early; both can be set per modality, e.g.
+# INFERENCE_BATCH_WINDOW_MS_SPEECH_TO_TEXT=25
+INFERENCE_BATCH_WINDOW_MS = int(os.getenv('INFERENCE_BATCH_WINDOW_MS', 10))
+INFERENCE_MAX_BATCH = int(os.getenv('INFERENCE_MAX_BATCH', 16))
+
+
+class _PendingBatch:
+    __slots__ = ("items", "full")
+
+    def __init__(self):
+        # (input, future, enqueued at)
+        self.items: List[Tuple[Any, asyncio.Future, float]] = []
+        self.full = asyncio.Event()
+
+
+class MicroBatcher:
+    """Collects concurrent inference calls that share a method and trailing
+    arguments (the language pair) and dispatches them as one batched service
+    call, which takes a single modality slot and pays the model's fixed
+    overhead once. A batch goes out when its window closes or it reaches
+    the maximum size; a lone request is sent as a plain call.
+    """
+
+    def __init__(self, inference, window_ms: int = INFERENCE_BATCH_WINDOW_MS, max_batch: int = INFERENCE_MAX_BATCH):
+        self.inference = inference
+        self._settings = {
+            modality: (
+                _modality_setting("INFERENCE_BATCH_WINDOW_MS", modality, window_ms) / 1000,
+                _modality_setting("INFERENCE_MAX_BATCH", modality, max_batch)
+            )
+            for modality in DEFAULT_CONCURRENCY
+        }
+        self._pending: Dict[Tuple[Hashable, ...], _PendingBatch] = {}
+        self._tasks = set()
+        self.counters = {modality: Counter() for modality in DEFAULT_CONCURRENCY}
+
+    async def call(self, method: str, item: Any, *shared) -> Dict[str, Any]:
+        modality = MODALITIES[method]
+        window, max_batch = self._settings[modality]
+        if method not in BATCH_METHODS or max_batch <= 1:
+            return await self.inference.call(method, item, *shared)
+
+        loop = asyncio.get_running_loop()
+        key = (method, *shared)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch()
+            task = asyncio.create_task(self._dispatch(key, batch, modality, window))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        future = loop.create_future()
+        batch.items.append((item, future, loop.time()))
+        if len(batch.items) >= max_batch:
+            # Closed to new arrivals; the next request starts a fresh batch
+            self._pending.pop(key, None)
+            batch.full.set()
+
+        with stage("ai.batch"):
+            return await future
+
+    async def _dispatch(self, key: Tuple[Hashable, ...], batch: _PendingBatch, modality: str, window: float):
+        try:
+            await asyncio.wait_for(batch.full.wait(), window)
+        except asyncio.TimeoutError:
+            pass
+        if self._pending.get(key) is batch:
+            del self._pending[key]
+
+        method, *shared = key
+        # Callers that gave up while the batch was filling are left out
+        items = [entry for entry in batch.items if not entry[1].done()]
+        if not items:
+            return
+
+        now = asyncio.get_running_loop().time()
+        for _, _, enqueued_at in items:
+            INFERENCE_BATCH_WAIT_SECONDS.observe(now - enqueued_at, modality=modality)
+        INFERENCE_BATCH_SIZE.observe(len(items), modality=modality)
+        counters = self.counters[modality]
+        counters["batches"] += 1
+        counters["requests"] += len(items)
+
+        try:
+            if len(items) == 1:
+                results = [await self.inference.call(method, items[0][0], *shared)]
+            else:
+                results = await self.inference.call(BATCH_METHODS[method], [entry[0] for entry in items], *shared)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{BATCH_METHODS[method]} returned {len(results)} results for {len(items)} inputs")
+        except Exception as e:
+            counters["failed_batches"] += 1
+            for _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def sign_language_to_text(self, video_path: str, language: str = "en") -> Dict[str, Any]:
+        return await self.call("sign_language_to_text", video_path, language)
+
+    async def text_to_sign_language(self, text: str, language: str = "en") -> Dict[str, Any]:
+        return await self.call("text_to_sign_language", text, language)
+
+    async def speech_to_text(self, audio_path: str, language: str = "en") -> Dict[str, Any]:
+        return await self.call("speech_to_text", audio_path, language)
+
+    async def text_to_speech(self, text: str, language: str = "en") -> Dict[str, Any]:
+        return await self.call("text_to_speech", text, language)
+
+    async def translate_text(self, text: str, source_lang: str, target_lang: str) -> Dict[str, Any]:
+        return await self.call("translate_text", text, source_lang, target_lang)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        stats = {}
+        for modality, (window, max_batch) in self._settings.items():
+            counters = self.counters[modality]
+            stats[modality] = {
+                "window_ms": round(window * 1000),
+                "max_batch": max_batch,
+                "batches": counters["batches"],
+                "requests": counters["requests"],
+                "failed_batches": counters["failed_batches"],
+                "avg_batch_size": round(counters["requests"] / counters["batches"], 2) if counters["batches"] else 0.0,
+                "pending": sum(
+                    len(batch.items) for key, batch in self._pending.items() if MODALITIES[key[0]] == modality
+                )
+            }
+        return stats
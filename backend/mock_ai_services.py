@@ -1,15 +1,43 @@
+import io
 import time
+import wave
 import random
-from typing import Dict, Any
+import hashlib
+from typing import Dict, Any, Iterable, Iterator, List
+
+from ai_simulator import simulator, word_count, audio_seconds, video_frames
+
+def artifact_id(text: str, language: str) -> str:
+    """Stable content-addressed ID, identical across processes (unlike hash())"""
+    return hashlib.sha256(f"{language}:{text}".encode("utf-8")).hexdigest()[:16]
+
+def elapsed(started: float) -> float:
+    """Measured processing time reported by every service call"""
+    return round(time.perf_counter() - started, 3)
 
 class MockAIServices:
-    """Mock AI services for academic demonstration"""
+    """Mock AI services for academic demonstration; latency and failures
+    come from ai_simulator (fixed per method unless AI_SIMULATOR is on)"""
     
     @staticmethod
     def sign_language_to_text(video_path: str, language: str = "en") -> Dict[str, Any]:
         """Mock sign language video to text translation"""
-        time.sleep(1.5)  # Simulate processing time
-        
+        started = time.perf_counter()
+        rng = simulator.rng("sign_language_to_text", video_path)
+        simulator.run("sign_language_to_text", video_frames(video_path), rng)
+        return MockAIServices._sign_recognition(rng, elapsed(started))
+    
+    @staticmethod
+    def sign_language_to_text_batch(video_paths: List[str], language: str = "en") -> List[Dict[str, Any]]:
+        """Mock batched sign recognition, one result per video in order"""
+        started = time.perf_counter()
+        rng = simulator.rng("sign_language_to_text", "\n".join(video_paths))
+        simulator.run("sign_language_to_text", sum(map(video_frames, video_paths)), rng, len(video_paths))
+        processing_time = elapsed(started)
+        return [MockAIServices._sign_recognition(rng, processing_time) for _ in video_paths]
+    
+    @staticmethod
+    def _sign_recognition(rng: random.Random, processing_time: float) -> Dict[str, Any]:
         sample_texts = [
             "Hello, how are you today?",
             "Thank you for your help.",
@@ -21,31 +49,58 @@ class MockAIServices:
         
         return {
             "success": True,
-            "text": random.choice(sample_texts),
-            "confidence": round(random.uniform(0.85, 0.98), 2),
-            "processing_time": 1.5,
+            "text": rng.choice(sample_texts),
+            "confidence": round(rng.uniform(0.85, 0.98), 2),
+            "processing_time": processing_time,
             "detected_language": "ASL"
         }
     
     @staticmethod
     def text_to_sign_language(text: str, language: str = "en") -> Dict[str, Any]:
         """Mock text to sign language video generation"""
-        time.sleep(1.2)
-        
+        started = time.perf_counter()
+        simulator.run("text_to_sign_language", word_count(text), simulator.rng("text_to_sign_language", text))
+        return MockAIServices._sign_video(text, language, elapsed(started))
+    
+    @staticmethod
+    def text_to_sign_language_batch(texts: List[str], language: str = "en") -> List[Dict[str, Any]]:
+        """Mock batched sign video generation, one result per text in order"""
+        started = time.perf_counter()
+        rng = simulator.rng("text_to_sign_language", "\n".join(texts))
+        simulator.run("text_to_sign_language", sum(map(word_count, texts)), rng, len(texts))
+        processing_time = elapsed(started)
+        return [MockAIServices._sign_video(text, language, processing_time) for text in texts]
+    
+    @staticmethod
+    def _sign_video(text: str, language: str, processing_time: float) -> Dict[str, Any]:
         # Return a mock video URL
         return {
             "success": True,
-            "video_url": "/api/mock/sign-video/" + str(hash(text))[-8:],
+            "video_url": "/api/mock/sign-video/" + artifact_id(text, language),
             "duration": len(text.split()) * 0.8,
-            "processing_time": 1.2,
+            "processing_time": processing_time,
             "language": "ASL"
         }
     
     @staticmethod
     def speech_to_text(audio_path: str, language: str = "en") -> Dict[str, Any]:
         """Mock speech to text conversion"""
-        time.sleep(1.0)
-        
+        started = time.perf_counter()
+        rng = simulator.rng("speech_to_text", audio_path)
+        simulator.run("speech_to_text", audio_seconds(audio_path), rng)
+        return MockAIServices._transcript(language, rng, elapsed(started))
+    
+    @staticmethod
+    def speech_to_text_batch(audio_paths: List[str], language: str = "en") -> List[Dict[str, Any]]:
+        """Mock batched speech recognition, one result per audio file in order"""
+        started = time.perf_counter()
+        rng = simulator.rng("speech_to_text", "\n".join(audio_paths))
+        simulator.run("speech_to_text", sum(map(audio_seconds, audio_paths)), rng, len(audio_paths))
+        processing_time = elapsed(started)
+        return [MockAIServices._transcript(language, rng, processing_time) for _ in audio_paths]
+    
+    @staticmethod
+    def _transcript(language: str, rng: random.Random, processing_time: float) -> Dict[str, Any]:
         sample_texts = [
             "Welcome to Jusoor translation system.",
             "This is a demonstration of speech recognition.",
@@ -56,30 +111,96 @@ class MockAIServices:
         
         return {
             "success": True,
-            "text": random.choice(sample_texts),
-            "confidence": round(random.uniform(0.90, 0.99), 2),
-            "processing_time": 1.0,
+            "text": rng.choice(sample_texts),
+            "confidence": round(rng.uniform(0.90, 0.99), 2),
+            "processing_time": processing_time,
             "detected_language": language
         }
     
+    @staticmethod
+    def speech_to_text_stream(audio_chunks: Iterable[bytes], language: str = "en") -> Iterator[Dict[str, Any]]:
+        """Mock incremental speech recognition, one partial transcript per audio chunk"""
+        words = []
+        vocabulary = "welcome to jusoor this is a live transcript of your audio".split()
+        rng = simulator.rng("speech_to_text_stream", language)
+        for index, chunk in enumerate(audio_chunks):
+            simulator.run("speech_to_text_stream", 1, rng)
+            words.append(vocabulary[index % len(vocabulary)])
+            yield {"partial": True, "text": " ".join(words), "bytes": len(chunk)}
+        
+        yield {
+            "partial": False,
+            "success": True,
+            "text": " ".join(words).capitalize() + ".",
+            "confidence": round(rng.uniform(0.90, 0.99), 2),
+            "detected_language": language
+        }
+    
+    @staticmethod
+    def sign_language_to_text_stream(video_chunks: Iterable[bytes], language: str = "en") -> Iterator[Dict[str, Any]]:
+        """Mock incremental sign recognition, one partial transcript per video chunk"""
+        words = []
+        vocabulary = "hello thank you please help me good morning".split()
+        rng = simulator.rng("sign_language_to_text_stream", language)
+        for index, chunk in enumerate(video_chunks):
+            simulator.run("sign_language_to_text_stream", 1, rng)
+            words.append(vocabulary[index % len(vocabulary)])
+            yield {"partial": True, "text": " ".join(words), "bytes": len(chunk)}
+        
+        yield {
+            "partial": False,
+            "success": True,
+            "text": " ".join(words).capitalize() + ".",
+            "confidence": round(rng.uniform(0.85, 0.98), 2),
+            "detected_language": "ASL"
+        }
+    
     @staticmethod
     def text_to_speech(text: str, language: str = "en") -> Dict[str, Any]:
         """Mock text to speech conversion"""
-        time.sleep(0.8)
-        
+        started = time.perf_counter()
+        simulator.run("text_to_speech", word_count(text), simulator.rng("text_to_speech", text))
+        return MockAIServices._speech(text, language, elapsed(started))
+    
+    @staticmethod
+    def text_to_speech_batch(texts: List[str], language: str = "en") -> List[Dict[str, Any]]:
+        """Mock batched speech synthesis, one result per text in order"""
+        started = time.perf_counter()
+        rng = simulator.rng("text_to_speech", "\n".join(texts))
+        simulator.run("text_to_speech", sum(map(word_count, texts)), rng, len(texts))
+        processing_time = elapsed(started)
+        return [MockAIServices._speech(text, language, processing_time) for text in texts]
+    
+    @staticmethod
+    def _speech(text: str, language: str, processing_time: float) -> Dict[str, Any]:
         return {
             "success": True,
-            "audio_url": "/api/mock/audio/" + str(hash(text))[-8:],
+            "audio_url": "/api/mock/audio/" + artifact_id(text, language),
             "duration": len(text.split()) * 0.5,
-            "processing_time": 0.8,
+            "processing_time": processing_time,
             "language": language
         }
     
     @staticmethod
     def translate_text(text: str, source_lang: str, target_lang: str) -> Dict[str, Any]:
         """Mock text translation"""
-        time.sleep(0.5)
-        
+        started = time.perf_counter()
+        rng = simulator.rng("translate_text", text)
+        simulator.run("translate_text", word_count(text), rng)
+        return MockAIServices._translation(text, source_lang, target_lang, rng, elapsed(started))
+    
+    @staticmethod
+    def translate_text_batch(texts: List[str], source_lang: str, target_lang: str) -> List[Dict[str, Any]]:
+        """Mock batched text translation, one result per text in order"""
+        started = time.perf_counter()
+        rng = simulator.rng("translate_text", "\n".join(texts))
+        simulator.run("translate_text", sum(map(word_count, texts)), rng, len(texts))
+        processing_time = elapsed(started)
+        return [MockAIServices._translation(text, source_lang, target_lang, rng, processing_time) for text in texts]
+    
+    @staticmethod
+    def _translation(text: str, source_lang: str, target_lang: str, rng: random.Random,
+                     processing_time: float) -> Dict[str, Any]:
         # Simple mock translations
         translations = {
             "en_ar": {
@@ -104,6 +225,27 @@ class MockAIServices:
             "translated_text": translated,
             "source_language": source_lang,
             "target_language": target_lang,
-            "confidence": round(random.uniform(0.92, 0.99), 2),
-            "processing_time": 0.5
-        }
\ No newline at end of file
+            "confidence": round(rng.uniform(0.92, 0.99), 2),
+            "processing_time": processing_time
+        }
+    
+    @staticmethod
+    def render_sign_video(text: str, language: str = "en") -> bytes:
+        """Mock sign video bytes, deterministic for the same text and language"""
+        seed = hashlib.sha256(f"{language}:{text}".encode("utf-8")).digest()
+        frames = seed * (len(text.split()) * 2048)
+        # Just enough of an MP4 header for players to recognise the container
+        return b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom" + frames
+    
+    @staticmethod
+    def render_speech(text: str, language: str = "en") -> bytes:
+        """Mock TTS audio: half a second of near-silent 8 kHz WAV per word"""
+        seed = hashlib.sha256(f"{language}:{text}".encode("utf-8")).digest()
+        samples = bytes(128 + (b % 3) - 1 for b in seed) * (len(text.split()) * 125)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(1)
+            out.setframerate(8000)
+            out.writeframes(samples)
+        return buffer.getvalue()
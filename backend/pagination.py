@@ -0,0 +1,97 @@
+import os
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = int(os.getenv('DEFAULT_PAGE_SIZE', 50))
+MAX_PAGE_SIZE = int(os.getenv('MAX_PAGE_SIZE', 200))
+
+
+MAX_CURSOR_CHARS = 256
+# Largest value of a signed BIGINT column
+_MAX_KEY = 2 ** 63 - 1
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _encode(values: List[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode(cursor: str, size: int) -> List[Any]:
+    """JSON list of `size` values from a cursor, raising InvalidCursorError
+    for anything a client may have garbled or edited"""
+    try:
+        if len(cursor) > MAX_CURSOR_CHARS:
+            raise ValueError("Cursor too long")
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("Unexpected cursor shape")
+        return values
+    except (binascii.Error, ValueError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+
+def _key(value: Any) -> int:
+    # bool is an int subclass, and floats or huge ints would only fail in SQL
+    if type(value) is not int or abs(value) > _MAX_KEY:
+        raise InvalidCursorError("Invalid pagination cursor")
+    return value
+
+
+def _timestamp(value: Any) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    return _encode([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    created_at, row_id = _decode(cursor, 2)
+    return _timestamp(created_at), _key(row_id)
+
+
+def encode_ranked_cursor(score: int, created_at: datetime, row_id: int) -> str:
+    """Cursor for results ordered by (score DESC, created_at DESC, id DESC)"""
+    return _encode([score, created_at.isoformat(), row_id])
+
+
+def decode_ranked_cursor(cursor: str) -> Tuple[int, datetime, int]:
+    score, created_at, row_id = _decode(cursor, 3)
+    return _key(score), _timestamp(created_at), _key(row_id)
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def keyset_condition(cursor: Optional[str], created_column: str = "created_at",
+                     id_column: str = "id") -> Tuple[str, Tuple]:
+    """SQL fragment selecting rows strictly after the cursor in
+    (created_at DESC, id DESC) order; empty when there is no cursor"""
+    if not cursor:
+        return "", ()
+    created_at, row_id = decode_cursor(cursor)
+    return (
+        f"({created_column} < %s OR ({created_column} = %s AND {id_column} < %s))",
+        (created_at, created_at, row_id)
+    )
+
+
+def paginate(rows: Optional[List[Dict[str, Any]]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trims a result fetched with LIMIT limit + 1 and returns (page, next_cursor)"""
+    rows = list(rows or [])
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    last = page[-1]
+    return page, encode_cursor(last['created_at'], last['id'])
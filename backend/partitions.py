@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+from typing import List, Sequence, Tuple
+
+from database import fetch_all, execute_many
+
+# Every partitioned table ends in this catch-all; new ranges are split out of it
+CATCH_ALL = "p_future"
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def daily_ranges(first: date, last: date) -> List[Tuple[str, date, date]]:
+    """(partition name, start, end) for each day in [first, last]"""
+    days = (last - first).days + 1
+    return [
+        (f"p{first + timedelta(days=i):%Y%m%d}", first + timedelta(days=i), first + timedelta(days=i + 1))
+        for i in range(max(days, 0))
+    ]
+
+
+def monthly_ranges(first: date, last: date) -> List[Tuple[str, date, date]]:
+    """(partition name, start, end) for each month from first's month through last's"""
+    ranges = []
+    current = month_start(first)
+    while current <= last:
+        ranges.append((f"p{current:%Y%m}", current, next_month(current)))
+        current = next_month(current)
+    return ranges
+
+
+async def list_partitions(table: str) -> List[str]:
+    """Partition names in range order, or [] when the table isn't partitioned"""
+    rows = await fetch_all(
+        """SELECT PARTITION_NAME AS name
+           FROM information_schema.PARTITIONS
+           WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+           ORDER BY PARTITION_ORDINAL_POSITION""",
+        (table,)
+    )
+    return [row['name'] for row in rows or []]
+
+
+async def add_partitions(table: str, existing: Sequence[str], ranges: Sequence[Tuple[str, date, date]]) -> int:
+    """Splits the missing ranges out of the catch-all partition. Ranges must
+    be ascending and newer than every existing partition but the catch-all."""
+    missing = [r for r in ranges if r[0] not in existing]
+    if not missing:
+        return 0
+    definitions = ", ".join(
+        f"PARTITION {name} VALUES LESS THAN (UNIX_TIMESTAMP('{end:%Y-%m-%d} 00:00:00'))"
+        for name, _, end in missing
+    )
+    await execute_many([(
+        f"""ALTER TABLE {table} REORGANIZE PARTITION {CATCH_ALL} INTO
+            ({definitions}, PARTITION {CATCH_ALL} VALUES LESS THAN MAXVALUE)""",
+        None
+    )])
+    return len(missing)
+
+
+async def drop_partitions(table: str, names: Sequence[str]) -> int:
+    """Drops whole partitions; a metadata operation instead of row-by-row deletes"""
+    names = [name for name in names if name != CATCH_ALL]
+    if names:
+        await execute_many([(f"ALTER TABLE {table} DROP PARTITION {', '.join(names)}", None)])
+    return len(names)
@@ -0,0 +1,183 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from database import fetch_one, fetch_all, execute
+from auth import JWT_EXPIRATION_HOURS
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', 10000))
+PRINCIPAL_CACHE_TTL = float(os.getenv('PRINCIPAL_CACHE_TTL', 30))
+PRINCIPAL_INVALIDATION_POLL_SECONDS = float(os.getenv('PRINCIPAL_INVALIDATION_POLL_SECONDS', 2))
+AUTH_TRUST_TOKEN_CLAIMS = os.getenv('AUTH_TRUST_TOKEN_CLAIMS', 'false').lower() == 'true'
+# Recorded for a user who no longer exists, so none of their tokens is trusted
+MISSING_USER_VERSION = 2 ** 31 - 1
+
+
+class PrincipalCache:
+    """Short-lived cache of active users keyed by id, invalidated across workers
+    through the principal_invalidations table.
+
+    Tokens carry the user's auth_version, which every role, status or
+    profile change bumps. In claims mode a token is trusted only while its
+    version is at least the newest one this worker has seen invalidated,
+    and only once the worker has loaded every invalidation young enough
+    to matter to a live token.
+    """
+
+    def __init__(self, max_entries: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL,
+                 trust_claims: bool = AUTH_TRUST_TOKEN_CLAIMS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.trust_claims = trust_claims
+        self._entries = OrderedDict()
+        # user_id -> (auth_version after the latest invalidation, when it
+        # happened); tokens carrying an older version can't be trusted on
+        # their claims alone
+        self._versions: Dict[int, Tuple[int, float]] = {}
+        self._last_invalidation_id = None
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "claims_trusted": 0,
+            "stale_claims": 0,
+            "invalidations": 0
+        }
+
+    def get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return user
+
+    def put(self, user_id: int, user: Dict[str, Any]):
+        self._entries[user_id] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_local(self, user_id: int, version: int, at: Optional[float] = None):
+        self._entries.pop(user_id, None)
+        known_version, known_at = self._versions.get(user_id, (0, 0.0))
+        self._versions[user_id] = (max(known_version, version), max(known_at, at or time.time()))
+        self.counters["invalidations"] += 1
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the startup load of recent invalidations has finished"""
+        return self._last_invalidation_id is not None
+
+    def principal_from_claims(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not self.trust_claims or not self.loaded or "role" not in payload or "ver" not in payload:
+            return None
+        user_id = payload.get("user_id")
+        if payload["ver"] < self._versions.get(user_id, (0, 0.0))[0]:
+            self.counters["stale_claims"] += 1
+            return None
+        self.counters["claims_trusted"] += 1
+        return {
+            "id": user_id,
+            "email": payload.get("email"),
+            "full_name": payload.get("full_name"),
+            "role": payload["role"],
+            "preferred_language": payload.get("preferred_language")
+        }
+
+    async def get_principal(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        principal = self.principal_from_claims(payload)
+        if principal:
+            return principal
+
+        user_id = payload.get("user_id")
+        user = self.get(user_id)
+        if user is not None:
+            self.counters["hits"] += 1
+            return user
+
+        self.counters["misses"] += 1
+        user = await fetch_one(
+            "SELECT id, email, full_name, role, preferred_language FROM users WHERE id = %s AND is_active = TRUE",
+            (user_id,)
+        )
+        if user:
+            self.put(user_id, user)
+        return user
+
+    async def invalidate(self, user_id: int):
+        """Drop a user locally and publish the invalidation to every other
+        worker; call it after the update that bumped users.auth_version"""
+        row = await fetch_one("SELECT auth_version FROM users WHERE id = %s", (user_id,), replica=False)
+        version = row['auth_version'] if row else MISSING_USER_VERSION
+        self.invalidate_local(user_id, version)
+        try:
+            await execute(
+                "INSERT INTO principal_invalidations (user_id, auth_version) VALUES (%s, %s)",
+                (user_id, version)
+            )
+        except Exception as e:
+            logger.error(f"Principal invalidation publish error: {e}")
+
+    async def _poll_once(self):
+        if self._last_invalidation_id is None:
+            # Startup: every invalidation a still-valid token could predate,
+            # before any claims are trusted
+            last = await fetch_one("SELECT COALESCE(MAX(id), 0) AS last_id FROM principal_invalidations")
+            last_id = last['last_id'] if last else 0
+            rows = await fetch_all(
+                """SELECT id, user_id, auth_version, UNIX_TIMESTAMP(created_at) AS invalidated_at
+                   FROM principal_invalidations
+                   WHERE id <= %s AND created_at >= DATE_SUB(NOW(), INTERVAL %s HOUR) ORDER BY id""",
+                (last_id, JWT_EXPIRATION_HOURS)
+            )
+        else:
+            last_id = self._last_invalidation_id
+            rows = await fetch_all(
+                """SELECT id, user_id, auth_version, UNIX_TIMESTAMP(created_at) AS invalidated_at
+                   FROM principal_invalidations WHERE id > %s ORDER BY id""",
+                (last_id,)
+            )
+        for row in rows or []:
+            self.invalidate_local(row['user_id'], row['auth_version'], float(row['invalidated_at']))
+            last_id = max(last_id, row['id'])
+        self._last_invalidation_id = last_id
+
+        horizon = time.time() - JWT_EXPIRATION_HOURS * 3600
+        self._versions = {uid: entry for uid, entry in self._versions.items() if entry[1] > horizon}
+
+    async def _prune_log(self):
+        # Rows older than the token lifetime can no longer affect any token
+        await execute(
+            "DELETE FROM principal_invalidations WHERE created_at < DATE_SUB(NOW(), INTERVAL %s HOUR)",
+            (JWT_EXPIRATION_HOURS,)
+        )
+
+    async def poll_invalidations(self, interval: float = PRINCIPAL_INVALIDATION_POLL_SECONDS):
+        polls = 0
+        while True:
+            try:
+                await self._poll_once()
+                polls += 1
+                if polls % 1000 == 0:
+                    await self._prune_log()
+            except Exception as e:
+                logger.error(f"Principal invalidation poll error: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "db_lookups_avoided": self.counters["hits"] + self.counters["claims_trusted"],
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "trust_claims": self.trust_claims,
+            "invalidations_loaded": self.loaded
+        }
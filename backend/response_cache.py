@@ -0,0 +1,162 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from database import fetch_one, fetch_all, execute, primary_reads
+from json_responses import dumps
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', 20000))
+# Upper bound on staleness if a cross-worker invalidation is missed
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', 300))
+RESPONSE_CACHE_POLL_SECONDS = float(os.getenv('RESPONSE_CACHE_POLL_SECONDS', 1))
+RESPONSE_CACHE_LOG_HOURS = 1
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def body_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def conditional_response(request: Request, body: bytes, etag: str) -> Response:
+    """200 with the body, or an empty 304 when the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+class _Entry:
+    __slots__ = ("version", "expires_at", "body", "etag")
+
+    def __init__(self, version: int, expires_at: float, body: bytes, etag: str):
+        self.version = version
+        self.expires_at = expires_at
+        self.body = body
+        self.etag = etag
+
+
+class ResponseCache:
+    """Per-owner cache of rendered JSON responses for read-mostly endpoints.
+
+    Each (scope, owner) pair - e.g. ("feedback", user_id) - has a version
+    stamp that writers bump; entries rendered under an older version are
+    ignored. A hit costs neither a database query nor, when the client's
+    If-None-Match matches the strong ETag, a response body. Bumps are
+    published through response_cache_invalidations so other workers drop
+    their copies within one poll interval.
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, Hashable, Hashable], _Entry]" = OrderedDict()
+        self._versions: Dict[Tuple[str, Hashable], int] = {}
+        self._last_invalidation_id = None
+        self.counters = Counter()
+
+    def version(self, scope: str, owner: Hashable) -> int:
+        return self._versions.get((scope, owner), 0)
+
+    def bump_local(self, scope: str, owner: Hashable):
+        self._versions[(scope, owner)] = self.version(scope, owner) + 1
+        self.counters["bumps"] += 1
+
+    async def bump(self, scope: str, owners: Iterable[int]):
+        """Invalidates the owners' entries here and publishes the change to other workers"""
+        owners = list(dict.fromkeys(owners))
+        if not owners:
+            return
+        for owner in owners:
+            self.bump_local(scope, owner)
+        try:
+            await execute(
+                f"""INSERT INTO response_cache_invalidations (scope, owner_id)
+                    VALUES {', '.join(['(%s, %s)'] * len(owners))}""",
+                tuple(value for owner in owners for value in (scope, owner))
+            )
+        except Exception as e:
+            logger.error(f"Response cache invalidation publish error: {e}")
+
+    async def respond(self, request: Request, scope: str, owner: Hashable, variant: Hashable,
+                      render: Callable[[], Awaitable[Any]]) -> Response:
+        """Serves the cached rendering of `variant` when it's still current,
+        otherwise renders, stores and serves it"""
+        key = (scope, owner, variant)
+        version = self.version(scope, owner)
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version and entry.expires_at > time.monotonic():
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+        else:
+            self.counters["misses"] += 1
+            # Rendered from the primary: a replica could still predate the bump
+            with primary_reads():
+                body = dumps(await render())
+            # Stored under the version seen before rendering, so a bump that
+            # lands mid-render leaves this entry already stale
+            entry = _Entry(version, time.monotonic() + self.ttl, body, body_etag(body))
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        response = conditional_response(request, entry.body, entry.etag)
+        if response.status_code == 304:
+            self.counters["not_modified"] += 1
+        return response
+
+    async def _poll_once(self):
+        if self._last_invalidation_id is None:
+            row = await fetch_one("SELECT COALESCE(MAX(id), 0) AS last_id FROM response_cache_invalidations")
+            self._last_invalidation_id = row['last_id'] if row else 0
+            return
+
+        rows = await fetch_all(
+            "SELECT id, scope, owner_id FROM response_cache_invalidations WHERE id > %s ORDER BY id",
+            (self._last_invalidation_id,)
+        )
+        for row in rows or []:
+            self.bump_local(row['scope'], row['owner_id'])
+            self._last_invalidation_id = row['id']
+
+    async def poll_invalidations(self, interval: float = RESPONSE_CACHE_POLL_SECONDS):
+        polls = 0
+        while True:
+            try:
+                await self._poll_once()
+                polls += 1
+                if polls % 3600 == 0:
+                    await execute(
+                        "DELETE FROM response_cache_invalidations WHERE created_at < DATE_SUB(NOW(), INTERVAL %s HOUR)",
+                        (RESPONSE_CACHE_LOG_HOURS,)
+                    )
+            except Exception as e:
+                logger.error(f"Response cache invalidation poll error: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "tracked_owners": len(self._versions)
+        }
@@ -0,0 +1,207 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import fetch_all, execute, transaction
+from pagination import decode_ranked_cursor, encode_ranked_cursor
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_SECONDS = float(os.getenv('SEARCH_INDEX_SECONDS', 2))
+SEARCH_INDEX_BATCH = int(os.getenv('SEARCH_INDEX_BATCH', 2000))
+# Rows younger than this are re-read on the next pass in case a concurrent
+# transaction committed a lower id after them
+SEARCH_INDEX_SETTLE_SECONDS = int(os.getenv('SEARCH_INDEX_SETTLE_SECONDS', 30))
+SEARCH_MAX_QUERY_TERMS = 8
+SEARCH_MAX_TERM_CHARS = 64
+SEARCH_MAX_TERMS_PER_ROW = 128
+# The last query term matches as a prefix once it's at least this long
+SEARCH_PREFIX_MIN_CHARS = 3
+SEARCH_EXACT_WEIGHT = 3
+
+# Harakat, Quranic marks, superscript alef and tatweel
+_ARABIC_MARKS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_ARABIC_VARIANTS = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه",
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},
+})
+_WORD = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """Search form of a text: case-folded, Arabic diacritics removed and
+    alef, ya, hamza-seat and ta marbuta variants folded together"""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return _ARABIC_MARKS.sub("", text).translate(_ARABIC_VARIANTS)
+
+
+def tokenize(text: str, query: bool = False) -> List[str]:
+    """Indexed terms, with Arabic words also indexed without the definite
+    article; queries use only the bare form so they match both"""
+    tokens = []
+    for token in _WORD.findall(normalize_text(text)):
+        if len(token) < 2:
+            continue
+        token = token[:SEARCH_MAX_TERM_CHARS]
+        if token.startswith("ال") and len(token) > 3:
+            if not query:
+                tokens.append(token)
+            token = token[2:]
+        tokens.append(token)
+    return tokens
+
+
+def row_terms(row: Dict[str, Any]) -> Counter:
+    """Term frequencies for a history row; only text content is indexed,
+    not the media references stored for other input and output types"""
+    terms = Counter()
+    if row['input_type'] == 'text':
+        terms.update(tokenize(row['input_content']))
+    if row['output_type'] == 'text':
+        terms.update(tokenize(row['output_content']))
+    return Counter(dict(terms.most_common(SEARCH_MAX_TERMS_PER_ROW)))
+
+
+def _like_prefix(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class SearchIndex:
+    """Per-user inverted index over translation history text.
+
+    Postings live in translation_search_terms keyed by (user_id, term), so
+    a search only touches the searching user's postings no matter how large
+    the table grows. A background pass tails translation_history by id
+    (watermark in stats_counters) and deletes remove postings directly.
+    Postings outlive the archiving of their rows, so search covers archived
+    months as well.
+    """
+
+    def __init__(self, interval: float = SEARCH_INDEX_SECONDS, batch_size: int = SEARCH_INDEX_BATCH):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.counters = Counter()
+
+    async def sync(self) -> int:
+        """Indexes history rows past the watermark; returns how many were read"""
+
+        def work(cursor):
+            cursor.execute("INSERT IGNORE INTO stats_counters (name, value) VALUES ('search_index_id', 0)")
+            cursor.execute("SELECT value FROM stats_counters WHERE name = 'search_index_id' FOR UPDATE")
+            watermark = int(cursor.fetchone()['value'])
+            cursor.execute(
+                """SELECT id, user_id, input_type, input_content, output_type, output_content, created_at,
+                          created_at <= NOW() - INTERVAL %s SECOND AS settled
+                   FROM translation_history WHERE id > %s ORDER BY id LIMIT %s""",
+                (SEARCH_INDEX_SETTLE_SECONDS, watermark, self.batch_size)
+            )
+            rows = cursor.fetchall()
+            postings = [
+                (row['user_id'], term, row['id'], row['created_at'], hits)
+                for row in rows for term, hits in row_terms(row).items()
+            ]
+            for offset in range(0, len(postings), 1000):
+                chunk = postings[offset:offset + 1000]
+                cursor.execute(
+                    f"""INSERT IGNORE INTO translation_search_terms (user_id, term, translation_id, created_at, hits)
+                        VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(chunk))}""",
+                    tuple(value for posting in chunk for value in posting)
+                )
+            # Only advance past the settled prefix; younger rows are read again next pass
+            settled_to = watermark
+            for row in rows:
+                if not row['settled']:
+                    break
+                settled_to = row['id']
+            if settled_to > watermark:
+                cursor.execute("UPDATE stats_counters SET value = %s WHERE name = 'search_index_id'", (settled_to,))
+            return len(rows), len(postings), settled_to > watermark
+
+        total = 0
+        while True:
+            read, postings, advanced = await transaction(work)
+            total += read
+            self.counters["postings_written"] += postings
+            if read < self.batch_size or not advanced:
+                return total
+
+    async def remove(self, user_id: int, translation_id: int):
+        await execute(
+            "DELETE FROM translation_search_terms WHERE translation_id = %s AND user_id = %s",
+            (translation_id, user_id)
+        )
+
+    async def search(self, user_id: int, query: str, limit: int,
+                     cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Ranked matches as [{translation_id, score, created_at}] plus the
+        next cursor. Every query term must match; the last one may match as
+        a prefix. Raises ValueError for a query without searchable terms."""
+        terms = list(dict.fromkeys(tokenize(query, query=True)))[:SEARCH_MAX_QUERY_TERMS]
+        if not terms:
+            raise ValueError("Search query needs at least one word of two or more characters")
+
+        branches, params = [], []
+        for position, term in enumerate(terms):
+            if position == len(terms) - 1 and len(term) >= SEARCH_PREFIX_MIN_CHARS:
+                match, value = "term LIKE %s", _like_prefix(term)
+            else:
+                match, value = "term = %s", term
+            branches.append(
+                f"""SELECT translation_id, created_at, {position} AS position,
+                           hits * IF(term = %s, {SEARCH_EXACT_WEIGHT}, 1) AS score
+                    FROM translation_search_terms WHERE user_id = %s AND {match}"""
+            )
+            params += [term, user_id, value]
+
+        after = ""
+        if cursor:
+            score, created_at, row_id = decode_ranked_cursor(cursor)
+            after = """AND (score < %s OR (score = %s AND (created_at < %s
+                           OR (created_at = %s AND translation_id < %s))))"""
+            params += [len(terms), score, score, created_at, created_at, row_id]
+        else:
+            params.append(len(terms))
+
+        started = time.perf_counter()
+        rows = await fetch_all(
+            f"""SELECT translation_id, MAX(created_at) AS created_at, SUM(score) AS score
+                FROM ({' UNION ALL '.join(branches)}) matches
+                GROUP BY translation_id
+                HAVING COUNT(DISTINCT position) = %s {after}
+                ORDER BY score DESC, created_at DESC, translation_id DESC
+                LIMIT %s""",
+            (*params, limit + 1)
+        )
+        self.counters["searches"] += 1
+        self.counters["search_ms"] += round((time.perf_counter() - started) * 1000)
+
+        matches = [
+            {"translation_id": row['translation_id'], "score": int(row['score']), "created_at": row['created_at']}
+            for row in rows or []
+        ]
+        if len(matches) <= limit:
+            return matches, None
+        last = matches[limit - 1]
+        return matches[:limit], encode_ranked_cursor(last['score'], last['created_at'], last['translation_id'])
+
+    def stats(self) -> Dict[str, Any]:
+        searches = self.counters["searches"]
+        return {
+            **self.counters,
+            "avg_search_ms": round(self.counters["search_ms"] / searches, 2) if searches else 0.0
+        }
+
+    async def run(self):
+        while True:
+            try:
+                self.counters["rows_scanned"] += await self.sync()
+            except Exception as e:
+                logger.error(f"Search index error: {e}")
+            await asyncio.sleep(self.interval)
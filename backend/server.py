@@ -1,25 +1,48 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, File, UploadFile, Header
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, File, Form, UploadFile, Header, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 from pathlib import Path
 import os
 import logging
 import uuid
+import asyncio
 
 # Import custom modules
-from database import execute_query
-from auth import hash_password, verify_password, create_access_token, decode_access_token
+from database import (
+    fetch_one, fetch_all, execute, execute_many, transaction, stream_rows, mark_written, database_stats,
+    open_pool, close_pool, prune_idle_connections_periodically, monitor_replicas
+)
+from auth import create_access_token, decode_access_token, PasswordHasher, PasswordHashingOverloadedError
 from mock_ai_services import MockAIServices
+from inference import InferenceError
+from ai_backends import BackendRouter
+from micro_batching import MicroBatcher
+from principal_cache import PrincipalCache
+from live_stream import LiveSessionStream
+from write_behind import WriteBehindBuffer
+from pagination import DEFAULT_PAGE_SIZE, InvalidCursorError, clamp_limit, decode_cursor, keyset_condition, paginate
+from admin_stats import StatsAggregator
+from jobs import JobQueue, JobQuotaExceededError, RetryableJobError, TERMINAL_STATUSES
+from translation_cache import TranslationCache, CACHEABLE_INPUT_TYPES, cache_key
+from uploads import UploadStore, UploadError, parse_content_range
+from artifacts import ArtifactStore, ArtifactNotFoundError, parse_artifact_url, dereference_statement
+from translation_memory import TranslationMemory
+from metrics import TracingMiddleware, RequestIdFilter, METRICS_TOKEN, render_metrics, stage, current_trace
+from system_logs import SystemLogWriter, SystemLogHandler
+from history_archive import HistoryArchive
+from search_index import SearchIndex
+from response_cache import ResponseCache, conditional_response, body_etag
+from json_responses import FastJSONResponse, dumps, json_response, ndjson_stream
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # Initialize FastAPI
-app = FastAPI(title="Jusoor API", version="1.0.0")
+app = FastAPI(title="Jusoor API", version="1.0.0", default_response_class=FastJSONResponse)
 api_router = APIRouter(prefix="/api")
 
 # Configure CORS
@@ -31,12 +54,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so route timings include CORS handling
+app.add_middleware(TracingMiddleware)
+
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:[%(request_id)s] %(message)s")
+for handler in logging.getLogger().handlers:
+    handler.addFilter(RequestIdFilter())
 logger = logging.getLogger(__name__)
 
+# Warnings and errors from every module are also persisted to system_logs
+system_log = SystemLogWriter()
+logging.getLogger().addHandler(SystemLogHandler(system_log))
+
+BATCH_TRANSLATION_MAX_ITEMS = int(os.getenv('BATCH_TRANSLATION_MAX_ITEMS', 500))
+BATCH_TRANSLATION_CONCURRENCY = int(os.getenv('BATCH_TRANSLATION_CONCURRENCY', 8))
+JOB_EVENTS_POLL_SECONDS = float(os.getenv('JOB_EVENTS_POLL_SECONDS', 0.5))
+
 # Initialize Mock AI Services
 ai_services = MockAIServices()
+ai_router = BackendRouter.from_env(MockAIServices)
+batcher = MicroBatcher(ai_router)
+translation_cache = TranslationCache()
+principal_cache = PrincipalCache()
+password_hasher = PasswordHasher()
+write_behind = WriteBehindBuffer()
+stats_aggregator = StatsAggregator()
+upload_store = UploadStore()
+artifact_store = ArtifactStore()
+translation_memory = TranslationMemory()
+history_archive = HistoryArchive()
+search_index = SearchIndex()
+response_cache = ResponseCache()
+
+async def invalidate_session_messages(table: str, rows: list):
+    # Bumped once the buffered messages are committed, whichever path wrote them
+    if table == "session_messages":
+        await response_cache.bump("session_messages", (row[0] for row in rows))
+
+write_behind.add_listener(invalidate_session_messages)
+
+async def keep_writers_on_primary(table: str, rows: list):
+    # A history read right after /translate must not hit a replica that hasn't caught up
+    if table == "translation_history":
+        mark_written(row[0] for row in rows)
+
+write_behind.add_listener(keep_writers_on_primary)
 
 # ===== Pydantic Models =====
 
@@ -57,6 +120,18 @@ class TranslationRequest(BaseModel):
     output_type: str
     output_language: str = "en"
 
+class BatchTranslationRequest(BaseModel):
+    items: List[TranslationRequest] = Field(min_length=1)
+    stream: bool = False
+
+class UploadCreateRequest(BaseModel):
+    media_type: str  # audio or video
+    language: str = "en"
+    total_size: Optional[int] = Field(None, ge=0)
+
+class JobRequest(TranslationRequest):
+    priority: int = Field(default=0, ge=0, le=9)
+
 class FeedbackRequest(BaseModel):
     feedback_type: str
     rating: Optional[int] = None
@@ -64,6 +139,14 @@ class FeedbackRequest(BaseModel):
     translation_id: Optional[int] = None
     session_id: Optional[int] = None
 
+class ProfileUpdateRequest(BaseModel):
+    full_name: Optional[str] = Field(default=None, min_length=2)
+    preferred_language: Optional[str] = None
+
+class AdminUserUpdateRequest(BaseModel):
+    role: Optional[str] = None
+    is_active: Optional[bool] = None
+
 class AccessibilitySettingsRequest(BaseModel):
     font_size: Optional[str] = None
     contrast_mode: Optional[str] = None
@@ -75,7 +158,25 @@ class AccessibilitySettingsRequest(BaseModel):
 
 # ===== Authentication Dependency =====
 
-def get_current_user(authorization: Optional[str] = Header(None)):
+async def authenticate_token(token: str):
+    with stage("auth.jwt"):
+        payload = decode_access_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    with stage("auth.user"):
+        user = await principal_cache.get_principal(payload)
+    
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    
+    trace = current_trace()
+    if trace is not None:
+        trace.user_id = user['id']
+    
+    return user
+
+async def get_current_user(authorization: Optional[str] = Header(None)):
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header missing")
     
@@ -86,21 +187,13 @@ def get_current_user(authorization: Optional[str] = Header(None)):
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid authorization header format")
     
-    payload = decode_access_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    
-    user_id = payload.get("user_id")
-    user = execute_query(
-        "SELECT id, email, full_name, role, preferred_language FROM users WHERE id = %s AND is_active = TRUE",
-        (user_id,),
-        fetch_one=True
-    )
-    
-    if not user:
-        raise HTTPException(status_code=401, detail="User not found")
-    
-    return user
+    return await authenticate_token(token)
+
+async def get_stream_user(authorization: Optional[str] = Header(None), token: Optional[str] = None):
+    # EventSource and WebSocket clients can't set headers, so they may pass ?token= instead
+    if authorization or not token:
+        return await get_current_user(authorization)
+    return await authenticate_token(token)
 
 def require_admin(current_user: dict = Depends(get_current_user)):
     if current_user['role'] != 'admin':
@@ -118,28 +211,36 @@ async def root():
 @api_router.post("/auth/register")
 async def register(request: RegisterRequest):
     try:
-        existing_user = execute_query(
+        existing_user = await fetch_one(
             "SELECT id FROM users WHERE email = %s",
-            (request.email,),
-            fetch_one=True
+            (request.email,)
         )
         
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
         
-        password_hash = hash_password(request.password)
-        user_id = execute_query(
+        password_hash = await password_hasher.hash(request.password)
+        user_id = await execute(
             """INSERT INTO users (email, password_hash, full_name, preferred_language) 
                VALUES (%s, %s, %s, %s)""",
             (request.email, password_hash, request.full_name, request.preferred_language)
         )
         
-        execute_query(
+        await execute(
             "INSERT INTO accessibility_settings (user_id) VALUES (%s)",
             (user_id,)
         )
+        stats_aggregator.record("users")
+        system_log.log("INFO", "audit", "User registered", user_id=user_id)
         
-        token = create_access_token({"user_id": user_id, "email": request.email})
+        token = create_access_token({
+            "user_id": user_id,
+            "email": request.email,
+            "full_name": request.full_name,
+            "role": "user",
+            "preferred_language": request.preferred_language,
+            "ver": 0
+        })
         
         return {
             "success": True,
@@ -154,6 +255,8 @@ async def register(request: RegisterRequest):
         }
     except HTTPException:
         raise
+    except PasswordHashingOverloadedError:
+        raise HTTPException(status_code=429, detail="Too many authentication attempts, try again later")
     except Exception as e:
         logger.error(f"Registration error: {e}")
         raise HTTPException(status_code=500, detail="Registration failed")
@@ -161,22 +264,42 @@ async def register(request: RegisterRequest):
 @api_router.post("/auth/login")
 async def login(request: LoginRequest):
     try:
-        user = execute_query(
-            """SELECT id, email, password_hash, full_name, role, preferred_language 
+        user = await fetch_one(
+            """SELECT id, email, password_hash, full_name, role, preferred_language, auth_version
                FROM users WHERE email = %s AND is_active = TRUE""",
-            (request.email,),
-            fetch_one=True
+            (request.email,)
         )
         
-        if not user or not verify_password(request.password, user['password_hash']):
+        if not user:
+            system_log.log("WARNING", "security", "Login failed: unknown email", data={"email": request.email})
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
-        execute_query(
-            "UPDATE users SET last_login = %s WHERE id = %s",
-            (datetime.now(timezone.utc), user['id'])
-        )
+        valid, new_hash = await password_hasher.verify_and_update(request.password, user['password_hash'])
+        if not valid:
+            system_log.log("WARNING", "security", "Login failed: wrong password", user_id=user['id'])
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        
+        system_log.log("INFO", "auth", "Login succeeded", user_id=user['id'])
+        
+        if new_hash:
+            await execute(
+                "UPDATE users SET last_login = %s, password_hash = %s WHERE id = %s",
+                (datetime.now(timezone.utc), new_hash, user['id'])
+            )
+        else:
+            await execute(
+                "UPDATE users SET last_login = %s WHERE id = %s",
+                (datetime.now(timezone.utc), user['id'])
+            )
         
-        token = create_access_token({"user_id": user['id'], "email": user['email']})
+        token = create_access_token({
+            "user_id": user['id'],
+            "email": user['email'],
+            "full_name": user['full_name'],
+            "role": user['role'],
+            "preferred_language": user['preferred_language'],
+            "ver": user['auth_version']
+        })
         
         return {
             "success": True,
@@ -192,53 +315,143 @@ async def login(request: LoginRequest):
         }
     except HTTPException:
         raise
+    except PasswordHashingOverloadedError:
+        raise HTTPException(status_code=429, detail="Too many authentication attempts, try again later")
     except Exception as e:
         logger.error(f"Login error: {e}")
         raise HTTPException(status_code=500, detail="Login failed")
 
 @api_router.get("/auth/me")
-async def get_current_user_info(current_user: dict = Depends(get_current_user)):
-    return {
+async def get_current_user_info(request: Request, current_user: dict = Depends(get_current_user)):
+    # The principal already comes from the principal cache, so only the body is saved here
+    body = dumps({
         "success": True,
         "user": current_user
-    }
+    })
+    return conditional_response(request, body, body_etag(body))
+
+@api_router.put("/auth/me")
+async def update_profile(request: ProfileUpdateRequest, current_user: dict = Depends(get_current_user)):
+    try:
+        updates = []
+        params = []
+        
+        for field, value in request.model_dump(exclude_none=True).items():
+            updates.append(f"{field} = %s")
+            params.append(value)
+        
+        if not updates:
+            return {"success": True, "message": "No changes"}
+        
+        # Name and language are token claims too, so older tokens go stale
+        updates.append("auth_version = auth_version + 1")
+        params.append(current_user['id'])
+        await execute(f"UPDATE users SET {', '.join(updates)} WHERE id = %s", tuple(params))
+        await principal_cache.invalidate(current_user['id'])
+        
+        return {"success": True, "message": "Profile updated"}
+    except Exception as e:
+        logger.error(f"Profile update error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to update profile")
 
 # ----- Translation Routes -----
 
+def resolve_input_path(request: TranslationRequest, user_id: Optional[int]) -> str:
+    """Audio and video inputs may reference a finished upload as `upload:<id>`"""
+    if user_id is None:
+        return request.input_content
+    try:
+        upload = upload_store.resolve(request.input_content, user_id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    return upload['path'] if upload else request.input_content
+
+ARTIFACT_RENDERERS = {
+    "sign-video": ai_services.render_sign_video,
+    "audio": ai_services.render_speech,
+}
+
+async def store_artifact(url: str, text: str, language: str):
+    parsed = parse_artifact_url(url)
+    if parsed:
+        kind, artifact_id = parsed
+        await artifact_store.ensure(kind, artifact_id, text, language, ARTIFACT_RENDERERS[kind])
+
+async def run_translation(request: TranslationRequest, user_id: Optional[int] = None):
+    if request.input_type == "video" and request.output_type == "text":
+        result = await batcher.sign_language_to_text(resolve_input_path(request, user_id), request.input_language)
+        output_content = result['text']
+    elif request.input_type == "text" and request.output_type == "sign":
+        result = await batcher.text_to_sign_language(request.input_content, request.output_language)
+        # A degraded result carries the text instead of a rendered video
+        output_content = result['video_url'] or result['text']
+        if not result.get('degraded'):
+            await store_artifact(output_content, request.input_content, request.output_language)
+    elif request.input_type == "audio" and request.output_type == "text":
+        result = await batcher.speech_to_text(resolve_input_path(request, user_id), request.input_language)
+        output_content = result['text']
+    elif request.input_type == "text" and request.output_type == "audio":
+        result = await batcher.text_to_speech(request.input_content, request.output_language)
+        output_content = result['audio_url'] or result['text']
+        if not result.get('degraded'):
+            await store_artifact(output_content, request.input_content, request.output_language)
+    elif request.input_type == "text" and request.output_type == "text":
+        result = await translation_memory.translate(
+            request.input_content, request.input_language, request.output_language, batcher.translate_text
+        )
+        output_content = result['translated_text']
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported translation type")
+    return result, output_content
+
+async def cached_translation(request: TranslationRequest, user_id: Optional[int] = None):
+    if request.input_type not in CACHEABLE_INPUT_TYPES:
+        return await run_translation(request, user_id)
+    
+    async def compute():
+        result, output_content = await run_translation(request)
+        return {"result": result, "output_content": output_content}
+    
+    key = cache_key(request.input_type, request.output_type, request.input_language,
+                    request.output_language, request.input_content)
+    # Degraded fallbacks are served but never cached, so recovery is immediate
+    cached = await translation_cache.get_or_compute(
+        key, compute, cacheable=lambda value: not value['result'].get('degraded')
+    )
+    return cached['result'], cached['output_content']
+
+async def record_translation(user_id: int, request: TranslationRequest, output_content: str, duration: float):
+    return (await record_translations(user_id, [(request, output_content, duration)]))[0]
+
+async def record_translations(user_id: int, entries: list):
+    """Persists (request, output_content, duration) entries as one buffered batch"""
+    rows = []
+    for request, output_content, duration in entries:
+        stats_aggregator.record_translation(
+            request.input_type, request.output_type, request.input_language, request.output_language
+        )
+        rows.append((
+            user_id, request.input_type, request.input_content[:1000], request.input_language,
+            request.output_type, output_content[:1000], request.output_language, duration
+        ))
+    return await write_behind.add_translations(rows)
+
 @api_router.post("/translate")
 async def translate(request: TranslationRequest, current_user: dict = Depends(get_current_user)):
     try:
         start_time = datetime.now(timezone.utc)
-        result = None
-        
-        if request.input_type == "video" and request.output_type == "text":
-            result = ai_services.sign_language_to_text(request.input_content, request.input_language)
-            output_content = result['text']
-        elif request.input_type == "text" and request.output_type == "sign":
-            result = ai_services.text_to_sign_language(request.input_content, request.output_language)
-            output_content = result['video_url']
-        elif request.input_type == "audio" and request.output_type == "text":
-            result = ai_services.speech_to_text(request.input_content, request.input_language)
-            output_content = result['text']
-        elif request.input_type == "text" and request.output_type == "audio":
-            result = ai_services.text_to_speech(request.input_content, request.output_language)
-            output_content = result['audio_url']
-        elif request.input_type == "text" and request.output_type == "text":
-            result = ai_services.translate_text(request.input_content, request.input_language, request.output_language)
-            output_content = result['translated_text']
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported translation type")
+        
+        try:
+            with stage("translate.compute"):
+                result, output_content = await cached_translation(request, current_user['id'])
+        except InferenceError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
         
         end_time = datetime.now(timezone.utc)
         duration = (end_time - start_time).total_seconds()
         
-        translation_id = execute_query(
-            """INSERT INTO translation_history 
-               (user_id, input_type, input_content, input_language, output_type, output_content, output_language, translation_duration)
-               VALUES (%s, %s, %s, %s, %s, %s, %s, %s)""",
-            (current_user['id'], request.input_type, request.input_content[:1000], request.input_language,
-             request.output_type, output_content[:1000], request.output_language, duration)
-        )
+        with stage("translate.history"):
+            translation_id = await record_translation(current_user['id'], request, output_content, duration)
         
         return {
             "success": True,
@@ -253,57 +466,234 @@ async def translate(request: TranslationRequest, current_user: dict = Depends(ge
         logger.error(f"Translation error: {e}")
         raise HTTPException(status_code=500, detail="Translation failed")
 
+async def translate_batch_item(request: TranslationRequest, user_id: Optional[int] = None):
+    start_time = datetime.now(timezone.utc)
+    try:
+        result, output_content = await cached_translation(request, user_id)
+    except HTTPException as e:
+        return {"success": False, "status_code": e.status_code, "error": e.detail}
+    except InferenceError as e:
+        return {"success": False, "status_code": e.status_code, "error": str(e)}
+    except Exception as e:
+        logger.error(f"Batch item translation error: {e}")
+        return {"success": False, "status_code": 500, "error": "Translation failed"}
+    duration = (datetime.now(timezone.utc) - start_time).total_seconds()
+    return {"success": True, "result": result, "output_content": output_content, "duration": duration}
+
+@api_router.post("/translate/batch")
+async def translate_batch(request: BatchTranslationRequest, current_user: dict = Depends(get_current_user)):
+    if len(request.items) > BATCH_TRANSLATION_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_TRANSLATION_MAX_ITEMS} items")
+    
+    # Identical items are translated once and fanned back out to every index
+    indices_by_item = {}
+    for index, item in enumerate(request.items):
+        key = tuple(item.model_dump().values())
+        indices_by_item.setdefault(key, (item, []))[1].append(index)
+    
+    semaphore = asyncio.Semaphore(BATCH_TRANSLATION_CONCURRENCY)
+    
+    async def run_unique(item: TranslationRequest, indices: list):
+        async with semaphore:
+            return item, indices, await translate_batch_item(item, current_user['id'])
+    
+    async def results_in_completion_order():
+        tasks = [asyncio.create_task(run_unique(item, indices)) for item, indices in indices_by_item.values()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def persist(completed: list):
+        entries = [(item, outcome['output_content'], outcome['duration'])
+                   for item, indices, outcome in completed if outcome['success'] for _ in indices]
+        if not entries:
+            return []
+        return await record_translations(current_user['id'], entries)
+    
+    if request.stream:
+        async def ndjson():
+            completed = []
+            async for item, indices, outcome in results_in_completion_order():
+                completed.append((item, indices, outcome))
+                for index in indices:
+                    yield dumps({"index": index, **outcome}) + b"\n"
+            try:
+                translation_ids = await persist(completed)
+                summary = {"summary": True, "success": True, "persisted": len(translation_ids)}
+            except Exception as e:
+                logger.error(f"Batch history persist error: {e}")
+                summary = {"summary": True, "success": False, "error": "Failed to save history"}
+            yield dumps(summary) + b"\n"
+        
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
+    try:
+        completed = [entry async for entry in results_in_completion_order()]
+        translation_ids = iter(await persist(completed))
+        
+        results = [None] * len(request.items)
+        for item, indices, outcome in completed:
+            for index in indices:
+                entry = {"index": index, **outcome}
+                if outcome['success']:
+                    entry["translation_id"] = next(translation_ids)
+                results[index] = entry
+        
+        return {
+            "success": True,
+            "results": results,
+            "unique_items": len(indices_by_item),
+            "failed": sum(1 for entry in results if not entry['success'])
+        }
+    except Exception as e:
+        logger.error(f"Batch translation error: {e}")
+        raise HTTPException(status_code=500, detail="Batch translation failed")
+
+HISTORY_COLUMNS = (
+    "id", "input_type", "input_content", "input_language", "output_type", "output_content",
+    "output_language", "translation_duration", "created_at"
+)
+
 @api_router.get("/translations/history")
 async def get_translation_history(
-    limit: int = 50,
-    offset: int = 0,
+    request: Request,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: dict = Depends(get_current_user)
 ):
     try:
-        translations = execute_query(
-            """SELECT id, input_type, input_content, input_language, output_type, output_content, 
-                      output_language, translation_duration, created_at
-               FROM translation_history
-               WHERE user_id = %s
-               ORDER BY created_at DESC
-               LIMIT %s OFFSET %s""",
-            (current_user['id'], limit, offset),
-            fetch=True
-        )
-        
-        total = execute_query(
-            "SELECT COUNT(*) as count FROM translation_history WHERE user_id = %s",
-            (current_user['id'],),
-            fetch_one=True
+        limit = clamp_limit(limit)
+        condition, cursor_params = keyset_condition(cursor)
+        rows = await fetch_all(
+            f"""SELECT {', '.join(HISTORY_COLUMNS)}
+                FROM translation_history
+                WHERE user_id = %s {"AND " + condition if condition else ""}
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s""",
+            (current_user['id'], *cursor_params, limit + 1)
         )
+        rows = list(rows or [])
+        if len(rows) <= limit:
+            # Hot rows ran out; archived months are all older, so keep paging there
+            if rows:
+                before = (rows[-1]['created_at'], rows[-1]['id'])
+            else:
+                before = decode_cursor(cursor) if cursor else None
+            rows += await history_archive.read(
+                "translation_history", current_user['id'], HISTORY_COLUMNS, before, limit + 1 - len(rows)
+            )
+        translations, next_cursor = paginate(rows, limit)
         
-        return {
+        response = {
             "success": True,
-            "translations": translations or [],
-            "total": total['count'] if total else 0,
+            "translations": translations,
             "limit": limit,
-            "offset": offset
+            "next_cursor": next_cursor
         }
+        
+        if include_total:
+            # Maintained counter, not a COUNT(*) scan; may trail buffered writes slightly
+            total = await fetch_one(
+                "SELECT translations_count FROM users WHERE id = %s",
+                (current_user['id'],)
+            )
+            response["total"] = total['translations_count'] if total else 0
+        
+        return json_response(request, response)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"History retrieval error: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve history")
 
+@api_router.get("/translations/search")
+async def search_translations(
+    q: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        limit = clamp_limit(limit)
+        with stage("search.match"):
+            matches, next_cursor = await search_index.search(current_user['id'], q[:500], limit, cursor)
+        ids = [match['translation_id'] for match in matches]
+        rows = {}
+        if ids:
+            with stage("search.fetch"):
+                found = await fetch_all(
+                    f"""SELECT {', '.join(HISTORY_COLUMNS)} FROM translation_history
+                        WHERE user_id = %s AND id IN ({', '.join(['%s'] * len(ids))})""",
+                    (current_user['id'], *ids)
+                )
+                rows = {row['id']: row for row in found or []}
+                for translation_id in ids:
+                    if translation_id not in rows:
+                        archived = await history_archive.find("translation_history", translation_id, current_user['id'])
+                        if archived:
+                            rows[translation_id] = {column: archived[column] for column in HISTORY_COLUMNS}
+        
+        return {
+            "success": True,
+            "translations": [
+                {**rows[match['translation_id']], "score": match['score']}
+                for match in matches if match['translation_id'] in rows
+            ],
+            "limit": limit,
+            "next_cursor": next_cursor
+        }
+    except ValueError as e:
+        # Also covers InvalidCursorError
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"History search error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to search history")
+
 @api_router.delete("/translations/{translation_id}")
 async def delete_translation(translation_id: int, current_user: dict = Depends(get_current_user)):
     try:
-        translation = execute_query(
-            "SELECT user_id FROM translation_history WHERE id = %s",
-            (translation_id,),
-            fetch_one=True
+        translation = await fetch_one(
+            "SELECT user_id, output_content FROM translation_history WHERE id = %s",
+            (translation_id,)
         )
         
+        archived = False
+        if not translation:
+            owner = None if current_user['role'] == 'admin' else current_user['id']
+            translation = await history_archive.find("translation_history", translation_id, owner)
+            archived = True
+        
         if not translation:
             raise HTTPException(status_code=404, detail="Translation not found")
         
         if translation['user_id'] != current_user['id'] and current_user['role'] != 'admin':
             raise HTTPException(status_code=403, detail="Access denied")
         
-        execute_query("DELETE FROM translation_history WHERE id = %s", (translation_id,))
+        dereference = dereference_statement(translation['output_content'])
+        if archived:
+            if not await history_archive.remove("translation_history", translation['user_id'], translation_id):
+                raise HTTPException(status_code=404, detail="Translation not found")
+            if dereference:
+                await execute_many([dereference])
+        else:
+            def delete_row(cursor):
+                cursor.execute("DELETE FROM translation_history WHERE id = %s", (translation_id,))
+                # Only the request that actually removed the row drops its artifact reference
+                if cursor.rowcount and dereference:
+                    cursor.execute(*dereference)
+                return cursor.rowcount
+
+            if not await transaction(delete_row):
+                raise HTTPException(status_code=404, detail="Translation not found")
+        await execute(
+            "UPDATE users SET translations_count = GREATEST(translations_count - 1, 0) WHERE id = %s",
+            (translation['user_id'],)
+        )
+        await search_index.remove(translation['user_id'], translation_id)
         
         return {"success": True, "message": "Translation deleted"}
     except HTTPException:
@@ -312,17 +702,221 @@ async def delete_translation(translation_id: int, current_user: dict = Depends(g
         logger.error(f"Delete error: {e}")
         raise HTTPException(status_code=500, detail="Failed to delete translation")
 
+# ----- Generated Media Routes -----
+
+async def serve_artifact(kind: str, artifact_id: str, request: Request):
+    try:
+        path = await artifact_store.open(kind, artifact_id, ARTIFACT_RENDERERS[kind])
+    except ArtifactNotFoundError:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return artifact_store.response(kind, path, request.headers, request.method)
+
+@api_router.api_route("/mock/sign-video/{artifact_id}", methods=["GET", "HEAD"])
+async def get_sign_video(artifact_id: str, request: Request):
+    return await serve_artifact("sign-video", artifact_id, request)
+
+@api_router.api_route("/mock/audio/{artifact_id}", methods=["GET", "HEAD"])
+async def get_audio(artifact_id: str, request: Request):
+    return await serve_artifact("audio", artifact_id, request)
+
+# ----- Upload Routes -----
+
+@api_router.post("/uploads", status_code=201)
+async def create_upload(request: UploadCreateRequest, current_user: dict = Depends(get_current_user)):
+    try:
+        return upload_store.create(current_user['id'], request.media_type, request.language, request.total_size)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@api_router.post("/uploads/file", status_code=201)
+async def upload_file(
+    file: UploadFile = File(...),
+    media_type: str = Form(...),
+    language: str = Form("en"),
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        return await upload_store.save_file(current_user['id'], media_type, language, file.file)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    finally:
+        await file.close()
+
+@api_router.put("/uploads/{upload_id}")
+async def append_upload(
+    upload_id: str,
+    request: Request,
+    content_range: Optional[str] = Header(None),
+    upload_offset: Optional[int] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Appends the request body as it streams in; resume with Content-Range or Upload-Offset"""
+    try:
+        offset, total_size = parse_content_range(content_range)
+        if offset is None:
+            offset = upload_offset
+        return await upload_store.append(upload_id, current_user['id'], request.stream(), offset, total_size)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@api_router.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    try:
+        return upload_store.get(upload_id, current_user['id'])
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@api_router.post("/uploads/{upload_id}/complete")
+async def complete_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    try:
+        return upload_store.complete(upload_id, current_user['id'])
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@api_router.get("/uploads/{upload_id}/transcript")
+async def stream_upload_transcript(upload_id: str, current_user: dict = Depends(get_stream_user)):
+    """Streams partial transcripts (NDJSON) while the upload is still arriving"""
+    try:
+        upload = upload_store.get(upload_id, current_user['id'])
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    if upload['media_type'] == "audio":
+        method, input_type = "speech_to_text_stream", "audio"
+    else:
+        method, input_type = "sign_language_to_text_stream", "video"
+    
+    async def ndjson():
+        start_time = datetime.now(timezone.utc)
+        chunks = upload_store.iter_chunks(upload_id, current_user['id'])
+        try:
+            async for result in ai_router.stream(method, chunks, upload['language']):
+                if not result['partial']:
+                    request = TranslationRequest(
+                        input_type=input_type, input_content=upload['reference'],
+                        input_language=upload['language'], output_type="text",
+                        output_language=upload['language']
+                    )
+                    duration = (datetime.now(timezone.utc) - start_time).total_seconds()
+                    result = {**result, "translation_id": await record_translation(
+                        current_user['id'], request, result['text'], duration
+                    )}
+                yield dumps(result) + b"\n"
+        except (UploadError, InferenceError) as e:
+            yield dumps({"partial": False, "success": False, "error": str(e)}) + b"\n"
+        except Exception as e:
+            logger.error(f"Upload transcript error: {e}")
+            yield dumps({"partial": False, "success": False, "error": "Transcription failed"}) + b"\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+# ----- Job Routes -----
+
+async def process_translation_job(user_id: int, request_data: dict):
+    request = TranslationRequest(**request_data)
+    start_time = datetime.now(timezone.utc)
+    try:
+        result, output_content = await cached_translation(request, user_id)
+    except InferenceError as e:
+        # Overload and timeouts are transient; anything else won't succeed on retry
+        if e.status_code in (503, 504):
+            raise RetryableJobError(str(e))
+        raise
+    except HTTPException as e:
+        raise ValueError(e.detail)
+    duration = (datetime.now(timezone.utc) - start_time).total_seconds()
+    # A job cancelled while it ran leaves no history behind
+    await job_queue.ensure_running()
+    translation_id = await record_translation(user_id, request, output_content, duration)
+    return {
+        "translation_id": translation_id,
+        "result": result,
+        "output_content": output_content,
+        "duration": duration
+    }
+
+job_queue = JobQueue(process_translation_job)
+
+@api_router.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest, current_user: dict = Depends(get_current_user)):
+    try:
+        job_id = await job_queue.submit(
+            current_user['id'],
+            request.model_dump(exclude={"priority"}),
+            priority=request.priority
+        )
+        return {"success": True, "job_id": job_id, "status": "queued"}
+    except JobQuotaExceededError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        logger.error(f"Job submit error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to submit job")
+
+@api_router.get("/jobs/{job_id}")
+async def get_job(job_id: int, current_user: dict = Depends(get_current_user)):
+    try:
+        job = await job_queue.get(job_id, current_user['id'])
+    except Exception as e:
+        logger.error(f"Job retrieval error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve job")
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "job": job}
+
+@api_router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: int, current_user: dict = Depends(get_current_user)):
+    try:
+        cancelled = await job_queue.cancel(job_id, current_user['id'])
+    except Exception as e:
+        logger.error(f"Job cancel error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to cancel job")
+    
+    if not cancelled:
+        raise HTTPException(status_code=409, detail="Job already finished or not found")
+    return {"success": True, "message": "Job cancelled"}
+
+@api_router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: int, current_user: dict = Depends(get_stream_user)):
+    job = await job_queue.get(job_id, current_user['id'])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def events():
+        last = None
+        current = job
+        while True:
+            state = (current['status'], current['progress'], current['attempts'])
+            if state != last:
+                last = state
+                yield b"event: progress\ndata: " + dumps(current) + b"\n\n"
+            if current['status'] in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+            current = await job_queue.get(job_id, current_user['id'])
+            if not current:
+                return
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 # ----- Live Session Routes -----
 
+async def record_session_message(session_id: int, message_type: str, original_content: str, translated_content: str):
+    # messages_count is incremented by the write-behind flush, once per session per batch
+    return await write_behind.add_session_message(
+        session_id, message_type, original_content[:500], translated_content[:500]
+    )
+
 @api_router.post("/live-session/start")
 async def start_live_session(current_user: dict = Depends(get_current_user)):
     try:
         session_token = str(uuid.uuid4())
-        session_id = execute_query(
+        session_id = await execute(
             """INSERT INTO live_sessions (user_id, session_token, session_name)
                VALUES (%s, %s, %s)""",
             (current_user['id'], session_token, f"Session {datetime.now().strftime('%Y-%m-%d %H:%M')}")
         )
+        stats_aggregator.record("sessions")
         
         return {
             "success": True,
@@ -342,25 +936,15 @@ async def add_session_message(
     current_user: dict = Depends(get_current_user)
 ):
     try:
-        session = execute_query(
+        session = await fetch_one(
             "SELECT user_id FROM live_sessions WHERE id = %s",
-            (session_id,),
-            fetch_one=True
+            (session_id,)
         )
         
         if not session or session['user_id'] != current_user['id']:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        execute_query(
-            """INSERT INTO session_messages (session_id, message_type, original_content, translated_content)
-               VALUES (%s, %s, %s, %s)""",
-            (session_id, message_type, original_content[:500], translated_content[:500])
-        )
-        
-        execute_query(
-            "UPDATE live_sessions SET messages_count = messages_count + 1 WHERE id = %s",
-            (session_id,)
-        )
+        await record_session_message(session_id, message_type, original_content, translated_content)
         
         return {"success": True}
     except HTTPException:
@@ -372,10 +956,9 @@ async def add_session_message(
 @api_router.post("/live-session/{session_id}/end")
 async def end_live_session(session_id: int, current_user: dict = Depends(get_current_user)):
     try:
-        session = execute_query(
+        session = await fetch_one(
             "SELECT user_id, start_time FROM live_sessions WHERE id = %s",
-            (session_id,),
-            fetch_one=True
+            (session_id,)
         )
         
         if not session or session['user_id'] != current_user['id']:
@@ -385,12 +968,13 @@ async def end_live_session(session_id: int, current_user: dict = Depends(get_cur
         start_time = session['start_time']
         duration = int((end_time - start_time).total_seconds())
         
-        execute_query(
+        await execute(
             """UPDATE live_sessions 
                SET end_time = %s, duration_seconds = %s, is_active = FALSE
                WHERE id = %s""",
             (end_time, duration, session_id)
         )
+        await response_cache.bump("session_messages", [session_id])
         
         return {"success": True, "duration": duration}
     except HTTPException:
@@ -399,26 +983,96 @@ async def end_live_session(session_id: int, current_user: dict = Depends(get_cur
         logger.error(f"Session end error: {e}")
         raise HTTPException(status_code=500, detail="Failed to end session")
 
-@api_router.get("/live-session/{session_id}/messages")
-async def get_session_messages(session_id: int, current_user: dict = Depends(get_current_user)):
+@api_router.websocket("/live-session/{session_id}/ws")
+async def live_session_stream(websocket: WebSocket, session_id: int, token: Optional[str] = None):
+    # Browsers can't set headers on a WebSocket handshake, so the token comes in the query string
     try:
-        session = execute_query(
-            "SELECT user_id FROM live_sessions WHERE id = %s",
-            (session_id,),
-            fetch_one=True
+        user = await authenticate_token(token or "")
+    except HTTPException:
+        await websocket.close(code=4401)
+        return
+    
+    session = await fetch_one(
+        "SELECT user_id, is_active FROM live_sessions WHERE id = %s",
+        (session_id,)
+    )
+    if not session or session['user_id'] != user['id'] or not session['is_active']:
+        await websocket.close(code=4403)
+        return
+    
+    async def handle(frame: dict):
+        kind = frame.get("type")
+        if kind == "message":
+            message_id = await record_session_message(
+                session_id, frame.get("message_type", "text"),
+                frame.get("original_content", ""), frame.get("translated_content", "")
+            )
+            return {"type": "ack", "message_id": message_id}
+        if kind == "translate":
+            request = TranslationRequest(**{k: v for k, v in frame.items() if k in TranslationRequest.model_fields})
+            start_time = datetime.now(timezone.utc)
+            try:
+                result, output_content = await cached_translation(request)
+            except (InferenceError, HTTPException) as e:
+                return {"type": "error", "detail": getattr(e, "detail", None) or str(e)}
+            duration = (datetime.now(timezone.utc) - start_time).total_seconds()
+            translation_id = await record_translation(user['id'], request, output_content, duration)
+            message_id = await record_session_message(session_id, request.input_type, request.input_content, output_content)
+            return {
+                "type": "translation",
+                "message_id": message_id,
+                "translation_id": translation_id,
+                "result": result,
+                "output_content": output_content,
+                "duration": duration
+            }
+        return {"type": "error", "detail": f"Unknown frame type: {kind}"}
+    
+    await websocket.accept()
+    await LiveSessionStream(websocket, handle).run()
+
+SESSION_MESSAGE_COLUMNS = ("id", "message_type", "original_content", "translated_content", "timestamp")
+
+@api_router.get("/live-session/{session_id}/messages")
+async def get_session_messages(
+    session_id: int,
+    request: Request,
+    since: Optional[int] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Messages of a session; pass since=<last_message_id> to only get newer ones"""
+    async def render():
+        session = await fetch_one(
+            "SELECT user_id, start_time, is_active FROM live_sessions WHERE id = %s",
+            (session_id,)
         )
         
         if not session or session['user_id'] != current_user['id']:
             raise HTTPException(status_code=403, detail="Access denied")
         
-        messages = execute_query(
-            """SELECT id, message_type, original_content, translated_content, timestamp
-               FROM session_messages WHERE session_id = %s ORDER BY timestamp ASC""",
-            (session_id,),
-            fetch=True
+        messages = await fetch_all(
+            f"""SELECT {', '.join(SESSION_MESSAGE_COLUMNS)}
+                FROM session_messages WHERE session_id = %s {"AND id > %s" if since else ""}
+                ORDER BY timestamp ASC, id ASC""",
+            (session_id, since) if since else (session_id,)
         )
+        messages = list(messages or [])
+        if session['start_time'] and session['start_time'].date() < history_archive.cutoff():
+            # Sessions that started before the hot window may have archived messages
+            archived = await history_archive.read("session_messages", session_id, SESSION_MESSAGE_COLUMNS)
+            messages = [m for m in archived[::-1] if not since or m['id'] > since] + messages
         
-        return {"success": True, "messages": messages or []}
+        return {
+            "success": True,
+            "messages": messages,
+            "is_active": bool(session['is_active']),
+            "last_message_id": max((m['id'] for m in messages), default=since)
+        }
+    
+    try:
+        return await response_cache.respond(
+            request, "session_messages", session_id, (current_user['id'], since), render
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -430,12 +1084,14 @@ async def get_session_messages(session_id: int, current_user: dict = Depends(get
 @api_router.post("/feedback")
 async def submit_feedback(request: FeedbackRequest, current_user: dict = Depends(get_current_user)):
     try:
-        feedback_id = execute_query(
+        feedback_id = await execute(
             """INSERT INTO feedback (user_id, translation_id, session_id, feedback_type, rating, comment)
                VALUES (%s, %s, %s, %s, %s, %s)""",
             (current_user['id'], request.translation_id, request.session_id, 
              request.feedback_type, request.rating, request.comment)
         )
+        stats_aggregator.record("feedback")
+        await response_cache.bump("feedback", [current_user['id']])
         
         return {"success": True, "feedback_id": feedback_id, "message": "Feedback submitted"}
     except Exception as e:
@@ -443,16 +1099,30 @@ async def submit_feedback(request: FeedbackRequest, current_user: dict = Depends
         raise HTTPException(status_code=500, detail="Failed to submit feedback")
 
 @api_router.get("/feedback")
-async def get_feedback(current_user: dict = Depends(get_current_user)):
+async def get_feedback(
+    request: Request,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     try:
-        feedback = execute_query(
-            """SELECT id, feedback_type, rating, comment, status, created_at
-               FROM feedback WHERE user_id = %s ORDER BY created_at DESC""",
-            (current_user['id'],),
-            fetch=True
-        )
+        limit = clamp_limit(limit)
+        condition, cursor_params = keyset_condition(cursor)
         
-        return {"success": True, "feedback": feedback or []}
+        async def render():
+            rows = await fetch_all(
+                f"""SELECT id, feedback_type, rating, comment, status, created_at
+                    FROM feedback WHERE user_id = %s {"AND " + condition if condition else ""}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s""",
+                (current_user['id'], *cursor_params, limit + 1)
+            )
+            feedback, next_cursor = paginate(rows, limit)
+            return {"success": True, "feedback": feedback, "limit": limit, "next_cursor": next_cursor}
+        
+        return await response_cache.respond(request, "feedback", current_user['id'], (limit, cursor), render)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Feedback retrieval error: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve feedback")
@@ -460,17 +1130,18 @@ async def get_feedback(current_user: dict = Depends(get_current_user)):
 # ----- Accessibility Settings Routes -----
 
 @api_router.get("/settings/accessibility")
-async def get_accessibility_settings(current_user: dict = Depends(get_current_user)):
-    try:
-        settings = execute_query(
+async def get_accessibility_settings(request: Request, current_user: dict = Depends(get_current_user)):
+    async def render():
+        settings = await fetch_one(
             """SELECT font_size, contrast_mode, color_theme, colorblind_mode,
                       text_to_speech_enabled, keyboard_navigation_hints, reduced_motion
                FROM accessibility_settings WHERE user_id = %s""",
-            (current_user['id'],),
-            fetch_one=True
+            (current_user['id'],)
         )
-        
         return {"success": True, "settings": settings or {}}
+    
+    try:
+        return await response_cache.respond(request, "accessibility", current_user['id'], None, render)
     except Exception as e:
         logger.error(f"Settings retrieval error: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve settings")
@@ -494,7 +1165,8 @@ async def update_accessibility_settings(
         params.append(current_user['id'])
         query = f"UPDATE accessibility_settings SET {', '.join(updates)} WHERE user_id = %s"
         
-        execute_query(query, tuple(params))
+        await execute(query, tuple(params))
+        await response_cache.bump("accessibility", [current_user['id']])
         
         return {"success": True, "message": "Settings updated"}
     except Exception as e:
@@ -504,71 +1176,145 @@ async def update_accessibility_settings(
 # ----- Admin Routes -----
 
 @api_router.get("/admin/users")
-async def get_all_users(current_user: dict = Depends(require_admin)):
+async def get_all_users(
+    request: Request,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(require_admin)
+):
     try:
-        users = execute_query(
-            """SELECT id, email, full_name, role, preferred_language, created_at, last_login, is_active
-               FROM users ORDER BY created_at DESC""",
-            fetch=True
+        limit = clamp_limit(limit)
+        condition, cursor_params = keyset_condition(cursor)
+        rows = await fetch_all(
+            f"""SELECT id, email, full_name, role, preferred_language, created_at, last_login, is_active
+                FROM users {"WHERE " + condition if condition else ""}
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s""",
+            (*cursor_params, limit + 1)
         )
+        users, next_cursor = paginate(rows, limit)
         
-        return {"success": True, "users": users or []}
+        return json_response(request, {"success": True, "users": users, "limit": limit, "next_cursor": next_cursor})
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Users retrieval error: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve users")
 
-@api_router.get("/admin/stats")
-async def get_admin_stats(current_user: dict = Depends(require_admin)):
+@api_router.get("/admin/users/export")
+async def export_users(request: Request, current_user: dict = Depends(require_admin)):
+    """All users as NDJSON, streamed from the database in batches"""
+    rows = stream_rows(
+        """SELECT id, email, full_name, role, preferred_language, created_at, last_login, is_active,
+                  translations_count
+           FROM users ORDER BY created_at DESC, id DESC"""
+    )
+    return ndjson_stream(request, rows, filename="users.ndjson")
+
+@api_router.put("/admin/users/{user_id}")
+async def update_user(user_id: int, request: AdminUserUpdateRequest, current_user: dict = Depends(require_admin)):
     try:
-        total_users = execute_query("SELECT COUNT(*) as count FROM users", fetch_one=True)
-        total_translations = execute_query("SELECT COUNT(*) as count FROM translation_history", fetch_one=True)
-        total_sessions = execute_query("SELECT COUNT(*) as count FROM live_sessions", fetch_one=True)
-        total_feedback = execute_query("SELECT COUNT(*) as count FROM feedback", fetch_one=True)
+        updates = []
+        params = []
         
-        recent_translations = execute_query(
-            """SELECT COUNT(*) as count FROM translation_history 
-               WHERE created_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)""",
-            fetch_one=True
-        )
+        for field, value in request.model_dump(exclude_none=True).items():
+            updates.append(f"{field} = %s")
+            params.append(value)
         
-        return {
-            "success": True,
-            "stats": {
-                "total_users": total_users['count'] if total_users else 0,
-                "total_translations": total_translations['count'] if total_translations else 0,
-                "total_sessions": total_sessions['count'] if total_sessions else 0,
-                "total_feedback": total_feedback['count'] if total_feedback else 0,
-                "recent_translations_7days": recent_translations['count'] if recent_translations else 0
-            }
-        }
+        if not updates:
+            return {"success": True, "message": "No changes"}
+        
+        updates.append("auth_version = auth_version + 1")
+        params.append(user_id)
+        await execute(f"UPDATE users SET {', '.join(updates)} WHERE id = %s", tuple(params))
+        await principal_cache.invalidate(user_id)
+        system_log.log("INFO", "audit", f"Admin updated user {user_id}", user_id=current_user['id'],
+                       data={"target_user_id": user_id, "changes": request.model_dump(exclude_none=True)})
+        
+        return {"success": True, "message": "User updated"}
+    except Exception as e:
+        logger.error(f"User update error: {e}")
+        raise HTTPException(status_code=500, detail="Failed to update user")
+
+@api_router.get("/admin/stats")
+async def get_admin_stats(current_user: dict = Depends(require_admin)):
+    try:
+        return {"success": True, "stats": await stats_aggregator.snapshot()}
     except Exception as e:
         logger.error(f"Stats retrieval error: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve stats")
 
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats(current_user: dict = Depends(require_admin)):
+    return {
+        "success": True,
+        "translation_cache": translation_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "write_behind": write_behind.stats(),
+        "artifacts": artifact_store.stats(),
+        "translation_memory": translation_memory.stats(),
+        "system_logs": system_log.stats(),
+        "history_archive": history_archive.stats(),
+        "search_index": search_index.stats(),
+        "response_cache": response_cache.stats(),
+        "micro_batching": batcher.stats(),
+        "ai_backends": ai_router.stats(),
+        "database": database_stats()
+    }
+
 @api_router.get("/admin/feedback")
-async def get_all_feedback(current_user: dict = Depends(require_admin)):
-    try:
-        feedback = execute_query(
-            """SELECT f.id, f.feedback_type, f.rating, f.comment, f.status, f.created_at,
-                      u.email, u.full_name
-               FROM feedback f
-               LEFT JOIN users u ON f.user_id = u.id
-               ORDER BY f.created_at DESC""",
-            fetch=True
+async def get_all_feedback(
+    request: Request,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(require_admin)
+):
+    try:
+        limit = clamp_limit(limit)
+        condition, cursor_params = keyset_condition(cursor, "f.created_at", "f.id")
+        rows = await fetch_all(
+            f"""SELECT f.id, f.feedback_type, f.rating, f.comment, f.status, f.created_at,
+                       u.email, u.full_name
+                FROM feedback f
+                LEFT JOIN users u ON f.user_id = u.id
+                {"WHERE " + condition if condition else ""}
+                ORDER BY f.created_at DESC, f.id DESC
+                LIMIT %s""",
+            (*cursor_params, limit + 1)
         )
+        feedback, next_cursor = paginate(rows, limit)
         
-        return {"success": True, "feedback": feedback or []}
+        return json_response(request, {"success": True, "feedback": feedback, "limit": limit, "next_cursor": next_cursor})
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Feedback retrieval error: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve feedback")
 
+@api_router.get("/admin/feedback/export")
+async def export_feedback(request: Request, current_user: dict = Depends(require_admin)):
+    """All feedback as NDJSON, streamed from the database in batches"""
+    rows = stream_rows(
+        """SELECT f.id, f.feedback_type, f.rating, f.comment, f.status, f.created_at,
+                  u.email, u.full_name
+           FROM feedback f
+           LEFT JOIN users u ON f.user_id = u.id
+           ORDER BY f.created_at DESC, f.id DESC"""
+    )
+    return ndjson_stream(request, rows, filename="feedback.ndjson")
+
 @api_router.put("/admin/feedback/{feedback_id}/status")
 async def update_feedback_status(feedback_id: int, status: str, current_user: dict = Depends(require_admin)):
     try:
-        execute_query(
+        await execute(
             "UPDATE feedback SET status = %s WHERE id = %s",
             (status, feedback_id)
         )
+        owner = await fetch_one("SELECT user_id FROM feedback WHERE id = %s", (feedback_id,))
+        if owner and owner['user_id']:
+            await response_cache.bump("feedback", [owner['user_id']])
+        system_log.log("INFO", "audit", f"Admin set feedback {feedback_id} to {status}", user_id=current_user['id'],
+                       data={"feedback_id": feedback_id, "status": status})
         
         return {"success": True, "message": "Status updated"}
     except Exception as e:
@@ -578,6 +1324,48 @@ async def update_feedback_status(feedback_id: int, status: str, current_user: di
 # Include router in app
 app.include_router(api_router)
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+# ===== Lifecycle =====
+
+background_tasks = []
+
+@app.on_event("startup")
+async def startup():
+    await asyncio.get_running_loop().run_in_executor(None, open_pool)
+    background_tasks.append(asyncio.create_task(prune_idle_connections_periodically()))
+    background_tasks.append(asyncio.create_task(monitor_replicas()))
+    background_tasks.append(asyncio.create_task(principal_cache.poll_invalidations()))
+    background_tasks.append(asyncio.create_task(response_cache.poll_invalidations()))
+    background_tasks.append(asyncio.create_task(write_behind.run()))
+    background_tasks.append(asyncio.create_task(stats_aggregator.run()))
+    background_tasks.append(asyncio.create_task(job_queue.run()))
+    background_tasks.append(asyncio.create_task(upload_store.run()))
+    background_tasks.append(asyncio.create_task(artifact_store.run(history_archive)))
+    background_tasks.append(asyncio.create_task(translation_memory.run()))
+    background_tasks.append(asyncio.create_task(system_log.run()))
+    background_tasks.append(asyncio.create_task(history_archive.run()))
+    background_tasks.append(asyncio.create_task(search_index.run()))
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await write_behind.drain()
+    try:
+        await stats_aggregator.flush()
+    except Exception as e:
+        logger.error(f"Stats flush error: {e}")
+    await system_log.drain()
+    ai_router.shutdown()
+    password_hasher.shutdown()
+    translation_cache.close()
+    close_pool()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from database import fetch_all, execute
+from partitions import CATCH_ALL, daily_ranges, list_partitions, add_partitions, drop_partitions
+from metrics import current_trace
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_LOG_QUEUE_SIZE = int(os.getenv('SYSTEM_LOG_QUEUE_SIZE', 10000))
+SYSTEM_LOG_BATCH_SIZE = int(os.getenv('SYSTEM_LOG_BATCH_SIZE', 500))
+SYSTEM_LOG_FLUSH_SECONDS = float(os.getenv('SYSTEM_LOG_FLUSH_SECONDS', 1))
+# "drop_oldest" keeps the most recent events when the DB lags, "drop_new" keeps the oldest
+SYSTEM_LOG_OVERFLOW = os.getenv('SYSTEM_LOG_OVERFLOW', 'drop_oldest')
+SYSTEM_LOG_INFO_SAMPLE_RATE = float(os.getenv('SYSTEM_LOG_INFO_SAMPLE_RATE', 0.1))
+# INFO events in these categories are always kept
+SYSTEM_LOG_UNSAMPLED_CATEGORIES = set(
+    filter(None, os.getenv('SYSTEM_LOG_UNSAMPLED_CATEGORIES', 'audit,security').split(','))
+)
+SYSTEM_LOG_RETENTION_DAYS = int(os.getenv('SYSTEM_LOG_RETENTION_DAYS', 30))
+SYSTEM_LOG_PARTITION_DAYS_AHEAD = int(os.getenv('SYSTEM_LOG_PARTITION_DAYS_AHEAD', 3))
+SYSTEM_LOG_RETENTION_SECONDS = float(os.getenv('SYSTEM_LOG_RETENTION_SECONDS', 3600))
+SYSTEM_LOG_DELETE_BATCH = 5000
+
+LEVELS = ("INFO", "WARNING", "ERROR", "CRITICAL")
+
+
+class SystemLogWriter:
+    """Non-blocking structured event log backed by the system_logs table.
+
+    log() only appends to a bounded in-memory queue, so it's safe on hot
+    paths and from any thread; a background task writes batches with one
+    multi-row INSERT. When the database falls behind, the overflow policy
+    drops events and counts them instead of applying backpressure.
+    """
+
+    def __init__(self, max_queue: int = SYSTEM_LOG_QUEUE_SIZE, batch_size: int = SYSTEM_LOG_BATCH_SIZE,
+                 flush_interval: float = SYSTEM_LOG_FLUSH_SECONDS, overflow: str = SYSTEM_LOG_OVERFLOW,
+                 info_sample_rate: float = SYSTEM_LOG_INFO_SAMPLE_RATE):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.info_sample_rate = info_sample_rate
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self.counters = Counter()
+
+    def log(self, level: str, category: str, message: str, user_id: Optional[int] = None,
+            ip_address: Optional[str] = None, user_agent: Optional[str] = None,
+            data: Optional[Dict[str, Any]] = None):
+        level = level.upper()
+        if level not in LEVELS:
+            level = "INFO"
+        if (level == "INFO" and category not in SYSTEM_LOG_UNSAMPLED_CATEGORIES
+                and random.random() >= self.info_sample_rate):
+            self.counters["sampled_out"] += 1
+            return
+
+        # Fill in whatever the current request already knows
+        trace = current_trace()
+        if trace is not None:
+            user_id = user_id if user_id is not None else trace.user_id
+            ip_address = ip_address or trace.client_ip
+            user_agent = user_agent or trace.user_agent
+            data = {"request_id": trace.request_id, **(data or {})}
+        row = (
+            level, (category or "")[:50], message, user_id, (ip_address or None) and ip_address[:45],
+            user_agent, json.dumps(data, ensure_ascii=False, default=str) if data else None,
+            datetime.now()
+        )
+
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                self.counters["dropped"] += 1
+                if self.overflow == "drop_new":
+                    return
+                self._queue.popleft()
+            self._queue.append(row)
+            self.counters["enqueued"] += 1
+
+    def _take(self, limit: int):
+        with self._lock:
+            count = min(limit, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _requeue(self, rows):
+        with self._lock:
+            room = self.max_queue - len(self._queue)
+            if room < len(rows):
+                self.counters["dropped"] += len(rows) - room
+                rows = rows[len(rows) - room:] if room > 0 else []
+            self._queue.extendleft(reversed(rows))
+
+    async def flush(self):
+        while True:
+            rows = self._take(self.batch_size)
+            if not rows:
+                return
+            try:
+                await execute(
+                    f"""INSERT INTO system_logs
+                        (log_level, log_category, message, user_id, ip_address, user_agent, additional_data, created_at)
+                        VALUES {', '.join(['(%s, %s, %s, %s, %s, %s, %s, %s)'] * len(rows))}""",
+                    tuple(value for row in rows for value in row)
+                )
+                self.counters["written"] += len(rows)
+                self.counters["flushes"] += 1
+            except Exception as e:
+                self.counters["flush_errors"] += 1
+                self._requeue(rows)
+                logger.error(f"System log flush error: {e}")
+                return
+
+    async def rotate_partitions(self, partitions):
+        """Adds daily partitions ahead of time and drops the ones past retention"""
+        today = datetime.now().date()
+        await add_partitions(
+            "system_logs", partitions,
+            daily_ranges(today, today + timedelta(days=SYSTEM_LOG_PARTITION_DAYS_AHEAD))
+        )
+        cutoff = today - timedelta(days=SYSTEM_LOG_RETENTION_DAYS)
+        expired = [name for name in partitions if name != CATCH_ALL and name < f"p{cutoff:%Y%m%d}"]
+        return await drop_partitions("system_logs", expired)
+
+    async def purge_expired(self) -> int:
+        """Batched deletes for an unpartitioned table, short enough not to stall writers"""
+        cutoff = datetime.now() - timedelta(days=SYSTEM_LOG_RETENTION_DAYS)
+        removed = 0
+        while True:
+            rows = await fetch_all(
+                "SELECT id FROM system_logs WHERE created_at < %s ORDER BY created_at LIMIT %s",
+                (cutoff, SYSTEM_LOG_DELETE_BATCH)
+            )
+            if not rows:
+                return removed
+            ids = [row['id'] for row in rows]
+            await execute(f"DELETE FROM system_logs WHERE id IN ({', '.join(['%s'] * len(ids))})", tuple(ids))
+            removed += len(ids)
+            await asyncio.sleep(0.1)
+
+    async def apply_retention(self):
+        partitions = await list_partitions("system_logs")
+        if CATCH_ALL in partitions:
+            self.counters["partitions_dropped"] += await self.rotate_partitions(partitions)
+        else:
+            self.counters["rows_purged"] += await self.purge_expired()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "queued": len(self._queue),
+            "max_queue": self.max_queue,
+            "overflow": self.overflow,
+            "info_sample_rate": self.info_sample_rate
+        }
+
+    async def run(self):
+        last_retention = 0.0
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if time.monotonic() - last_retention >= SYSTEM_LOG_RETENTION_SECONDS:
+                last_retention = time.monotonic()
+                try:
+                    await self.apply_retention()
+                except Exception as e:
+                    logger.error(f"System log retention error: {e}")
+
+    async def drain(self):
+        await self.flush()
+
+
+class SystemLogHandler(logging.Handler):
+    """Forwards standard logging records (WARNING and up by default) into
+    system_logs, so existing logger.error calls are persisted unchanged"""
+
+    def __init__(self, writer: SystemLogWriter, level: int = logging.WARNING):
+        super().__init__(level)
+        self.writer = writer
+
+    def emit(self, record: logging.LogRecord):
+        # The writer's own failures would otherwise feed back into the queue
+        if record.name == __name__:
+            return
+        try:
+            data = {"logger": record.name, "location": f"{record.pathname}:{record.lineno}"}
+            if record.exc_info:
+                data["exception"] = logging.Formatter().formatException(record.exc_info)
+            self.writer.log(
+                "WARNING" if record.levelname == "WARN" else record.levelname,
+                record.name, record.getMessage(), data=data
+            )
+        except Exception:
+            self.handleError(record)
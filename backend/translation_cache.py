@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_CACHE_SIZE = int(os.getenv('TRANSLATION_CACHE_SIZE', 10000))
+TRANSLATION_CACHE_TTL = int(os.getenv('TRANSLATION_CACHE_TTL', 86400))
+TRANSLATION_CACHE_DB = os.getenv('TRANSLATION_CACHE_DB', '')
+
+# Only text inputs are cached: audio/video inputs are references to media
+# whose content can change behind the same path
+CACHEABLE_INPUT_TYPES = {"text"}
+
+
+def normalize_content(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(input_type: str, output_type: str, input_language: str, output_language: str, content: str) -> str:
+    material = json.dumps(
+        [input_type, output_type, input_language, output_language, normalize_content(content)],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class _DiskTier:
+    """SQLite-backed tier shared by every worker process on the host"""
+
+    def __init__(self, path: str, ttl: int):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS translation_cache (
+                   cache_key TEXT PRIMARY KEY,
+                   value TEXT NOT NULL,
+                   expires_at REAL NOT NULL
+               )"""
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM translation_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+        if not row or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translation_cache (cache_key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now + self.ttl)
+            )
+            self._puts += 1
+            if self._puts % 1000 == 0:
+                self._conn.execute("DELETE FROM translation_cache WHERE expires_at < ?", (now,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TranslationCache:
+    """LRU/TTL result cache with an optional shared SQLite tier and single-flight"""
+
+    def __init__(self, max_entries: int = TRANSLATION_CACHE_SIZE, ttl: int = TRANSLATION_CACHE_TTL,
+                 db_path: str = TRANSLATION_CACHE_DB):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._disk = None
+        if db_path:
+            try:
+                self._disk = _DiskTier(db_path, ttl)
+            except sqlite3.Error as e:
+                logger.error(f"Translation cache disk tier disabled: {e}")
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "errors": 0
+        }
+
+    def _get_memory(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def _put_memory(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]],
+                             cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Cached value for key, computing it once for concurrent callers;
+        computed values that fail `cacheable` are returned but not stored.
+
+        The computation runs in its own task that every caller only awaits
+        through a shield, so a caller that's cancelled (say, its client
+        disconnected) doesn't cancel it for the others.
+        """
+        value = self._get_memory(key)
+        if value is not None:
+            self.counters["memory_hits"] += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.counters["coalesced"] += 1
+        else:
+            inflight = asyncio.create_task(self._load(key, compute, cacheable))
+            # Mark the exception retrieved so asyncio doesn't warn when every caller left
+            inflight.add_done_callback(lambda task: task.cancelled() or task.exception())
+            self._inflight[key] = inflight
+        return await asyncio.shield(inflight)
+
+    async def _load(self, key: str, compute: Callable[[], Awaitable[Any]],
+                    cacheable: Optional[Callable[[Any], bool]]) -> Any:
+        try:
+            value = None
+            store = True
+            if self._disk:
+                try:
+                    value = await asyncio.to_thread(self._disk.get, key)
+                except sqlite3.Error as e:
+                    logger.error(f"Translation cache read error: {e}")
+            if value is not None:
+                self.counters["disk_hits"] += 1
+            else:
+                self.counters["misses"] += 1
+                value = await compute()
+                store = cacheable is None or cacheable(value)
+                if self._disk and store:
+                    try:
+                        await asyncio.to_thread(self._disk.put, key, value)
+                    except sqlite3.Error as e:
+                        logger.error(f"Translation cache write error: {e}")
+            if store:
+                self._put_memory(key, value)
+            return value
+        except Exception:
+            self.counters["errors"] += 1
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = sum(self.counters[k] for k in ("memory_hits", "disk_hits", "coalesced", "misses"))
+        hits = lookups - self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "disk_enabled": self._disk is not None,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+    def close(self):
+        if self._disk:
+            self._disk.close()
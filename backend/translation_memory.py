@@ -0,0 +1,332 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from database import fetch_all, transaction
+from search_index import SEARCH_INDEX_SETTLE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+TM_REFRESH_SECONDS = float(os.getenv('TM_REFRESH_SECONDS', 60))
+TM_LEARN_SECONDS = float(os.getenv('TM_LEARN_SECONDS', 300))
+# History pairs must be seen this many times before they're trusted as memory
+TM_MIN_WEIGHT = int(os.getenv('TM_MIN_WEIGHT', 2))
+TM_FEEDBACK_WEIGHT = int(os.getenv('TM_FEEDBACK_WEIGHT', 5))
+TM_FUZZY_THRESHOLD = float(os.getenv('TM_FUZZY_THRESHOLD', 0.85))
+TM_MAX_PHRASE_CHARS = 500
+
+# Engines echo text they can't translate behind a target-language tag,
+# e.g. "[AR] text"; such outputs (and plain echoes) are never learned
+_UNTRANSLATED = (
+    "{p}output_content <> {p}input_content"
+    " AND LOCATE(CONCAT('[', UPPER({p}output_language), '] '), {p}output_content) = 0"
+)
+
+# Clause boundaries are kept verbatim and never sent to the engine
+_BOUNDARY = re.compile(r"([.!?؟,،;؛:]+)")
+# Tatweel and harakat
+_ARABIC_MARKS = re.compile("[\u0640\u064b-\u0652]")
+
+EngineCall = Callable[[str, str, str], Awaitable[Dict[str, Any]]]
+
+
+def normalize_token(token: str) -> str:
+    """Case- and diacritic-insensitive form used for matching, never for output"""
+    return _ARABIC_MARKS.sub("", unicodedata.normalize("NFC", token)).casefold()
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _PhraseIndex:
+    """Token trie over the source phrases of one language pair, plus a
+    trigram index over whole phrases for fuzzy lookup"""
+
+    def __init__(self):
+        self.root: Dict[str, Any] = {}
+        self.phrases: List[Tuple[str, str]] = []
+        self.trigrams: Dict[str, List[int]] = defaultdict(list)
+
+    def add(self, source: str, target: str):
+        tokens = [normalize_token(t) for t in source.split()]
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        if None in node:
+            return
+        # The None key marks a phrase end and holds its translation
+        node[None] = target
+        phrase_id = len(self.phrases)
+        normalized = " ".join(tokens)
+        self.phrases.append((normalized, target))
+        for gram in _trigrams(normalized):
+            self.trigrams[gram].append(phrase_id)
+
+    def longest_match(self, tokens: List[str], start: int) -> Tuple[int, Optional[str]]:
+        """Length and translation of the longest phrase starting at tokens[start]"""
+        node = self.root
+        best = (0, None)
+        for i in range(start, len(tokens)):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            if None in node:
+                best = (i - start + 1, node[None])
+        return best
+
+    def fuzzy(self, text: str, threshold: float) -> Optional[Tuple[str, float]]:
+        grams = _trigrams(text)
+        votes = defaultdict(int)
+        for gram in grams:
+            for phrase_id in self.trigrams.get(gram, ()):
+                votes[phrase_id] += 1
+        best = None
+        # Only phrases sharing enough trigrams are worth a full similarity check
+        for phrase_id, shared in sorted(votes.items(), key=lambda v: -v[1])[:20]:
+            if shared < len(grams) * threshold * 0.5:
+                break
+            source, target = self.phrases[phrase_id]
+            ratio = SequenceMatcher(None, text, source).ratio()
+            if ratio >= threshold and (best is None or ratio > best[1]):
+                best = (target, ratio)
+        return best
+
+
+class TranslationMemory:
+    """Bilingual phrase memory in front of the text translation engine.
+
+    Input is split into clauses, each clause is segmented by longest match
+    against the memory, near-misses are looked up fuzzily, and only the
+    remaining uncovered runs are sent to the engine.
+    """
+
+    def __init__(self, min_weight: int = TM_MIN_WEIGHT, fuzzy_threshold: float = TM_FUZZY_THRESHOLD):
+        self.min_weight = min_weight
+        self.fuzzy_threshold = fuzzy_threshold
+        self._indexes: Dict[Tuple[str, str], _PhraseIndex] = {}
+        self._loaded_at = None
+        self.counters = {
+            "requests": 0,
+            "tokens": 0,
+            "tokens_from_memory": 0,
+            "fuzzy_hits": 0,
+            "engine_calls": 0,
+            "requests_without_engine": 0
+        }
+
+    async def load(self):
+        rows = await fetch_all(
+            """SELECT source_language, target_language, source_text, target_text
+               FROM translation_memory
+               WHERE weight >= %s OR origin IN ('seed', 'feedback')
+               ORDER BY weight DESC, id ASC""",
+            (self.min_weight,)
+        )
+
+        def build():
+            # Highest weight first, so the first target added for a phrase wins
+            indexes = defaultdict(_PhraseIndex)
+            for row in rows or []:
+                indexes[(row['source_language'], row['target_language'])].add(row['source_text'], row['target_text'])
+            return dict(indexes)
+
+        self._indexes = await asyncio.to_thread(build)
+        self._loaded_at = time.time()
+
+    async def _translate_clause(self, clause: str, index: Optional[_PhraseIndex], source_lang: str,
+                                target_lang: str, engine: EngineCall) -> Tuple[str, float, int]:
+        words = clause.split()
+        if not words:
+            return clause, 1.0, 0
+        tokens = [normalize_token(w) for w in words]
+        self.counters["tokens"] += len(tokens)
+
+        # Segment into ("memory", translation) and ("engine", source run) pieces
+        segments = []
+        i = 0
+        uncovered_start = None
+        while i < len(tokens):
+            length, target = index.longest_match(tokens, i) if index else (0, None)
+            if length:
+                if uncovered_start is not None:
+                    segments.append(("engine", " ".join(words[uncovered_start:i])))
+                    uncovered_start = None
+                segments.append(("memory", target))
+                self.counters["tokens_from_memory"] += length
+                i += length
+            else:
+                if uncovered_start is None:
+                    uncovered_start = i
+                i += 1
+        if uncovered_start is not None:
+            segments.append(("engine", " ".join(words[uncovered_start:])))
+
+        async def resolve(kind: str, text: str) -> Tuple[str, float, int]:
+            if kind == "memory":
+                return text, 1.0, 0
+            if index:
+                match = index.fuzzy(" ".join(normalize_token(w) for w in text.split()), self.fuzzy_threshold)
+                if match:
+                    self.counters["fuzzy_hits"] += 1
+                    return match[0], match[1], 0
+            self.counters["engine_calls"] += 1
+            result = await engine(text, source_lang, target_lang)
+            return result['translated_text'], result.get('confidence', 0.0), 1
+
+        resolved = await asyncio.gather(*(resolve(kind, text) for kind, text in segments))
+        return (
+            " ".join(text for text, _, _ in resolved),
+            min(score for _, score, _ in resolved),
+            sum(calls for _, _, calls in resolved)
+        )
+
+    async def translate(self, text: str, source_lang: str, target_lang: str, engine: EngineCall) -> Dict[str, Any]:
+        """Drop-in for the engine's translate_text, calling it only for uncovered segments"""
+        start = time.monotonic()
+        self.counters["requests"] += 1
+        index = self._indexes.get((source_lang, target_lang))
+
+        # Whole-input hits skip segmentation entirely
+        if index:
+            length, target = index.longest_match([normalize_token(t) for t in text.split()], 0)
+            if length and length == len(text.split()):
+                self.counters["tokens"] += length
+                self.counters["tokens_from_memory"] += length
+                self.counters["requests_without_engine"] += 1
+                return self._result(target, source_lang, target_lang, 1.0, start)
+
+        parts = _BOUNDARY.split(text)
+        clauses = await asyncio.gather(*(
+            self._translate_clause(part, index, source_lang, target_lang, engine)
+            for part in parts[0::2]
+        ))
+        output = []
+        for position, part in enumerate(parts):
+            if position % 2:
+                output.append(part)
+            else:
+                translated = clauses[position // 2][0]
+                if translated:
+                    output.append((" " if output else "") + translated)
+        engine_calls = sum(calls for _, _, calls in clauses)
+        if not engine_calls:
+            self.counters["requests_without_engine"] += 1
+
+        confidence = min((score for _, score, _ in clauses), default=1.0)
+        return self._result("".join(output).strip(), source_lang, target_lang, confidence, start,
+                            engine_calls=engine_calls)
+
+    def _result(self, translated: str, source_lang: str, target_lang: str, confidence: float,
+                start: float, engine_calls: int = 0) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "translated_text": translated,
+            "source_language": source_lang,
+            "target_language": target_lang,
+            "confidence": round(confidence, 2),
+            "processing_time": round(time.monotonic() - start, 3),
+            "engine_calls": engine_calls
+        }
+
+    async def learn(self):
+        """Folds new text translations and rated feedback into the memory table.
+        Progress is tracked with id watermarks in stats_counters, locked for the
+        duration, so each row is counted once no matter which worker runs this.
+        Like the search index, a watermark only moves past rows older than
+        SEARCH_INDEX_SETTLE_SECONDS, so a lower id committed late is still read."""
+
+        def settled_to(cursor, table: str, watermark: int) -> int:
+            # End of the settled prefix: just before the first young row, if any
+            cursor.execute(
+                f"""SELECT MIN(IF(created_at > NOW() - INTERVAL %s SECOND, id, NULL)) AS young,
+                           COALESCE(MAX(id), %s) AS last
+                    FROM {table} WHERE id > %s""",
+                (SEARCH_INDEX_SETTLE_SECONDS, watermark, watermark)
+            )
+            row = cursor.fetchone()
+            return row['young'] - 1 if row['young'] is not None else row['last']
+
+        def work(cursor):
+            cursor.execute(
+                """INSERT IGNORE INTO stats_counters (name, value)
+                   VALUES ('tm_history_id', 0), ('tm_feedback_id', 0)"""
+            )
+            cursor.execute(
+                "SELECT name, value FROM stats_counters WHERE name IN ('tm_history_id', 'tm_feedback_id') FOR UPDATE"
+            )
+            watermarks = {row['name']: int(row['value']) for row in cursor.fetchall()}
+            history_to = settled_to(cursor, "translation_history", watermarks['tm_history_id'])
+            feedback_to = settled_to(cursor, "feedback", watermarks['tm_feedback_id'])
+
+            if history_to > watermarks['tm_history_id']:
+                cursor.execute(
+                    f"""INSERT INTO translation_memory
+                       (source_language, target_language, source_hash, target_hash, source_text, target_text, weight, origin)
+                       SELECT input_language, output_language, SHA2(input_content, 256), SHA2(output_content, 256),
+                              input_content, output_content, COUNT(*), 'history'
+                       FROM translation_history
+                       WHERE id > %s AND id <= %s AND input_type = 'text' AND output_type = 'text'
+                         AND input_language <> output_language AND output_content <> ''
+                         AND CHAR_LENGTH(input_content) <= %s AND {_UNTRANSLATED.format(p='')}
+                       GROUP BY input_language, output_language, input_content, output_content
+                       ON DUPLICATE KEY UPDATE weight = weight + VALUES(weight)""",
+                    (watermarks['tm_history_id'], history_to, TM_MAX_PHRASE_CHARS)
+                )
+            if feedback_to > watermarks['tm_feedback_id']:
+                # Good ratings promote the rated pair, poor ones demote it below the load threshold
+                cursor.execute(
+                    f"""INSERT INTO translation_memory
+                       (source_language, target_language, source_hash, target_hash, source_text, target_text, weight, origin)
+                       SELECT t.input_language, t.output_language, SHA2(t.input_content, 256), SHA2(t.output_content, 256),
+                              t.input_content, t.output_content,
+                              SUM(CASE WHEN f.rating >= 4 THEN %s ELSE -%s END), 'feedback'
+                       FROM feedback f JOIN translation_history t ON t.id = f.translation_id
+                       WHERE f.id > %s AND f.id <= %s AND f.rating IS NOT NULL AND f.rating <> 3
+                         AND t.input_type = 'text' AND t.output_type = 'text'
+                         AND t.input_language <> t.output_language AND CHAR_LENGTH(t.input_content) <= %s
+                         AND {_UNTRANSLATED.format(p='t.')}
+                       GROUP BY t.input_language, t.output_language, t.input_content, t.output_content
+                       ON DUPLICATE KEY UPDATE weight = weight + VALUES(weight),
+                           origin = IF(VALUES(weight) > 0, 'feedback', IF(origin = 'feedback', 'history', origin))""",
+                    (TM_FEEDBACK_WEIGHT, TM_FEEDBACK_WEIGHT, watermarks['tm_feedback_id'], feedback_to,
+                     TM_MAX_PHRASE_CHARS)
+                )
+            cursor.execute(
+                """UPDATE stats_counters
+                   SET value = CASE name WHEN 'tm_history_id' THEN %s ELSE %s END
+                   WHERE name IN ('tm_history_id', 'tm_feedback_id')""",
+                (history_to, feedback_to)
+            )
+
+        await transaction(work)
+
+    def stats(self) -> Dict[str, Any]:
+        tokens = self.counters["tokens"]
+        return {
+            **self.counters,
+            "coverage": round(self.counters["tokens_from_memory"] / tokens, 3) if tokens else 0.0,
+            "phrases": {f"{src}-{tgt}": len(index.phrases) for (src, tgt), index in self._indexes.items()},
+            "loaded_at": self._loaded_at
+        }
+
+    async def run(self, learn: bool = True):
+        last_learn = 0.0
+        while True:
+            try:
+                if learn and time.monotonic() - last_learn >= TM_LEARN_SECONDS:
+                    last_learn = time.monotonic()
+                    await self.learn()
+                await self.load()
+            except Exception as e:
+                logger.error(f"Translation memory refresh error: {e}")
+            await asyncio.sleep(TM_REFRESH_SECONDS)
@@ -0,0 +1,245 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = Path(os.getenv('UPLOAD_DIR', Path(__file__).parent / 'upload_spool'))
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', 500 * 1024 * 1024))
+UPLOAD_CHUNK_BYTES = int(os.getenv('UPLOAD_CHUNK_BYTES', 256 * 1024))
+UPLOAD_TTL_SECONDS = int(os.getenv('UPLOAD_TTL_SECONDS', 24 * 3600))
+UPLOAD_MEDIA_TYPES = ("audio", "video")
+
+UPLOAD_REFERENCE_PREFIX = "upload:"
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+class UploadError(Exception):
+    status_code = 400
+
+
+class UploadNotFoundError(UploadError):
+    status_code = 404
+
+
+class UploadOffsetMismatchError(UploadError):
+    """The client resumed from an offset that doesn't match what was stored"""
+    status_code = 409
+
+
+class UploadTooLargeError(UploadError):
+    status_code = 413
+
+
+def parse_content_range(header: Optional[str]):
+    """Returns (start, total) from a `bytes start-end/total` header, or (None, None)"""
+    if not header:
+        return None, None
+    match = _CONTENT_RANGE.fullmatch(header.strip())
+    if not match:
+        raise UploadError("Invalid Content-Range header")
+    total = None if match.group(3) == "*" else int(match.group(3))
+    return int(match.group(1)), total
+
+
+class UploadStore:
+    """Resumable uploads spooled to local disk.
+
+    Each upload is a `.part` data file plus a small JSON sidecar; the data
+    file's size is the authoritative resume offset, so any worker process
+    sharing the directory can accept the next chunk.
+    """
+
+    def __init__(self, root: Path = UPLOAD_DIR, max_bytes: int = UPLOAD_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _data_path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.json"
+
+    def _read_meta(self, upload_id: str) -> Dict[str, Any]:
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id or ""):
+            raise UploadNotFoundError("Upload not found")
+        try:
+            return json.loads(self._meta_path(upload_id).read_text())
+        except FileNotFoundError:
+            raise UploadNotFoundError("Upload not found")
+
+    def _write_meta(self, upload_id: str, meta: Dict[str, Any]):
+        tmp = self._meta_path(upload_id).with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, self._meta_path(upload_id))
+
+    def _status(self, upload_id: str, meta: Dict[str, Any]) -> Dict[str, Any]:
+        offset = self._data_path(upload_id).stat().st_size
+        return {
+            "upload_id": upload_id,
+            "media_type": meta['media_type'],
+            "language": meta['language'],
+            "offset": offset,
+            "total_size": meta['total_size'],
+            "complete": meta['complete'],
+            "reference": UPLOAD_REFERENCE_PREFIX + upload_id
+        }
+
+    def create(self, user_id: int, media_type: str, language: str = "en",
+               total_size: Optional[int] = None) -> Dict[str, Any]:
+        if media_type not in UPLOAD_MEDIA_TYPES:
+            raise UploadError(f"media_type must be one of {', '.join(UPLOAD_MEDIA_TYPES)}")
+        if total_size is not None and total_size > self.max_bytes:
+            raise UploadTooLargeError(f"Uploads are limited to {self.max_bytes} bytes")
+        upload_id = uuid.uuid4().hex
+        meta = {
+            "user_id": user_id,
+            "media_type": media_type,
+            "language": language,
+            "total_size": total_size,
+            "complete": False,
+            "created_at": time.time()
+        }
+        self._data_path(upload_id).touch()
+        self._write_meta(upload_id, meta)
+        return self._status(upload_id, meta)
+
+    def get(self, upload_id: str, user_id: int) -> Dict[str, Any]:
+        meta = self._read_meta(upload_id)
+        if meta['user_id'] != user_id:
+            raise UploadNotFoundError("Upload not found")
+        return self._status(upload_id, meta)
+
+    async def append(self, upload_id: str, user_id: int, chunks: AsyncIterator[bytes],
+                     offset: Optional[int] = None, total_size: Optional[int] = None) -> Dict[str, Any]:
+        """Appends a streamed request body at `offset`, one chunk in memory at a time"""
+        # Unknown ids fail before a lock is made for them
+        self._read_meta(upload_id)
+        lock = self._locks.setdefault(upload_id, asyncio.Lock())
+        async with lock:
+            meta = self._read_meta(upload_id)
+            if meta['user_id'] != user_id:
+                raise UploadNotFoundError("Upload not found")
+            if meta['complete']:
+                raise UploadOffsetMismatchError("Upload already complete")
+            if total_size is not None:
+                meta['total_size'] = total_size
+            limit = min(meta['total_size'] or self.max_bytes, self.max_bytes)
+
+            path = self._data_path(upload_id)
+            current = path.stat().st_size
+            if offset is not None and offset != current:
+                raise UploadOffsetMismatchError(f"Expected offset {current}")
+
+            with open(path, "ab") as f:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if current + len(chunk) > limit:
+                        raise UploadTooLargeError(f"Upload exceeds {limit} bytes")
+                    await asyncio.to_thread(f.write, chunk)
+                    current += len(chunk)
+                await asyncio.to_thread(f.flush)
+
+            if meta['total_size'] is not None and current >= meta['total_size']:
+                meta['complete'] = True
+            self._write_meta(upload_id, meta)
+            if meta['complete']:
+                # Completed uploads take no more appends, so their lock can go
+                self._locks.pop(upload_id, None)
+            return self._status(upload_id, meta)
+
+    def complete(self, upload_id: str, user_id: int) -> Dict[str, Any]:
+        meta = self._read_meta(upload_id)
+        if meta['user_id'] != user_id:
+            raise UploadNotFoundError("Upload not found")
+        meta['complete'] = True
+        meta['total_size'] = self._data_path(upload_id).stat().st_size
+        self._write_meta(upload_id, meta)
+        self._locks.pop(upload_id, None)
+        return self._status(upload_id, meta)
+
+    async def save_file(self, user_id: int, media_type: str, language: str, fileobj) -> Dict[str, Any]:
+        """Stores an already-spooled multipart file as a completed upload"""
+        status = self.create(user_id, media_type, language)
+        upload_id = status['upload_id']
+
+        def copy():
+            with open(self._data_path(upload_id), "wb") as out:
+                shutil.copyfileobj(fileobj, out, UPLOAD_CHUNK_BYTES)
+
+        await asyncio.to_thread(copy)
+        if self._data_path(upload_id).stat().st_size > self.max_bytes:
+            self.delete(upload_id)
+            raise UploadTooLargeError(f"Uploads are limited to {self.max_bytes} bytes")
+        return self.complete(upload_id, user_id)
+
+    def resolve(self, reference: str, user_id: int) -> Optional[Dict[str, Any]]:
+        """Maps an `upload:<id>` reference in input_content to its local file"""
+        if not reference.startswith(UPLOAD_REFERENCE_PREFIX):
+            return None
+        upload_id = reference[len(UPLOAD_REFERENCE_PREFIX):]
+        status = self.get(upload_id, user_id)
+        if not status['complete']:
+            raise UploadOffsetMismatchError("Upload is not complete yet")
+        return {**status, "path": str(self._data_path(upload_id))}
+
+    async def iter_chunks(self, upload_id: str, user_id: int, chunk_size: int = UPLOAD_CHUNK_BYTES,
+                          poll_interval: float = 0.2, idle_timeout: float = 60) -> AsyncIterator[bytes]:
+        """Yields the upload's bytes, following the file while it is still arriving"""
+        self.get(upload_id, user_id)
+        path = self._data_path(upload_id)
+        idle = 0.0
+        with open(path, "rb") as f:
+            while True:
+                chunk = await asyncio.to_thread(f.read, chunk_size)
+                if chunk:
+                    idle = 0.0
+                    yield chunk
+                    continue
+                if self._read_meta(upload_id)['complete'] and f.tell() >= path.stat().st_size:
+                    return
+                if idle >= idle_timeout:
+                    raise UploadError("Upload stalled")
+                await asyncio.sleep(poll_interval)
+                idle += poll_interval
+
+    def delete(self, upload_id: str):
+        self._locks.pop(upload_id, None)
+        for path in (self._data_path(upload_id), self._meta_path(upload_id)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def prune(self, max_age: int = UPLOAD_TTL_SECONDS) -> int:
+        cutoff = time.time() - max_age
+        removed = 0
+        for meta_path in self.root.glob("*.json"):
+            try:
+                if json.loads(meta_path.read_text()).get('created_at', 0) < cutoff:
+                    self.delete(meta_path.stem)
+                    removed += 1
+            except (OSError, ValueError) as e:
+                logger.error(f"Upload prune error for {meta_path.name}: {e}")
+        return removed
+
+    async def run(self, interval: float = 3600):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = await asyncio.to_thread(self.prune)
+                if removed:
+                    logger.info(f"Pruned {removed} expired uploads")
+            except Exception as e:
+                logger.error(f"Upload prune error: {e}")
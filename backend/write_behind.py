@@ -0,0 +1,286 @@
+import os
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import pymysql
+
+from artifacts import reference_statement
+from database import fetch_one, execute_many, PoolTimeoutError
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_MAX_BATCH = int(os.getenv('WRITE_BEHIND_MAX_BATCH', 200))
+WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv('WRITE_BEHIND_FLUSH_SECONDS', 0.05))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv('WRITE_BEHIND_MAX_PENDING', 5000))
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv('WRITE_BEHIND_MAX_ATTEMPTS', 3))
+# "flush": callers wait until their row is committed and get its id back
+# "enqueue": callers return as soon as the row is buffered (id is None)
+WRITE_BEHIND_DURABILITY = os.getenv('WRITE_BEHIND_DURABILITY', 'flush')
+
+# Counters kept in step with each flush: table -> (counter table, column, index of the key in a row)
+TABLE_COUNTERS = {
+    "translation_history": ("users", "translations_count", 0),
+    "session_messages": ("live_sessions", "messages_count", 0),
+}
+
+# Tables whose rows point at generated media: table -> index of the URL in a row
+TABLE_ARTIFACTS = {
+    "translation_history": 5,
+}
+
+TABLE_COLUMNS = {
+    "translation_history": (
+        "user_id", "input_type", "input_content", "input_language", "output_type",
+        "output_content", "output_language", "translation_duration"
+    ),
+    "session_messages": (
+        "session_id", "message_type", "original_content", "translated_content"
+    ),
+}
+
+
+def _is_transient(error: Exception) -> bool:
+    # Connection trouble, deadlocks and lock timeouts fail every row alike;
+    # splitting the batch would only repeat the failure once per row
+    return isinstance(error, (pymysql.err.OperationalError, pymysql.err.InterfaceError, PoolTimeoutError))
+
+
+class _PendingRow:
+    __slots__ = ("values", "future", "attempts")
+
+    def __init__(self, values: Tuple, future: Optional[asyncio.Future]):
+        self.values = values
+        self.future = future
+        self.attempts = 0
+
+
+class WriteBehindBuffer:
+    """Buffers history and session-message INSERTs and flushes them as
+    multi-row statements on size or time thresholds"""
+
+    def __init__(self, max_batch: int = WRITE_BEHIND_MAX_BATCH,
+                 flush_interval: float = WRITE_BEHIND_FLUSH_SECONDS,
+                 max_pending: int = WRITE_BEHIND_MAX_PENDING,
+                 durability: str = WRITE_BEHIND_DURABILITY):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.durability = durability
+        self._pending: Dict[str, List[_PendingRow]] = {table: [] for table in TABLE_COLUMNS}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        # Until check_auto_increment confirms consecutive ids, rows that need
+        # their id back are inserted one statement each
+        self.consecutive_ids = False
+        # Awaited with (table, row values) after each committed batch
+        self._listeners: List[Callable[[str, List[Tuple]], Awaitable[None]]] = []
+        self.counters = {
+            "rows_enqueued": 0,
+            "rows_written": 0,
+            "rows_dropped": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "row_retries": 0
+        }
+
+    def add_listener(self, listener: Callable[[str, List[Tuple]], Awaitable[None]]):
+        self._listeners.append(listener)
+
+    def pending_count(self) -> int:
+        return sum(len(rows) for rows in self._pending.values())
+
+    async def add_many(self, table: str, rows: List[Tuple]) -> List[Optional[int]]:
+        if self._closed:
+            raise RuntimeError("Write-behind buffer is closed")
+        if self.pending_count() >= self.max_pending:
+            # The DB is falling behind; make this caller pay for a flush
+            await self.flush()
+
+        loop = asyncio.get_running_loop()
+        futures = []
+        for values in rows:
+            future = loop.create_future() if self.durability == "flush" else None
+            self._pending[table].append(_PendingRow(values, future))
+            futures.append(future)
+        self.counters["rows_enqueued"] += len(rows)
+        if len(self._pending[table]) >= self.max_batch:
+            self._wakeup.set()
+        if self.durability != "flush":
+            return [None] * len(rows)
+        return list(await asyncio.gather(*futures))
+
+    async def add(self, table: str, values: Tuple) -> Optional[int]:
+        return (await self.add_many(table, [values]))[0]
+
+    async def add_translation(self, user_id: int, input_type: str, input_content: str, input_language: str,
+                              output_type: str, output_content: str, output_language: str,
+                              duration: float) -> Optional[int]:
+        return await self.add("translation_history", (
+            user_id, input_type, input_content, input_language,
+            output_type, output_content, output_language, duration
+        ))
+
+    async def add_translations(self, rows: List[Tuple]) -> List[Optional[int]]:
+        return await self.add_many("translation_history", rows)
+
+    async def add_session_message(self, session_id: int, message_type: str, original_content: str,
+                                  translated_content: str) -> Optional[int]:
+        return await self.add("session_messages", (session_id, message_type, original_content, translated_content))
+
+    async def check_auto_increment(self):
+        """Decides whether a multi-row INSERT's ids can be derived from its
+        lastrowid. That needs auto_increment_increment = 1 (not the case on
+        Galera or multi-primary setups) and an InnoDB lock mode that hands a
+        statement a consecutive range; otherwise each row gets its own
+        INSERT, still in one transaction per table."""
+        try:
+            row = await fetch_one(
+                "SELECT @@auto_increment_increment AS increment, @@innodb_autoinc_lock_mode AS lock_mode",
+                replica=False
+            )
+        except Exception as e:
+            logger.error(f"Write-behind auto-increment check failed, inserting rows one by one: {e}")
+            self.consecutive_ids = False
+            return
+        self.consecutive_ids = row['increment'] == 1 and row['lock_mode'] in (0, 1)
+        if not self.consecutive_ids:
+            logger.warning(
+                f"auto_increment_increment={row['increment']}, innodb_autoinc_lock_mode={row['lock_mode']}: "
+                "write-behind inserts rows one by one to return their ids"
+            )
+
+    def _build_statements(self, table: str, rows: List[_PendingRow]) -> Tuple[List[Tuple[str, Tuple]], bool]:
+        """Statements writing one table's batch, and whether its rows share a
+        single multi-row INSERT (otherwise the first len(rows) statements
+        insert one row each)"""
+        columns = TABLE_COLUMNS[table]
+        placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+        # Without waiting callers no ids are handed out, so the order doesn't matter
+        multi_row = self.consecutive_ids or all(row.future is None for row in rows)
+        if multi_row:
+            statements = [(
+                insert + ", ".join([placeholders] * len(rows)),
+                tuple(value for row in rows for value in row.values)
+            )]
+        else:
+            statements = [(insert + placeholders, row.values) for row in rows]
+
+        # One coalesced counter update per flush instead of one per row
+        counter_table, column, key_index = TABLE_COUNTERS[table]
+        increments = Counter(row.values[key_index] for row in rows)
+        cases = " ".join(["WHEN %s THEN %s"] * len(increments))
+        params = tuple(value for item in increments.items() for value in item)
+        ids = tuple(increments)
+        statements.append((
+            f"""UPDATE {counter_table} SET {column} = {column} + CASE id {cases} ELSE 0 END
+                WHERE id IN ({', '.join(['%s'] * len(ids))})""",
+            params + ids
+        ))
+
+        # Reference counts that keep the artifacts these rows point at from being collected
+        if table in TABLE_ARTIFACTS:
+            statement = reference_statement(row.values[TABLE_ARTIFACTS[table]] or "" for row in rows)
+            if statement:
+                statements.append(statement)
+        return statements, multi_row
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self.pending_count():
+                for table, rows in self._pending.items():
+                    if rows:
+                        self._pending[table] = rows[self.max_batch:]
+                        if not await self._write(table, rows[:self.max_batch]):
+                            # Requeued rows wait for the next flush instead of
+                            # burning through their attempts in this one
+                            return
+
+    async def _write(self, table: str, rows: List[_PendingRow]) -> bool:
+        """Writes one table's batch in its own transaction; False when rows
+        were put back for a later attempt. A batch that fails on its data is
+        retried row by row, so only the callers whose rows are bad see the
+        error."""
+        statements, multi_row = self._build_statements(table, rows)
+        try:
+            results = await execute_many(statements)
+        except Exception as e:
+            self.counters["flush_errors"] += 1
+            if len(rows) > 1 and not _is_transient(e):
+                logger.error(f"Write-behind flush error on {table}, retrying {len(rows)} rows one by one: {e}")
+                self.counters["row_retries"] += len(rows)
+                written = True
+                for row in rows:
+                    written = await self._write(table, [row]) and written
+                return written
+            logger.error(f"Write-behind flush error on {table}: {e}")
+            retry = []
+            for row in rows:
+                row.attempts += 1
+                if row.future is not None:
+                    if not row.future.done():
+                        row.future.set_exception(e)
+                elif row.attempts < WRITE_BEHIND_MAX_ATTEMPTS:
+                    retry.append(row)
+                else:
+                    self.counters["rows_dropped"] += 1
+            self._pending[table] = retry + self._pending[table]
+            return not retry
+
+        self.counters["flushes"] += 1
+        self.counters["rows_written"] += len(rows)
+        if multi_row:
+            # With consecutive allocation a multi-row INSERT gets one
+            # auto-increment range, and lastrowid is the first id in it
+            ids = [results[0] + offset for offset in range(len(rows))]
+        else:
+            ids = results[:len(rows)]
+        for row, row_id in zip(rows, ids):
+            if row.future is not None and not row.future.done():
+                row.future.set_result(row_id)
+        for listener in self._listeners:
+            try:
+                await listener(table, [row.values for row in rows])
+            except Exception as e:
+                logger.error(f"Write-behind listener error: {e}")
+        return True
+
+    async def run(self):
+        await self.check_auto_increment()
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Write-behind loop error: {e}")
+
+    async def drain(self):
+        """Stop accepting rows and flush everything still buffered"""
+        self._closed = True
+        self._wakeup.set()
+        dropped = self.counters["rows_dropped"]
+        await self.flush()
+        # Every pass spends an attempt of each requeued row, so this ends
+        # once they're written or dropped
+        while self.pending_count():
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+        if self.counters["rows_dropped"] > dropped:
+            logger.error(f"Write-behind drain left {self.counters['rows_dropped'] - dropped} rows unwritten")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "pending": self.pending_count(),
+            "durability": self.durability,
+            "consecutive_ids": self.consecutive_ids,
+            "max_batch": self.max_batch,
+            "flush_interval": self.flush_interval
+        }
@@ -0,0 +1,142 @@
+import sys
+import asyncio
+import threading
+from collections import deque
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from ai_backends import AI_HEDGE_MIN_SAMPLES, Backend, BackendRouter, CircuitBreaker  # noqa: E402
+from ai_backends import BackendUnavailableError  # noqa: E402
+
+
+class Services:
+    def __init__(self, name, block=False, fail=False):
+        self.name = name
+        self.fail = fail
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def translate_text(self, text, source_lang, target_lang):
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return {"translated_text": f"{self.name}:{text}"}
+
+
+def _router(*services, **kwargs):
+    backends = [Backend(s.name, s, ["text_translation"]) for s in services]
+    return BackendRouter(backends, **kwargs), backends
+
+
+def _run(router, services, scenario):
+    try:
+        return asyncio.run(scenario())
+    finally:
+        for s in services:
+            s.release.set()
+        router.shutdown()
+
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker("test", failures=2, open_seconds=60)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    # Once the open period has passed a single probe is let through
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.consecutive_failures == 0
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_and_abandoned_probe_frees_slot():
+    breaker = CircuitBreaker("test", failures=1, open_seconds=60)
+    breaker.record_failure()
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_hedge_winner_returns_while_loser_stays_in_flight():
+    slow, fast = Services("slow", block=True), Services("fast")
+    router, (slow_backend, fast_backend) = _router(slow, fast)
+    # The slow backend looks cheapest, so the call starts there and is hedged
+    slow_backend.health["text_translation"].ewma = 0.001
+    fast_backend.health["text_translation"].ewma = 1.0
+    router._latencies["translate_text"] = deque([0.01] * AI_HEDGE_MIN_SAMPLES)
+
+    async def scenario():
+        result = await router.call("translate_text", "hi", "en", "ar")
+        await asyncio.sleep(0.05)
+        loser = (slow_backend.health["text_translation"].inflight,
+                 slow_backend.executor.stats()["text_translation"]["active"])
+        slow.release.set()
+        for _ in range(200):
+            if not slow_backend.health["text_translation"].inflight:
+                break
+            await asyncio.sleep(0.01)
+        return result, loser
+
+    result, loser = _run(router, [slow, fast], scenario)
+
+    assert result == {"translated_text": "fast:hi"}
+    assert loser == (1, 1)
+    assert slow_backend.health["text_translation"].inflight == 0
+    assert slow_backend.executor.stats()["text_translation"]["active"] == 0
+    assert fast_backend.health["text_translation"].inflight == 0
+    assert router.counters["text_translation"]["hedges"] == 1
+    assert router.counters["text_translation"]["hedge_wins"] == 1
+
+
+def test_failure_fails_over_and_counts_against_breaker():
+    broken, healthy = Services("broken", fail=True), Services("healthy")
+    router, (broken_backend, healthy_backend) = _router(broken, healthy)
+    broken_backend.health["text_translation"].ewma = 0.001
+    healthy_backend.health["text_translation"].ewma = 1.0
+
+    result = _run(router, [broken, healthy], lambda: router.call("translate_text", "hi", "en", "ar"))
+
+    assert result == {"translated_text": "healthy:hi"}
+    health = broken_backend.health["text_translation"]
+    assert health.breaker.consecutive_failures == 1
+    assert health.counters["failures"] == 1
+    assert health.inflight == 0
+    assert router.counters["text_translation"]["failovers"] == 1
+    assert router.counters["text_translation"]["failover_successes"] == 1
+
+
+def test_open_breakers_without_fallback_are_unavailable():
+    down = Services("down")
+    router, (backend,) = _router(down)
+    backend.health["text_translation"].breaker.state = "open"
+    backend.health["text_translation"].breaker.opened_at = float("inf")
+
+    async def scenario():
+        with pytest.raises(BackendUnavailableError):
+            await router.call("translate_text", "hi", "en", "ar")
+
+    _run(router, [down], scenario)
+
+    assert router.counters["text_translation"]["unavailable"] == 1
@@ -0,0 +1,190 @@
+import os
+import sys
+import json
+import time
+import asyncio
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import artifacts  # noqa: E402
+from artifacts import ArtifactStore, dereference_statement, parse_range, reference_statement  # noqa: E402
+
+ARTIFACT_ID = "0123456789abcdef"
+DATA = bytes(range(100))
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=10-19", 100) == (10, 19)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    # The end is clamped to the last byte
+    assert parse_range("bytes=90-500", 100) == (90, 99)
+
+
+def test_parse_suffix_range():
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=-500", 100) == (0, 99)
+    with pytest.raises(ValueError):
+        parse_range("bytes=-0", 100)
+
+
+def test_parse_unsatisfiable_range():
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
+    with pytest.raises(ValueError):
+        parse_range("bytes=20-10", 100)
+
+
+def test_multiple_and_malformed_ranges_get_the_full_file():
+    assert parse_range("bytes=0-9,20-29", 100) is None
+    assert parse_range("bytes=-", 100) is None
+    assert parse_range("items=0-9", 100) is None
+
+
+def _store(tmp_path):
+    store = ArtifactStore(tmp_path)
+    path = tmp_path / "audio" / f"{ARTIFACT_ID}.wav"
+    path.write_bytes(DATA)
+    return store, path
+
+
+def _send(response):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    async def receive():
+        return {"type": "http.request"}
+
+    asyncio.run(response({"type": "http", "extensions": {}}, receive, send))
+    start = messages[0]
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    return start["status"], headers, b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def test_range_response(tmp_path):
+    store, path = _store(tmp_path)
+
+    status, headers, body = _send(store.response("audio", path, {"range": "bytes=-10"}))
+
+    assert status == 206
+    assert headers["content-range"] == "bytes 90-99/100"
+    assert headers["content-length"] == "10"
+    assert body == DATA[90:]
+
+
+def test_range_past_end_is_416(tmp_path):
+    store, path = _store(tmp_path)
+
+    response = store.response("audio", path, {"range": "bytes=100-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */100"
+
+
+def test_multiple_ranges_get_full_200(tmp_path):
+    store, path = _store(tmp_path)
+
+    status, headers, body = _send(store.response("audio", path, {"range": "bytes=0-9,20-29"}))
+
+    assert status == 200
+    assert "content-range" not in headers
+    assert body == DATA
+
+
+def test_if_none_match_is_304(tmp_path):
+    store, path = _store(tmp_path)
+
+    response = store.response("audio", path, {"if-none-match": f'"other", "{ARTIFACT_ID}"'})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == f'"{ARTIFACT_ID}"'
+    assert store.response("audio", path, {"if-none-match": "*"}).status_code == 304
+    assert store.response("audio", path, {"if-none-match": '"other"'}).status_code == 200
+
+
+def test_if_range_mismatch_gets_full_200(tmp_path):
+    store, path = _store(tmp_path)
+
+    status, _, body = _send(store.response("audio", path, {"range": "bytes=0-9", "if-range": '"stale"'}))
+    assert (status, body) == (200, DATA)
+
+    status, _, body = _send(store.response("audio", path, {"range": "bytes=0-9", "if-range": f'"{ARTIFACT_ID}"'}))
+    assert (status, body) == (206, DATA[:10])
+
+
+def test_head_sends_no_body(tmp_path):
+    store, path = _store(tmp_path)
+
+    status, headers, body = _send(store.response("audio", path, {}, method="HEAD"))
+
+    assert (status, headers["content-length"], body) == (200, "100", b"")
+
+
+def test_reference_statements_count_only_artifact_urls():
+    url = f"/api/mock/audio/{ARTIFACT_ID}"
+    query, params = reference_statement([url, url, "plain text", ""])
+
+    assert "refs = refs + VALUES(refs)" in query
+    assert params == ("audio", ARTIFACT_ID, 2)
+    assert reference_statement(["plain text"]) is None
+    assert dereference_statement(url)[1] == ("audio", ARTIFACT_ID)
+    assert dereference_statement("plain text") is None
+
+
+def _artifact(store, kind, artifact_id, age):
+    extension = artifacts.ARTIFACT_KINDS[kind][1]
+    path = store.root / kind / f"{artifact_id}.{extension}"
+    sidecar = store.root / kind / f"{artifact_id}.json"
+    path.write_bytes(b"x")
+    sidecar.write_text(json.dumps({"text": "hi", "language": "en", "created_at": time.time() - age}))
+    os.utime(sidecar, (time.time() - age, time.time() - age))
+    return path, sidecar
+
+
+def test_orphan_sweep_uses_reference_counts(tmp_path, monkeypatch):
+    store = ArtifactStore(tmp_path)
+    day = 86400
+    referenced = _artifact(store, "audio", "a" * 16, age=30 * day)
+    orphan = _artifact(store, "audio", "b" * 16, age=30 * day)
+    young_orphan = _artifact(store, "sign-video", "c" * 16, age=60)
+    queries = []
+
+    async def fetch_all(query, params=None, replica=None):
+        queries.append(params)
+        # artifact_references: only "aaa…" still has refs > 0
+        return [{"artifact_id": artifact_id} for artifact_id in params[1:] if artifact_id == "a" * 16]
+
+    monkeypatch.setattr(artifacts, "fetch_all", fetch_all)
+    asyncio.run(store.refresh_references())
+    removed = store.remove_orphans(max_age=7 * day)
+
+    # Only the artifacts on disk are looked up, one query per kind
+    assert {frozenset(q) for q in queries} == {
+        frozenset(("audio", "a" * 16, "b" * 16)), frozenset(("sign-video", "c" * 16))
+    }
+    assert removed == 1
+    assert all(path.exists() for path in referenced + young_orphan)
+    assert not any(path.exists() for path in orphan)
+
+
+def test_nothing_is_removed_until_archive_is_counted(tmp_path, monkeypatch):
+    store = ArtifactStore(tmp_path)
+    orphan = _artifact(store, "audio", "b" * 16, age=30 * 86400)
+
+    async def not_counted(archive):
+        return False
+
+    async def scenario():
+        monkeypatch.setattr(store, "count_archived_references", not_counted)
+        task = asyncio.create_task(store.run(archive=object(), interval=0.01))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(scenario())
+
+    assert all(path.exists() for path in orphan)
@@ -0,0 +1,147 @@
+import sys
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from inference import (  # noqa: E402
+    InferenceExecutor, InferenceQueueFullError, InferenceTimeoutError, _ModalityLimiter
+)
+
+
+class BlockingServices:
+    """Service calls that run until the test releases them"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def translate_text(self, text, source_lang, target_lang):
+        self.release.wait(5)
+        return {"translated_text": text}
+
+    def speech_to_text_stream(self, chunks, language="en"):
+        for chunk in chunks:
+            yield {"text": chunk.decode(), "final": False}
+        yield {"text": "done", "final": True}
+
+    def sign_language_to_text_stream(self, chunks, language="en"):
+        for chunk in chunks:
+            raise RuntimeError("bad frame")
+        yield {}
+
+
+def _run(scenario, concurrency=None):
+    services = BlockingServices()
+    executor = InferenceExecutor(services, max_workers=4)
+    if concurrency is not None:
+        executor._limiters["text_translation"] = _ModalityLimiter(*concurrency)
+    try:
+        return asyncio.run(scenario(executor, services))
+    finally:
+        services.release.set()
+        executor.shutdown()
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+async def _settle(condition, timeout=2.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition() and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def test_stream_completes_and_releases_slot():
+    async def scenario(executor, services):
+        items = [item async for item in executor.stream("speech_to_text_stream", _chunks(b"a", b"b"), "en")]
+        return items, executor.stats()["speech_to_text"]
+
+    items, limits = _run(scenario)
+
+    assert [item["text"] for item in items] == ["a", "b", "done"]
+    assert limits["active"] == 0 and limits["waiting"] == 0
+
+
+def test_stream_worker_error_is_raised_and_releases_slot():
+    async def scenario(executor, services):
+        with pytest.raises(RuntimeError, match="bad frame"):
+            async for _ in executor.stream("sign_language_to_text_stream", _chunks(b"x"), "en"):
+                pass
+        return executor.stats()["sign_to_text"]
+
+    limits = _run(scenario)
+
+    assert limits["active"] == 0
+
+
+def test_on_release_waits_for_worker_after_timeout():
+    async def scenario(executor, services):
+        released = []
+        with pytest.raises(InferenceTimeoutError):
+            await executor.call("translate_text", "x", "en", "ar", timeout=0.05,
+                                on_release=lambda: released.append(1))
+        # The caller gave up, but the worker still holds its slot
+        before = (list(released), executor.stats()["text_translation"]["active"])
+        services.release.set()
+        await _settle(lambda: released)
+        return before, released, executor.stats()["text_translation"]["active"]
+
+    before, released, active = _run(scenario)
+
+    assert before == ([], 1)
+    assert released == [1]
+    assert active == 0
+
+
+def test_on_release_fires_once_when_running_call_is_cancelled():
+    async def scenario(executor, services):
+        released = []
+        task = asyncio.create_task(
+            executor.call("translate_text", "x", "en", "ar", on_release=lambda: released.append(1))
+        )
+        await _settle(lambda: executor.stats()["text_translation"]["active"] == 1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        before = list(released)
+        services.release.set()
+        await _settle(lambda: released)
+        await asyncio.sleep(0.05)
+        return before, released
+
+    before, released = _run(scenario)
+
+    assert before == []
+    assert released == [1]
+
+
+def test_on_release_fires_immediately_for_calls_that_never_start():
+    async def scenario(executor, services):
+        released = []
+        running = asyncio.create_task(executor.call("translate_text", "a", "en", "ar"))
+        await _settle(lambda: executor.stats()["text_translation"]["active"] == 1)
+
+        queued = asyncio.create_task(
+            executor.call("translate_text", "b", "en", "ar", on_release=lambda: released.append("queued"))
+        )
+        await _settle(lambda: executor.stats()["text_translation"]["waiting"] == 1)
+        with pytest.raises(InferenceQueueFullError):
+            await executor.call("translate_text", "c", "en", "ar", on_release=lambda: released.append("full"))
+
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        services.release.set()
+        await running
+        return released, executor.stats()["text_translation"]
+
+    released, limits = _run(scenario, concurrency=(1, 1))
+
+    assert released == ["full", "queued"]
+    assert limits["active"] == 0 and limits["waiting"] == 0
@@ -0,0 +1,192 @@
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import jobs  # noqa: E402
+from jobs import JobQueue, _claim  # noqa: E402
+
+
+class ClaimCursor:
+    """Answers _claim's queries: the locked candidate window, then the
+    running counts of the users in it"""
+
+    def __init__(self, candidates, running):
+        self.candidates = candidates
+        self.running = running
+        self.executed = []
+        self._result = None
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+        if "FOR UPDATE SKIP LOCKED" in query:
+            self._result = list(self.candidates)
+        elif "COUNT(*) AS running" in query:
+            self._result = [{"user_id": u, "running": n} for u, n in self.running.items() if u in params]
+        elif query.lstrip().startswith("SELECT id, user_id, request"):
+            self._result = [{"id": params[0], "user_id": None, "request": "{}", "attempts": 1, "max_attempts": 3}]
+        else:
+            self._result = []
+
+    def fetchall(self):
+        return self._result
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def claimed(self):
+        updates = [params for query, params in self.executed if "SET status = 'running'" in query]
+        return updates[0] if updates else None
+
+
+def _job(job_id, user_id, priority=0):
+    return {"id": job_id, "user_id": user_id, "priority": priority}
+
+
+def test_claim_prefers_users_with_fewest_running_jobs():
+    cursor = ClaimCursor([_job(1, 10, priority=5), _job(2, 20), _job(3, 30)], {10: 1, 20: 1})
+
+    job = _claim(cursor, "worker-a")
+
+    assert job["id"] == 3
+    worker_id, lease_seconds, job_id = cursor.claimed()
+    assert (worker_id, lease_seconds, job_id) == ("worker-a", jobs.JOB_LEASE_SECONDS, 3)
+
+
+def test_claim_breaks_ties_by_priority_then_age():
+    cursor = ClaimCursor([_job(4, 10, priority=1), _job(5, 20, priority=3), _job(6, 30, priority=3)], {})
+
+    assert _claim(cursor, "worker-a")["id"] == 5
+
+
+def test_claim_excludes_capped_users_from_the_window():
+    cursor = ClaimCursor([_job(1, 10)], {10: jobs.JOB_MAX_RUNNING_PER_USER})
+
+    _claim(cursor, "worker-a")
+
+    # The window query itself leaves capped users out...
+    window_query, window_params = cursor.executed[0]
+    assert "HAVING COUNT(*) >= %s" in window_query
+    assert window_params == (jobs.JOB_MAX_RUNNING_PER_USER, jobs.JOB_CLAIM_WINDOW)
+    # ...and a user who reached the cap after the window was read is skipped
+    assert cursor.claimed() is None
+
+
+def test_claim_with_empty_queue_returns_none():
+    cursor = ClaimCursor([], {})
+
+    assert _claim(cursor, "worker-a") is None
+    assert len(cursor.executed) == 1
+
+
+def _queue(monkeypatch, handler, statuses=None):
+    executed = []
+
+    async def execute(query, params=None):
+        executed.append((" ".join(query.split()), params))
+
+    async def fetch_one(query, params=None, replica=None):
+        return (statuses or {}).get(params[0])
+
+    monkeypatch.setattr(jobs, "execute", execute)
+    monkeypatch.setattr(jobs, "fetch_one", fetch_one)
+    return JobQueue(handler, concurrency=0), executed
+
+
+def test_lease_is_renewed_while_handler_runs(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT_SECONDS", 0.01)
+
+    async def handler(user_id, request):
+        await asyncio.sleep(0.1)
+        return {"ok": True}
+
+    queue, executed = _queue(monkeypatch, handler)
+    job = {"id": 7, "user_id": 1, "request": "{}", "attempts": 1, "max_attempts": 3}
+
+    async def scenario():
+        await queue._process(job)
+        renewals = [params for query, params in executed if query.startswith("UPDATE translation_jobs SET lease_expires_at")]
+        await asyncio.sleep(0.05)
+        return renewals
+
+    renewals = asyncio.run(scenario())
+
+    assert len(renewals) >= 3
+    assert all(params == (jobs.JOB_LEASE_SECONDS, 7, queue.worker_id) for params in renewals)
+    # The heartbeat stops with the handler
+    later = [params for query, params in executed if query.startswith("UPDATE translation_jobs SET lease_expires_at")]
+    assert len(later) == len(renewals)
+    finish = [params for query, params in executed if "status = 'succeeded'" in query]
+    assert len(finish) == 1 and finish[0][1:] == (7, queue.worker_id)
+
+
+def test_expired_leases_are_requeued_or_failed(monkeypatch):
+    queue, executed = _queue(monkeypatch, None)
+
+    asyncio.run(queue.requeue_expired())
+
+    ((query, params),) = executed
+    assert "WHERE status = 'running' AND lease_expires_at < NOW()" in query
+    assert "status = IF(attempts < max_attempts, 'queued', 'failed')" in query
+    assert "worker_id = NULL" in query
+
+
+def test_results_of_taken_over_jobs_are_dropped(monkeypatch):
+    async def handler(user_id, request):
+        return {"ok": True}
+
+    queue, executed = _queue(monkeypatch, handler)
+    job = {"id": 7, "user_id": 1, "request": "{}", "attempts": 1, "max_attempts": 3}
+
+    asyncio.run(queue._process(job))
+
+    ((query, params),) = [(q, p) for q, p in executed if "status = 'succeeded'" in q]
+    # Only the worker still holding the lease can complete the job
+    assert "AND status = 'running' AND worker_id = %s" in query
+
+
+def test_cancelled_job_skips_side_effects(monkeypatch):
+    recorded = []
+    queue = None
+
+    async def handler(user_id, request):
+        await queue.ensure_running()
+        recorded.append(user_id)
+        return {"ok": True}
+
+    queue, executed = _queue(monkeypatch, handler, statuses={7: {"status": "cancelled", "worker_id": None}})
+    job = {"id": 7, "user_id": 1, "request": "{}", "attempts": 1, "max_attempts": 3}
+
+    asyncio.run(queue._process(job))
+
+    assert recorded == []
+    assert not [q for q, _ in executed if "SET status" in q]
+
+
+def test_ensure_running_passes_for_own_running_job(monkeypatch):
+    queue = None
+    checked = []
+
+    async def handler(user_id, request):
+        await queue.ensure_running()
+        checked.append(user_id)
+        return {}
+
+    queue, _ = _queue(monkeypatch, handler)
+    queue_statuses = {7: {"status": "running", "worker_id": queue.worker_id}}
+
+    async def fetch_one(query, params=None, replica=None):
+        return queue_statuses.get(params[0])
+
+    monkeypatch.setattr(jobs, "fetch_one", fetch_one)
+    asyncio.run(queue._process({"id": 7, "user_id": 1, "request": "{}", "attempts": 1, "max_attempts": 3}))
+
+    assert checked == [1]
+
+
+def test_ensure_running_outside_a_job_is_a_no_op(monkeypatch):
+    queue, _ = _queue(monkeypatch, None)
+
+    # Raises JobCancelledError only for a job being processed
+    asyncio.run(queue.ensure_running())
@@ -0,0 +1,98 @@
+import sys
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from translation_cache import TranslationCache  # noqa: E402
+
+
+def _two_callers(compute):
+    """Starts a leader and a coalesced waiter on the same key, then cancels
+    the leader once the computation is underway"""
+    async def scenario():
+        cache = TranslationCache(db_path="")
+        started = asyncio.Event()
+
+        async def tracked():
+            started.set()
+            return await compute()
+
+        leader = asyncio.create_task(cache.get_or_compute("key", tracked))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_compute("key", tracked))
+        await asyncio.sleep(0)
+        leader.cancel()
+        results = await asyncio.gather(leader, waiter, return_exceptions=True)
+        return cache, results
+
+    return asyncio.run(scenario())
+
+
+def test_waiter_gets_value_when_leader_is_cancelled():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"output": "مرحبا"}
+
+    cache, (leader, waiter) = _two_callers(compute)
+
+    assert isinstance(leader, asyncio.CancelledError)
+    assert waiter == {"output": "مرحبا"}
+    assert len(calls) == 1
+    assert cache.counters["coalesced"] == 1
+    assert cache._get_memory("key") == {"output": "مرحبا"}
+    assert not cache._inflight
+
+
+def test_waiter_gets_exception_when_leader_is_cancelled():
+    async def compute():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("model unavailable")
+
+    cache, (leader, waiter) = _two_callers(compute)
+
+    assert isinstance(leader, asyncio.CancelledError)
+    assert isinstance(waiter, RuntimeError)
+    assert cache.counters["errors"] == 1
+    assert cache._get_memory("key") is None
+    assert not cache._inflight
+
+
+def test_concurrent_callers_share_exception():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("bad input")
+
+    async def scenario():
+        cache = TranslationCache(db_path="")
+        return await asyncio.gather(
+            cache.get_or_compute("key", compute), cache.get_or_compute("key", compute),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(calls) == 1
+
+
+def test_uncacheable_value_is_returned_but_not_stored():
+    async def compute():
+        return {"degraded": True}
+
+    async def scenario():
+        cache = TranslationCache(db_path="")
+        value = await cache.get_or_compute("key", compute, cacheable=lambda v: not v.get("degraded"))
+        return cache, value
+
+    cache, value = asyncio.run(scenario())
+
+    assert value == {"degraded": True}
+    assert cache._get_memory("key") is None
+
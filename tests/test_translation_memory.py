@@ -0,0 +1,189 @@
+import sys
+import asyncio
+import sqlite3
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import translation_memory  # noqa: E402
+from translation_memory import TranslationMemory, _PhraseIndex, _UNTRANSLATED  # noqa: E402
+
+
+def _memory(phrases, fuzzy_threshold=0.85):
+    memory = TranslationMemory(fuzzy_threshold=fuzzy_threshold)
+    index = _PhraseIndex()
+    for source, target in phrases:
+        index.add(source, target)
+    memory._indexes[("en", "ar")] = index
+    return memory
+
+
+class Engine:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, text, source_lang, target_lang):
+        self.calls.append(text)
+        return {"translated_text": f"<{text}>", "confidence": 0.9}
+
+
+def _translate(memory, text):
+    engine = Engine()
+    result = asyncio.run(memory.translate(text, "en", "ar", engine))
+    return result, engine.calls
+
+
+def test_whole_input_hit_skips_the_engine():
+    memory = _memory([("good morning", "صباح الخير")])
+
+    result, calls = _translate(memory, "Good Morning")
+
+    assert result["translated_text"] == "صباح الخير"
+    assert result["confidence"] == 1.0
+    assert calls == []
+    assert memory.counters["requests_without_engine"] == 1
+
+
+def test_longest_match_wins_and_only_gaps_reach_the_engine():
+    memory = _memory([("good", "جيد"), ("good morning", "صباح الخير"), ("friend", "صديق")])
+
+    result, calls = _translate(memory, "good morning my dear friend")
+
+    assert result["translated_text"] == "صباح الخير <my dear> صديق"
+    assert calls == ["my dear"]
+    assert result["engine_calls"] == 1
+    assert memory.counters["tokens"] == 5
+    assert memory.counters["tokens_from_memory"] == 3
+
+
+def test_matching_ignores_case_and_harakat():
+    memory = _memory([("مَرْحَبًا", "hello")])
+    memory._indexes[("ar", "en")] = memory._indexes.pop(("en", "ar"))
+
+    result = asyncio.run(memory.translate("مرحبا", "ar", "en", Engine()))
+
+    assert result["translated_text"] == "hello"
+
+
+def test_punctuation_is_kept_between_clauses():
+    memory = _memory([("good morning", "صباح الخير"), ("thank you", "شكرا لك")])
+
+    result, calls = _translate(memory, "Good morning, my friend! Thank you.")
+
+    assert result["translated_text"] == "صباح الخير, <my friend>! شكرا لك."
+    assert calls == ["my friend"]
+
+
+def test_fuzzy_match_above_threshold_is_used():
+    memory = _memory([("thank you very much", "شكرا جزيلا")])
+
+    result, calls = _translate(memory, "thank you very mch")
+
+    assert result["translated_text"] == "شكرا جزيلا"
+    assert 0.85 <= result["confidence"] < 1.0
+    assert calls == []
+    assert memory.counters["fuzzy_hits"] == 1
+
+
+def test_fuzzy_match_below_threshold_goes_to_the_engine():
+    memory = _memory([("thank you very much", "شكرا جزيلا")])
+
+    result, calls = _translate(memory, "thank you")
+
+    assert result["translated_text"] == "<thank you>"
+    assert calls == ["thank you"]
+    assert memory.counters["fuzzy_hits"] == 0
+
+
+def test_first_translation_added_for_a_phrase_wins():
+    index = _PhraseIndex()
+    index.add("hello", "مرحبا")
+    index.add("Hello", "أهلا")
+
+    assert index.longest_match(["hello"], 0) == (1, "مرحبا")
+    assert len(index.phrases) == 1
+
+
+def _learnable(rows):
+    """Rows of (input_content, output_content, output_language) that pass
+    the _UNTRANSLATED filter, evaluated with MySQL's LOCATE and CONCAT"""
+    db = sqlite3.connect(":memory:")
+    db.create_function("LOCATE", 2, lambda needle, haystack: haystack.find(needle) + 1)
+    db.create_function("CONCAT", -1, lambda *parts: "".join(parts))
+    db.execute("CREATE TABLE translation_history (input_content TEXT, output_content TEXT, output_language TEXT)")
+    db.executemany("INSERT INTO translation_history VALUES (?, ?, ?)", rows)
+    return db.execute(
+        f"SELECT input_content, output_content FROM translation_history WHERE {_UNTRANSLATED.format(p='')}"
+    ).fetchall()
+
+
+def test_untranslated_outputs_are_not_learned():
+    rows = [
+        ("Hello", "مرحبا", "ar"),
+        ("See you", "[AR] See you", "ar"),
+        ("Good morning friend", "صباح الخير [AR] friend", "ar"),
+        ("OK", "OK", "ar"),
+        ("مرحبا", "[EN] مرحبا", "en"),
+        # Another language's tag is ordinary text
+        ("Tag", "[EN] Tag", "ar"),
+    ]
+
+    assert _learnable(rows) == [("Hello", "مرحبا"), ("Tag", "[EN] Tag")]
+
+
+def test_untranslated_filter_qualifies_columns():
+    condition = _UNTRANSLATED.format(p="t.")
+
+    assert "t.output_content <> t.input_content" in condition
+    assert "UPPER(t.output_language)" in condition
+
+
+class LearnCursor:
+    """Answers learn()'s queries from a table of (id, settled) per source"""
+
+    def __init__(self, watermarks, tables):
+        self.watermarks = watermarks
+        self.tables = tables
+        self.executed = []
+        self._result = []
+
+    def execute(self, query, params=None):
+        self.executed.append((" ".join(query.split()), params))
+        if "FROM stats_counters" in query:
+            self._result = [{"name": name, "value": value} for name, value in self.watermarks.items()]
+        elif "AS young" in query:
+            table = "feedback" if "FROM feedback" in query else "translation_history"
+            newer = [(row_id, settled) for row_id, settled in self.tables[table] if row_id > params[2]]
+            young = [row_id for row_id, settled in newer if not settled]
+            self._result = [{"young": min(young) if young else None,
+                             "last": max([row_id for row_id, _ in newer], default=params[1])}]
+        else:
+            self._result = []
+
+    def fetchall(self):
+        return self._result
+
+    def fetchone(self):
+        return self._result[0]
+
+
+def test_learn_stops_watermarks_before_unsettled_rows(monkeypatch):
+    cursor = LearnCursor(
+        {"tm_history_id": 10, "tm_feedback_id": 3},
+        {"translation_history": [(11, True), (12, True), (13, False), (14, True)],
+         "feedback": [(4, True), (5, True)]}
+    )
+
+    async def transaction(work):
+        return work(cursor)
+
+    monkeypatch.setattr(translation_memory, "transaction", transaction)
+    asyncio.run(TranslationMemory().learn())
+
+    history, feedback = [params for query, params in cursor.executed
+                         if query.startswith("INSERT INTO translation_memory")]
+    # Row 13 is still young, so history is read up to 12 and row 14 waits too
+    assert history[:2] == (10, 12)
+    assert feedback[2:4] == (3, 5)
+    update = [params for query, params in cursor.executed if query.startswith("UPDATE stats_counters")]
+    assert update == [(12, 5)]
@@ -0,0 +1,134 @@
+import os
+import sys
+import time
+import json
+import asyncio
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from uploads import (  # noqa: E402
+    UploadError, UploadNotFoundError, UploadOffsetMismatchError, UploadStore, UploadTooLargeError,
+    parse_content_range
+)
+
+
+async def _body(*chunks, disconnect=False):
+    for chunk in chunks:
+        yield chunk
+    if disconnect:
+        raise ConnectionResetError("client went away")
+
+
+def _append(store, upload_id, *chunks, user_id=1, **kwargs):
+    return asyncio.run(store.append(upload_id, user_id, _body(*chunks), **kwargs))
+
+
+def test_append_resumes_at_stored_offset(tmp_path):
+    store = UploadStore(tmp_path)
+    upload_id = store.create(1, "audio", total_size=6)["upload_id"]
+
+    status = _append(store, upload_id, b"abc", offset=0)
+    assert (status["offset"], status["complete"]) == (3, False)
+
+    status = _append(store, upload_id, b"def", offset=3)
+    assert (status["offset"], status["complete"]) == (6, True)
+    assert (tmp_path / f"{upload_id}.part").read_bytes() == b"abcdef"
+
+
+def test_offset_mismatch_is_rejected_without_writing(tmp_path):
+    store = UploadStore(tmp_path)
+    upload_id = store.create(1, "audio")["upload_id"]
+    _append(store, upload_id, b"abc", offset=0)
+
+    with pytest.raises(UploadOffsetMismatchError, match="Expected offset 3"):
+        _append(store, upload_id, b"xyz", offset=1)
+
+    assert store.get(upload_id, 1)["offset"] == 3
+
+
+def test_resume_after_partial_chunk(tmp_path):
+    store = UploadStore(tmp_path)
+    upload_id = store.create(1, "video", total_size=9)["upload_id"]
+
+    # The connection drops after part of the body arrived
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(store.append(upload_id, 1, _body(b"abc", b"de", disconnect=True), offset=0))
+
+    offset = store.get(upload_id, 1)["offset"]
+    assert offset == 5
+    status = _append(store, upload_id, b"fghi", offset=offset)
+    assert status["complete"]
+    assert (tmp_path / f"{upload_id}.part").read_bytes() == b"abcdefghi"
+
+
+def test_size_limits(tmp_path):
+    store = UploadStore(tmp_path, max_bytes=8)
+
+    with pytest.raises(UploadTooLargeError):
+        store.create(1, "audio", total_size=9)
+
+    # The declared size caps the upload below max_bytes
+    upload_id = store.create(1, "audio", total_size=4)["upload_id"]
+    with pytest.raises(UploadTooLargeError, match="exceeds 4 bytes"):
+        _append(store, upload_id, b"abc", b"de")
+    assert store.get(upload_id, 1)["offset"] == 3
+
+    # Without one, max_bytes applies
+    upload_id = store.create(1, "audio")["upload_id"]
+    with pytest.raises(UploadTooLargeError, match="exceeds 8 bytes"):
+        _append(store, upload_id, b"abcdef", b"ghi")
+
+
+def test_completed_upload_rejects_appends(tmp_path):
+    store = UploadStore(tmp_path)
+    upload_id = store.create(1, "audio")["upload_id"]
+    _append(store, upload_id, b"abc")
+    assert store.complete(upload_id, 1)["total_size"] == 3
+
+    with pytest.raises(UploadOffsetMismatchError):
+        _append(store, upload_id, b"d", offset=3)
+
+
+def test_other_users_uploads_are_not_found(tmp_path):
+    store = UploadStore(tmp_path)
+    upload_id = store.create(1, "audio")["upload_id"]
+
+    with pytest.raises(UploadNotFoundError):
+        _append(store, upload_id, b"abc", user_id=2)
+    with pytest.raises(UploadNotFoundError):
+        store.resolve(f"upload:{upload_id}", 2)
+
+
+def test_locks_are_dropped_when_uploads_finish_or_expire(tmp_path):
+    store = UploadStore(tmp_path)
+
+    finished = store.create(1, "audio", total_size=3)["upload_id"]
+    _append(store, finished, b"abc")
+    completed = store.create(1, "audio")["upload_id"]
+    _append(store, completed, b"abc")
+    assert completed in store._locks
+    store.complete(completed, 1)
+
+    expired = store.create(1, "audio")["upload_id"]
+    _append(store, expired, b"abc")
+    meta_path = tmp_path / f"{expired}.json"
+    meta = json.loads(meta_path.read_text())
+    meta["created_at"] = time.time() - 3600
+    meta_path.write_text(json.dumps(meta))
+    assert store.prune(max_age=60) == 1
+
+    with pytest.raises(UploadNotFoundError):
+        _append(store, os.urandom(16).hex(), b"abc")
+
+    assert store._locks == {}
+
+
+def test_parse_content_range():
+    assert parse_content_range(None) == (None, None)
+    assert parse_content_range("bytes 0-99/200") == (0, 200)
+    assert parse_content_range("bytes 100-199/*") == (100, None)
+    with pytest.raises(UploadError):
+        parse_content_range("bytes=0-99")
@@ -0,0 +1,166 @@
+import sys
+import asyncio
+from pathlib import Path
+
+import pymysql
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import write_behind  # noqa: E402
+from write_behind import WriteBehindBuffer  # noqa: E402
+
+
+class FakeDatabase:
+    """Stands in for execute_many: records each transaction and hands out
+    auto-increment ids, failing any transaction that holds a "BAD" value"""
+
+    def __init__(self, first_id=100, step=1, transient=0):
+        self.next_id = first_id
+        self.step = step
+        self.transient = transient
+        self.transactions = []
+
+    async def execute_many(self, statements):
+        if self.transient:
+            self.transient -= 1
+            raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server")
+        if any("BAD" in params for _, params in statements):
+            raise pymysql.err.DataError(1406, "Data too long for column 'input_content'")
+        self.transactions.append(statements)
+        results = []
+        for query, params in statements:
+            if query.startswith("INSERT INTO translation_history"):
+                results.append(self.next_id)
+                self.next_id += self.step * query.count("(%s, %s")
+            else:
+                results.append(0)
+        return results
+
+
+def _row(user_id, text):
+    return (user_id, "text", text, "en", "text", f"[AR] {text}", "ar", 0.1)
+
+
+def _buffer(monkeypatch, database, **kwargs):
+    monkeypatch.setattr(write_behind, "execute_many", database.execute_many)
+    return WriteBehindBuffer(flush_interval=0, **kwargs)
+
+
+async def _add_and_flush(buffer, rows):
+    added = asyncio.create_task(buffer.add_translations(rows))
+    await asyncio.sleep(0)
+    await buffer.flush()
+    return await asyncio.gather(added, return_exceptions=True)
+
+
+def test_consecutive_ids_come_from_one_multi_row_insert(monkeypatch):
+    database = FakeDatabase(first_id=100)
+    buffer = _buffer(monkeypatch, database)
+    buffer.consecutive_ids = True
+
+    (ids,) = asyncio.run(_add_and_flush(buffer, [_row(1, "a"), _row(1, "b"), _row(2, "c")]))
+
+    assert ids == [100, 101, 102]
+    (statements,) = database.transactions
+    inserts = [query for query, _ in statements if query.startswith("INSERT INTO translation_history")]
+    assert len(inserts) == 1
+    assert inserts[0].count("(%s, %s, %s, %s, %s, %s, %s, %s)") == 3
+
+
+def test_without_consecutive_ids_each_row_gets_its_own_insert(monkeypatch):
+    # An auto_increment_increment of 2, as on a two-node multi-primary setup
+    database = FakeDatabase(first_id=7, step=2)
+    buffer = _buffer(monkeypatch, database)
+
+    (ids,) = asyncio.run(_add_and_flush(buffer, [_row(1, "a"), _row(1, "b"), _row(2, "c")]))
+
+    assert ids == [7, 9, 11]
+    (statements,) = database.transactions
+    inserts = [query for query, _ in statements if query.startswith("INSERT INTO translation_history")]
+    assert len(inserts) == 3
+    assert all(query.count("%s") == 8 for query in inserts)
+
+
+def test_bad_row_fails_only_its_own_caller(monkeypatch):
+    database = FakeDatabase(first_id=1)
+    buffer = _buffer(monkeypatch, database)
+    buffer.consecutive_ids = True
+
+    async def scenario():
+        good = asyncio.create_task(buffer.add_translation(*_row(1, "a")))
+        bad = asyncio.create_task(buffer.add_translation(*_row(1, "BAD")))
+        other = asyncio.create_task(buffer.add_translation(*_row(2, "c")))
+        await asyncio.sleep(0)
+        await buffer.flush()
+        return await asyncio.gather(good, bad, other, return_exceptions=True)
+
+    good, bad, other = asyncio.run(scenario())
+
+    assert (good, other) == (1, 2)
+    assert isinstance(bad, pymysql.err.DataError)
+    assert buffer.counters["row_retries"] == 3
+    assert buffer.counters["rows_written"] == 2
+    assert buffer.pending_count() == 0
+
+
+def test_transient_error_leaves_rows_queued(monkeypatch):
+    database = FakeDatabase(transient=1)
+    buffer = _buffer(monkeypatch, database, durability="enqueue")
+
+    async def scenario():
+        await buffer.add_translations([_row(1, "a"), _row(2, "b")])
+        await buffer.flush()
+        queued = buffer.pending_count()
+        await buffer.flush()
+        return queued
+
+    queued = asyncio.run(scenario())
+
+    # Connection errors fail every row alike, so there's no row-by-row retry
+    assert queued == 2
+    assert buffer.counters["flush_errors"] == 1
+    assert buffer.counters["row_retries"] == 0
+    assert buffer.counters["rows_written"] == 2
+    assert buffer.pending_count() == 0
+
+
+def test_rows_are_dropped_after_max_attempts(monkeypatch):
+    database = FakeDatabase(transient=write_behind.WRITE_BEHIND_MAX_ATTEMPTS)
+    buffer = _buffer(monkeypatch, database, durability="enqueue")
+
+    async def scenario():
+        await buffer.add_translations([_row(1, "a")])
+        await buffer.drain()
+
+    asyncio.run(scenario())
+
+    assert buffer.counters["rows_dropped"] == 1
+    assert buffer.pending_count() == 0
+    assert not database.transactions
+
+
+def test_counter_update_is_coalesced_per_flush(monkeypatch):
+    database = FakeDatabase()
+    buffer = _buffer(monkeypatch, database)
+    buffer.consecutive_ids = True
+
+    asyncio.run(_add_and_flush(buffer, [_row(1, "a"), _row(1, "b"), _row(2, "c")]))
+
+    (statements,) = database.transactions
+    updates = [(query, params) for query, params in statements if query.startswith("UPDATE users")]
+    assert len(updates) == 1
+    query, params = updates[0]
+    assert "translations_count = translations_count + CASE id WHEN %s THEN %s WHEN %s THEN %s ELSE 0 END" in query
+    assert params == (1, 2, 2, 1, 1, 2)
+
+
+def test_closed_buffer_rejects_rows(monkeypatch):
+    buffer = _buffer(monkeypatch, FakeDatabase())
+
+    async def scenario():
+        await buffer.drain()
+        with pytest.raises(RuntimeError):
+            await buffer.add_translation(*_row(1, "a"))
+
+    asyncio.run(scenario())